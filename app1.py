@@ -1,17 +1,20 @@
 import streamlit as st
 import base64
+import pandas as pd
 import os
 from dotenv import load_dotenv
 from backend import GameAIClient
-import threading
+from backend.audio_codec import sniff_mime
+from backend.services import COVER_PLACEHOLDER_ERROR
 import time
+import uuid
 
 
 load_dotenv()
 # --- 1. Init & Styles ---
 st.set_page_config(page_title="Indie Game Studio Pro", layout="wide")
 
-st.markdown("""
+APP_CSS = """
 <style>
     .stApp { background-color: #0f172a; color: #f8fafc; }
     .card {
@@ -40,9 +43,15 @@ st.markdown("""
         margin-bottom: 20px;
     }
 </style>
-""", unsafe_allow_html=True)
+"""
+st.markdown(APP_CSS, unsafe_allow_html=True)
 
 # --- 2. State & Backend Setup ---
+@st.cache_resource
+def get_game_client(api_key, hf_token):
+    """One client per server process: model caches, job pool and prefetcher are shared by every session"""
+    return GameAIClient(api_key, hf_token)
+
 if 'game_client' not in st.session_state:
     api_key = os.getenv("GOOGLE_API_KEY") 
     hf_token = os.getenv("HF_TOKEN")
@@ -50,7 +59,7 @@ if 'game_client' not in st.session_state:
     if not api_key:
         st.error("GOOGLE_API_KEY Not Found")
     
-    st.session_state.game_client = GameAIClient(api_key, hf_token)
+    st.session_state.game_client = get_game_client(api_key, hf_token)
 
 # State initialization
 base_keys = ['proposals', 'view', 'selected_item', 'selected_cat']
@@ -62,9 +71,14 @@ if 'generated_media' not in st.session_state or st.session_state.generated_media
     st.session_state.generated_media = {}
 # For the filtering/recommendation logic
 if 'visible_items' not in st.session_state: st.session_state.visible_items = {}
-if 'hidden_items' not in st.session_state: st.session_state.hidden_items = {}
+if 'proposal_pool' not in st.session_state: st.session_state.proposal_pool = None
 if 'wiki_genre' not in st.session_state: st.session_state.wiki_genre = None
 if 'wiki_data' not in st.session_state: st.session_state.wiki_data = None
+# Identifies this browser session for the speculative prefetch budget and background jobs.
+# Server-side only: an id taken from the URL would let anyone with a shared link act as this session.
+if 'session_id' not in st.session_state:
+    st.session_state.session_id = uuid.uuid4().hex
+    st.query_params.pop("sid", None)
 
 # --- 3. View Logic (Router) ---
 
@@ -75,36 +89,127 @@ def handle_card_click(item, category):
     st.session_state.selected_item = item
     st.session_state.selected_cat = category
     st.session_state.view = 'modal' # Show popup/modal view
+    # Speculatively expand the card and start its cover art / music brief while the user reads the modal
+    st.session_state.game_client.prefetch_assets(item, session=st.session_state.session_id)
+
+def ensure_item_details():
+    """Expand a summary card in place (selected item and dashboard list)"""
+    item = st.session_state.selected_item
+    if item.get('details'):
+        return item
+    with st.spinner("📐 Drafting the full design blueprint..."):
+        expanded = st.session_state.game_client.expand_proposal(item)
+    st.session_state.selected_item = expanded
+    cat = st.session_state.selected_cat
+    if cat in st.session_state.visible_items:
+        st.session_state.visible_items[cat] = [
+            expanded if x['name'] == item['name'] else x for x in st.session_state.visible_items[cat]
+        ]
+    return expanded
 
 def handle_not_interested():
-    """Logic to swap the rejected item with a new one from the hidden list"""
+    """Logic to swap the rejected item with a new one from the proposal pool"""
     cat = st.session_state.selected_cat
     current = st.session_state.selected_item
+    st.session_state.game_client.cancel_prefetch(current, session=st.session_state.session_id)
     
     # Remove current from visible list
     st.session_state.visible_items[cat] = [
         x for x in st.session_state.visible_items[cat] if x['name'] != current['name']
     ]
     
-    # Add a new one from hidden list if available
-    if st.session_state.hidden_items.get(cat):
-        new_item = st.session_state.hidden_items[cat].pop(0)
+    # Swap in a pre-generated candidate from the pool (no model round trip)
+    pool = st.session_state.proposal_pool
+    new_item = pool.take(cat) if pool else None
+    if new_item:
         st.session_state.visible_items[cat].append(new_item)
     
     # Return to home grid
     go_home()
 
+def await_job(job_id, label):
+    """Block this run on a background job (up to JOB_WAIT_SECONDS); a rerun or refresh reattaches to it instead of restarting it"""
+    with st.spinner(label):
+        job = st.session_state.game_client.jobs.wait(job_id, timeout=float(os.environ.get("JOB_WAIT_SECONDS", 180)))
+    if job and job['state'] == 'done':
+        return job['result'], None
+    if job and job['state'] in ('queued', 'running'):
+        return None, 'timeout'
+    return None, (job or {}).get('error') or 'cancelled'
+
+def load_proposals(data, story, team, duration, budget):
+    """Show the first cards and keep the surplus candidates pooled for swaps"""
+    st.session_state.proposals = data
+    pool = st.session_state.game_client.build_proposal_pool(data, story, team, duration, budget)
+    st.session_state.proposal_pool = pool
+    st.session_state.visible_items['achievable'] = pool.take_many('achievable', 3)
+    st.session_state.visible_items['demos'] = pool.take_many('demos', 2)
+
 # --- 4. Render Components ---
 
+@st.cache_data(max_entries=64, show_spinner=False)
+def decode_media(b64_data):
+    return base64.b64decode(b64_data)
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def card_html(name, reason, demo=False):
+    if demo:
+        return f"""
+            <div class="card" style="border-color: #818cf8;">
+                <h3>{name} (Demo)</h3>
+                <p style="color:#cbd5e1; font-size:0.9em;">{reason[:120]}...</p>
+            </div>
+            """
+    return f"""
+            <div class="card">
+                <h3>{name}</h3>
+                <p style="color:#cbd5e1; font-size:0.9em;">{reason[:120]}...</p>
+            </div>
+            """
+
+@st.fragment(run_every=2)
+def render_analysis_status():
+    """Polls the analysis job; only this fragment reruns until the job finishes"""
+    client = st.session_state.game_client
+    job_id = st.session_state.analysis_job
+    job = client.jobs.get(job_id) if job_id else None
+    loading_messages = [
+        "🏗️ Architecting the game world...",
+        "📊 Analyzing feasibility and budget...",
+        "📚 Pulling classic references..."
+    ]
+
+    if job and job['state'] in ('queued', 'running'):
+        st.markdown(f"""
+        <div style="padding:15px; background:rgba(56, 189, 248, 0.1); border-radius:10px; border-left:4px solid #38bdf8;">
+            <p style="margin:0; color:#38bdf8; font-weight:bold;">AI Architect is at work...</p>
+            <p style="margin:0; font-size:0.9em; color:#cbd5e1;">{loading_messages[int(time.time() // 3) % 3]}</p>
+        </div>
+        """, unsafe_allow_html=True)
+        return
+
+    st.session_state.is_analyzing = False
+    st.session_state.analysis_job = None
+    if job and job['state'] == 'failed':
+        st.session_state.analysis_error = job['error']
+    elif job and job['state'] == 'done' and job['result']:
+        p = job['payload']
+        load_proposals(job['result'], p['story'], p['team'], p['duration'], p['budget'])
+        go_home()
+    st.rerun()
+
 def render_sidebar():
     with st.sidebar:
         st.title("🛠️ Project Lab")
         
-        if 'is_analyzing' not in st.session_state:
-            st.session_state.is_analyzing = False
         if 'game_client' not in st.session_state:
             st.error("Game client not initialized. Please check your .env or backend setup.")
             return
+        client = st.session_state.game_client
+        if 'analysis_job' not in st.session_state:
+            # After a refresh, submitting the same constraints reattaches to the running job by its idempotency key
+            st.session_state.analysis_job = None
+            st.session_state.is_analyzing = False
 
         st.markdown("### 📝 Constraints")
         story = st.text_area("Story Idea", "A cyberpunk detective solving crimes in dreams...", height=100)
@@ -112,71 +217,38 @@ def render_sidebar():
         team = col1.number_input("Team Size", 1, 20, 3)
         duration = col2.number_input("Months", 1, 24, 6)
         budget = st.slider("Budget ($)", 0, 10000, 1000)
+        force_fresh = st.checkbox("♻️ Force fresh analysis (skip cache)", value=False)
         
         if not st.session_state.is_analyzing:
             if st.button("🚀 Analyze & Generate", type="primary", use_container_width=True):
+                # Runs in the background job pool, so reruns and refreshes don't restart it
+                payload = {"story": story, "team": team, "duration": duration, "budget": budget, "force_refresh": force_fresh}
+                st.session_state.analysis_job = client.submit_job(
+                    "proposal", payload, session=st.session_state.session_id, replace=force_fresh
+                )
                 st.session_state.is_analyzing = True
                 st.rerun()
         else:
             if st.button("🛑 Stop & Cancel Analysis", type="secondary", use_container_width=True):
+                client.jobs.cancel(st.session_state.analysis_job)
+                st.session_state.analysis_job = None
                 st.session_state.is_analyzing = False
                 st.rerun()
 
-            status_placeholder = st.empty()
-            res_container = []
-            
-            client_instance = st.session_state.game_client
-
-            def run_ai_task(client):
-                try:
-                    res = client.generate_proposal(story, team, duration, budget)
-                    res_container.append(res)
-                except Exception as e:
-                    res_container.append(e)
-
-            ai_thread = threading.Thread(target=run_ai_task, args=(client_instance,))
-            ai_thread.start()
-
-            loading_messages = [
-                "🏗️ Architecting the game world...",
-                "📊 Analyzing feasibility and budget...",
-                "📚 Pulling classic references..."
-            ]
-            
-            msg_idx = 0
-            while ai_thread.is_alive():
-                with status_placeholder.container():
-                    st.markdown(f"""
-                    <div style="padding:15px; background:rgba(56, 189, 248, 0.1); border-radius:10px; border-left:4px solid #38bdf8;">
-                        <p style="margin:0; color:#38bdf8; font-weight:bold;">AI Architect is at work...</p>
-                        <p style="margin:0; font-size:0.9em; color:#cbd5e1;">{loading_messages[msg_idx % 3]}</p>
-                    </div>
-                    """, unsafe_allow_html=True)
-                
-                time.sleep(3)
-                msg_idx += 1
-                
-                if not st.session_state.is_analyzing:
-                    break
+            render_analysis_status()
 
-            status_placeholder.empty()
-            if res_container and st.session_state.is_analyzing:
-                data = res_container[0]
-                st.session_state.is_analyzing = False 
-                
-                if isinstance(data, Exception):
-                    st.error(f"Analysis failed: {str(data)}")
-                elif data:
-                    st.session_state.proposals = data
-                    all_genres = data.get('achievable_genres', [])
-                    all_demos = data.get('demo_ideas', [])
-                    st.session_state.visible_items['achievable'] = all_genres[:3]
-                    st.session_state.hidden_items['achievable'] = all_genres[3:]
-                    st.session_state.visible_items['demos'] = all_demos[:2]
-                    st.session_state.hidden_items['demos'] = all_demos[2:]
-                    
-                    go_home()
-                    st.rerun()
+        if st.session_state.get('analysis_error'):
+            st.error(f"Analysis failed: {st.session_state.pop('analysis_error')}")
+
+        stats = st.session_state.game_client.cache_stats()["proposals"]
+        if stats["hits"] or stats["misses"]:
+            st.caption(f"Proposal cache hit rate: {stats['hit_rate']:.0%} ({stats['hits']}/{stats['hits'] + stats['misses']})")
+
+POPULAR_GENRES = [
+    "Roguelike", "Metroidvania", "Cyberpunk RPG", "Visual Novel", 
+    "Hypercasual", "Turn-based Strategy", "Survival Horror", "Platformer",
+    "Deckbuilder", "Idle Clicker", "Tower Defense", "Puzzle", "FPS", "MOBA"
+]
 
 def render_home():
     st.markdown("""
@@ -193,14 +265,17 @@ def render_home():
 
     # 2. Interactive Genre Cloud
     st.markdown("### 🔥 Trending Genres Explorer")
-    popular_genres = [
-        "Roguelike", "Metroidvania", "Cyberpunk RPG", "Visual Novel", 
-        "Hypercasual", "Turn-based Strategy", "Survival Horror", "Platformer",
-        "Deckbuilder", "Idle Clicker", "Tower Defense", "Puzzle", "FPS", "MOBA"
-    ]
+    render_genre_cloud()
+    render_feasibility_matrix()
     
+    st.markdown("---")
+    render_proposal_grid()
+
+@st.fragment
+def render_genre_cloud():
+    """A genre click only reruns the cloud until the wiki data is in; then the app switches view"""
     cloud_cols = st.columns(4)
-    for i, genre in enumerate(popular_genres):
+    for i, genre in enumerate(POPULAR_GENRES):
         with cloud_cols[i % 4]:
             if st.button(f"🏷️ {genre}", key=f"cloud_{i}", use_container_width=True):
                 st.session_state.wiki_genre = genre
@@ -209,11 +284,64 @@ def render_home():
                     st.session_state.wiki_data = info
                 st.session_state.view = 'wiki'
                 st.rerun()
-    
-    st.markdown("---")
-    
+
+STATUS_LABELS = {
+    "feasible_game": "✅ Full game",
+    "feasible_demo": "🧪 Demo only",
+    "impossible": "❌ Not feasible",
+    "unknown": "❔ No verdict",
+}
+
+@st.fragment
+def render_feasibility_matrix():
+    """Compare many genres against one set of constraints (batched model calls, sortable table)"""
+    with st.expander("📊 Compare genres: feasibility matrix"):
+        with st.form("feasibility_matrix_form"):
+            story = st.text_area("Core Story Idea", "A hero saves the world...", height=80)
+            col1, col2, col3 = st.columns(3)
+            team = col1.number_input("Team Size", 1, 50, 3)
+            duration = col2.number_input("Months", 1, 36, 6)
+            budget = col3.number_input("Budget ($)", 0, 1000000, 10000, step=1000)
+            genres = st.multiselect("Genres", POPULAR_GENRES, default=POPULAR_GENRES)
+            force_fresh = st.checkbox("♻️ Force fresh analysis (skip cache)", value=False)
+            submitted = st.form_submit_button("📊 Score all genres")
+
+        if submitted and genres:
+            with st.spinner(f"Scoring {len(genres)} genres..."):
+                st.session_state.feasibility_matrix = st.session_state.game_client.evaluate_genres_batch(
+                    genres,
+                    {"story": story, "team": team, "duration": duration, "budget": budget},
+                    force_refresh=force_fresh,
+                )
+
+        rows = st.session_state.get('feasibility_matrix')
+        if rows:
+            table = pd.DataFrame(rows).sort_values("score", ascending=False, na_position="last")
+            table["status"] = table["status"].map(lambda status: STATUS_LABELS.get(status, status))
+            st.dataframe(
+                table[["genre", "status", "score", "cycle", "reason", "source"]],
+                hide_index=True,
+                use_container_width=True,
+                column_config={
+                    "genre": "Genre",
+                    "status": "Verdict",
+                    "score": st.column_config.ProgressColumn("Score", min_value=0, max_value=100, format="%d"),
+                    "cycle": "Est. Cycle",
+                    "reason": st.column_config.TextColumn("Reason", width="large"),
+                    "source": "Source",
+                },
+            )
+
+@st.fragment
+def render_proposal_grid():
     if st.session_state.proposals:
         st.subheader("📋 Your Generated Proposals")
+        if st.button("🖼️ Preview covers for all cards"):
+            visible = st.session_state.visible_items.get('achievable', []) + st.session_state.visible_items.get('demos', [])
+            with st.spinner("⚡ Sketching quick cover previews..."):
+                previews = st.session_state.game_client.cover_previews(visible)
+            for name, preview in previews.items():
+                st.session_state.generated_media[f"{name}_img_preview"] = preview
 
     # --- Section 1: Achievable Genres ---
     st.subheader("✅ Achievable Game Genres")
@@ -225,12 +353,10 @@ def render_home():
     
     for i, item in enumerate(items):
         with cols[i % 3]:
-            st.markdown(f"""
-            <div class="card">
-                <h3>{item['name']}</h3>
-                <p style="color:#cbd5e1; font-size:0.9em;">{item['reason'][:120]}...</p>
-            </div>
-            """, unsafe_allow_html=True)
+            preview = st.session_state.generated_media.get(f"{item['name']}_img_preview")
+            if preview:
+                st.image(decode_media(preview), use_container_width=True)
+            st.markdown(card_html(item['name'], item['reason']), unsafe_allow_html=True)
             if st.button(f"Analyze {item['name']}", key=f"gen_{i}"):
                 handle_card_click(item, 'achievable')
                 st.rerun()
@@ -245,12 +371,10 @@ def render_home():
 
     for i, item in enumerate(d_items):
         with d_cols[i % 2]:
-            st.markdown(f"""
-            <div class="card" style="border-color: #818cf8;">
-                <h3>{item['name']} (Demo)</h3>
-                <p style="color:#cbd5e1; font-size:0.9em;">{item['reason'][:120]}...</p>
-            </div>
-            """, unsafe_allow_html=True)
+            preview = st.session_state.generated_media.get(f"{item['name']}_img_preview")
+            if preview:
+                st.image(decode_media(preview), use_container_width=True)
+            st.markdown(card_html(item['name'], item['reason'], demo=True), unsafe_allow_html=True)
             if st.button(f"Analyze Demo {i+1}", key=f"dem_{i}"):
                 handle_card_click(item, 'demos')
                 st.rerun()
@@ -293,13 +417,109 @@ def render_modal():
             # Second Row: Neutral Navigation Button
             st.write("") # Add a little spacing
             if st.button("⬅️ Back to Dashboard (Decide Later)", use_container_width=True):
+                st.session_state.game_client.deprioritize_prefetch(item, session=st.session_state.session_id)
                 go_home()
                 st.rerun()
                 
     st.markdown("---")
 
+def render_cover(item):
+    """Cover slot: the full image, or the quick preview while the background cover job finishes"""
+    client = st.session_state.game_client
+    media = st.session_state.generated_media
+    media_key = f"{item['name']}_img"
+    preview_key = f"{item['name']}_img_preview"
+
+    cover_failed = placeholder = False
+    if media_key not in media:
+        # The render started on the page (or speculatively from the modal) runs as a job that outlives reruns
+        payload = {"item": item}
+        job = client.find_job("cover", payload)
+        retry_after = float(os.environ.get("COVER_RETRY_SECONDS", 60))
+        if job is None or (
+            job['error'] == COVER_PLACEHOLDER_ERROR and time.time() - (job['finished_at'] or 0) > retry_after
+        ):
+            job = client.jobs.get(client.submit_job("cover", payload, session=st.session_state.session_id))
+        if job and job['state'] == 'done' and job['result']:
+            media[media_key] = job['result']
+            st.rerun()
+        # Provider down: show placeholder art in the preview slot, never as the final cover
+        placeholder = bool(job) and job['error'] == COVER_PLACEHOLDER_ERROR
+        if placeholder and preview_key not in media:
+            media[preview_key] = client.placeholder_image(client.cover_prompt(item), item=item)
+        cover_failed = not job or (job['state'] in ('failed', 'cancelled') and not placeholder)
+
+    img_data = media.get(media_key) or media.get(preview_key)
+    if img_data: 
+        st.image(decode_media(img_data), use_container_width=True)
+        if placeholder:
+            st.caption("🎨 Placeholder art — the image provider is unavailable, the full render is retried shortly.")
+        elif media_key not in media and not cover_failed:
+            st.caption("⚡ Quick preview — the full-quality render swaps in when it's ready.")
+    elif not cover_failed:
+        st.info("🎨 AI Artist is painting the cover art... (Powered by SDXL)")
+    if cover_failed:
+        st.error("Image generation failed. Check backend console.")
+
+    if (img_data or cover_failed) and st.button("🔄 Regenerate Image"): 
+        # Clear old images -> Re-run -> Trigger the automatic generation logic in render_detail
+        client.forget_cover(item, session=st.session_state.session_id)
+        client.submit_job("cover", {"item": item}, session=st.session_state.session_id, replace=True)
+        media.pop(media_key, None)
+        media.pop(preview_key, None)
+        st.rerun()
+
+@st.fragment
+def render_soundtrack(item):
+    audio_key = f"{item['name']}_audio"
+    aud_data = st.session_state.generated_media.get(audio_key)
+    if aud_data:
+        audio_bytes = decode_media(aud_data)
+        st.audio(audio_bytes, format=sniff_mime(audio_bytes))
+        return
+
+    music_payload = {"item": item}
+    # A soundtrack already queued/finished for this card (e.g. before a refresh) is picked up, not redone
+    existing = st.session_state.game_client.find_job("music", music_payload)
+    pending = existing and existing['state'] in ('queued', 'running', 'done')
+    if pending or st.button("🎹 Generate Soundtrack"):
+        job_id = st.session_state.game_client.submit_job(
+            "music", music_payload, session=st.session_state.session_id
+        )
+        audio_b64, error = await_job(job_id, "Composing music...")
+        if audio_b64:
+            st.session_state.generated_media[audio_key] = audio_b64
+            st.rerun(scope="fragment")
+        elif error == 'timeout':
+            st.info("🎹 Still composing in the background — interact with the page to check again.")
+        else:
+            st.error("Audio generation failed. Check backend console.")
+
+@st.fragment
+def render_pdf_export(item):
+    if st.button("📥 Export Professional GDD (PDF)", type="primary", use_container_width=True):
+        img_data = st.session_state.generated_media.get(f"{item['name']}_img")
+        job_id = st.session_state.game_client.submit_job(
+            "pdf", {"item": item, "img_b64": img_data}, session=st.session_state.session_id
+        )
+        pdf_b64, error = await_job(job_id, "Compiling PDF Report...")
+        
+        if pdf_b64:
+            st.download_button(
+                label="Click to Download PDF",
+                data=base64.b64decode(pdf_b64),
+                file_name=f"{item['name'].replace(' ', '_')}_GDD.pdf",
+                mime="application/pdf",
+                on_click="ignore",
+                use_container_width=True
+            )
+        elif error == 'timeout':
+            st.info("📄 The PDF is still compiling in the background — click Export again to pick it up.")
+        else:
+            st.error(f"PDF export failed: {error}")
+
 def render_detail():
-    item = st.session_state.selected_item
+    item = ensure_item_details()
     details = item.get('details', {})
     
     if st.button("⬅️ Back to Dashboard"):
@@ -310,58 +530,27 @@ def render_detail():
     
     # ---  Define Cache Key ---
     media_key = f"{item['name']}_img"
-    audio_key = f"{item['name']}_audio"
+    preview_key = f"{item['name']}_img_preview"
+    media = st.session_state.generated_media
     
-    # If the image is not present in the cache and has not yet been generated, it will automatically commence generation.
-    if media_key not in st.session_state.generated_media:
-        with st.spinner("🎨 AI Artist is painting the cover art... (Powered by SDXL)"):
-            # Conceptualise the prompt
-            image_prompt = f"Video game cover art for {item['name']}, {details.get('release_blurb', '')}, high quality, trending on artstation"
-            
-            # Call the backend to generate
-            img_data = st.session_state.game_client.generate_image(image_prompt)
-            
-            # Deposit into Session
-            if img_data:
-                st.session_state.generated_media[media_key] = img_data
-                st.rerun()
-            else:
-                st.error("Image generation failed. Check backend console.")
-
+    # Progressive cover: queue the full render, then show a quick low-step preview while it paints
+    if media_key not in media and preview_key not in media:
+        st.session_state.game_client.start_cover_render(item, session=st.session_state.session_id)
+        with st.spinner("⚡ Sketching a quick cover preview..."):
+            preview = st.session_state.game_client.cover_preview(item)
+        if preview:
+            media[preview_key] = preview
 
     
     # Page rendering
     col_media, col_text = st.columns([1, 1.5])
     
     with col_media:
-        img_data = st.session_state.generated_media.get(media_key)
-    
-        if img_data: 
-            st.image(base64.b64decode(img_data), use_container_width=True)
-            
-            if st.button("🔄 Regenerate Image"): 
-                # Clear old images -> Re-run -> Trigger the automatic generation logic above
-                del st.session_state.generated_media[media_key]
-                st.rerun()
-        else:
-            st.warning("Image failed to load.")
+        # Only the cover slot polls (every 2s) while the full render is pending; the rest of the page stays put
+        st.fragment(render_cover, run_every=2 if media_key not in media else None)(item)
 
         st.write("### 🎵 Game Background Music Preview")
-        
-        # Audio Section
-        aud_data = st.session_state.generated_media.get(audio_key)
-        if aud_data:
-            st.audio(base64.b64decode(aud_data), format="audio/wav")
-        else:
-            if st.button("🎹 Generate Soundtrack"):
-                with st.spinner("Composing music..."):
-                    music_prompt = st.session_state.game_client.compose_music_prompt(item)
-                    audio_b64 = st.session_state.game_client.generate_audio(music_prompt)
-                    if audio_b64:
-                        st.session_state.generated_media[audio_key] = audio_b64
-                        st.rerun()
-                    else:
-                        st.error("Audio generation failed. Check backend console.")
+        render_soundtrack(item)
                     
     with col_text:
         # Game Details
@@ -389,22 +578,7 @@ def render_detail():
     st.divider()
     col_pdf, _ = st.columns([1, 2])
     with col_pdf:
-        if st.button("📥 Export Professional GDD (PDF)", type="primary", use_container_width=True):
-            with st.spinner("Compiling PDF Report..."):
-                img_data = st.session_state.generated_media.get(media_key)
-                
-                pdf_bytes = st.session_state.game_client.export_pdf(
-                    item, 
-                    img_data
-                )
-                
-                st.download_button(
-                    label="Click to Download PDF",
-                    data=pdf_bytes,
-                    file_name=f"{item['name'].replace(' ', '_')}_GDD.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+        render_pdf_export(item)
 
 def render_genre_wiki():
     genre = st.session_state.wiki_genre
@@ -440,13 +614,15 @@ def render_genre_wiki():
         team_input = col1.number_input("Team Size", 1, 50, 3)
         duration_input = col2.number_input("Months", 1, 36, 6)
         budget_input = st.slider("Budget ($)", 1000, 100000, 10000)
+        force_fresh = st.checkbox("♻️ Force fresh analysis (skip cache)", value=False)
         
         submitted = st.form_submit_button(f"🚀 Analyze Feasibility: {genre}")
 
     if submitted:
         with st.spinner(f"Simulating {genre} production pipeline..."):
             result = st.session_state.game_client.evaluate_specific_genre(
-                genre, story_input, team_input, duration_input, budget_input
+                genre, story_input, team_input, duration_input, budget_input,
+                force_refresh=force_fresh,
             )
             
             if result:
@@ -495,12 +671,8 @@ def render_genre_wiki():
                                  story_input, team_input, duration_input, budget_input
                              )
                              if data:
-                                st.session_state.proposals = data
                                 # Update list
-                                all_genres = data.get('achievable_genres', [])
-                                all_demos = data.get('demo_ideas', [])
-                                st.session_state.visible_items['achievable'] = all_genres[:3]
-                                st.session_state.visible_items['demos'] = all_demos[:2]
+                                load_proposals(data, story_input, team_input, duration_input, budget_input)
                                 
                                 go_home() # Return to the homepage to view the new results
 
@@ -0,0 +1,238 @@
+import argparse
+import asyncio
+import base64
+import hmac
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import tornado.ioloop
+import tornado.web
+
+from backend.audio_codec import sniff_mime
+from backend.services import GameAIClient
+
+# Job kinds whose result is base64 media, served raw from /jobs/<id>/result.
+MEDIA_RESULTS = {
+    "cover": lambda data: "image/png",
+    "music": sniff_mime,
+    "pdf": lambda data: "application/pdf",
+}
+STREAM_CHUNK = 64 * 1024
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+class BaseHandler(tornado.web.RequestHandler):
+    """JSON in/out, optional bearer token (API_TOKEN), blocking client calls off the event loop."""
+
+    def initialize(self, client, executor):
+        self.client = client
+        self.executor = executor
+
+    def prepare(self):
+        token = os.environ.get("API_TOKEN")
+        if token:
+            supplied = self.request.headers.get("Authorization", "").encode("utf-8")
+            if not hmac.compare_digest(supplied, f"Bearer {token}".encode("utf-8")):
+                raise tornado.web.HTTPError(401)
+
+    def write_error(self, status_code, **kwargs):
+        self.finish({"error": self._reason, "status": status_code})
+
+    def body(self):
+        try:
+            payload = json.loads(self.request.body or b"{}")
+        except json.JSONDecodeError:
+            raise tornado.web.HTTPError(400, reason="invalid JSON body")
+        if not isinstance(payload, dict):
+            raise tornado.web.HTTPError(400, reason="JSON object expected")
+        return payload
+
+    def require(self, payload, *names):
+        missing = [name for name in names if payload.get(name) in (None, "")]
+        if missing:
+            raise tornado.web.HTTPError(400, reason=f"missing fields: {', '.join(missing)}")
+
+    def flag(self, name):
+        """Boolean query argument: 1/true/yes/on (any case) are true, anything else false."""
+        return self.get_query_argument(name, "").strip().lower() in TRUE_VALUES
+
+    def run(self, fn, *args):
+        return tornado.ioloop.IOLoop.current().run_in_executor(self.executor, fn, *args)
+
+    def submit(self, kind, payload):
+        job_id = self.client.submit_job(kind, payload, replace=self.flag("fresh"))
+        self.set_status(202)
+        self.set_header("Location", f"/jobs/{job_id}")
+        self.finish({"job_id": job_id, "status_url": f"/jobs/{job_id}", "result_url": f"/jobs/{job_id}/result"})
+
+
+class HealthHandler(BaseHandler):
+    def get(self):
+        self.finish({
+            "status": "ok",
+            "jobs": self.client.jobs.stats(),
+            "caches": self.client.cache_stats(),
+            "prefetch": self.client.prefetcher.stats(),
+        })
+
+
+class ProposalHandler(BaseHandler):
+    def post(self):
+        payload = self.body()
+        self.require(payload, "story", "team", "duration", "budget")
+        self.submit("proposal", {
+            "story": payload["story"],
+            "team": payload["team"],
+            "duration": payload["duration"],
+            "budget": payload["budget"],
+            "force_refresh": bool(payload.get("force_refresh")),
+        })
+
+
+class ExpandHandler(BaseHandler):
+    async def post(self):
+        payload = self.body()
+        self.require(payload, "item")
+        self.finish(await self.run(self.client.expand_proposal, payload["item"]))
+
+
+class FeasibilityHandler(BaseHandler):
+    async def post(self):
+        payload = self.body()
+        self.require(payload, "genre", "story", "team", "duration", "budget")
+        result = await self.run(
+            lambda: self.client.evaluate_specific_genre(
+                payload["genre"], payload["story"], payload["team"], payload["duration"], payload["budget"],
+                force_refresh=bool(payload.get("force_refresh")),
+            )
+        )
+        self.finish(result or {"status": "error", "reason": "evaluation failed"})
+
+
+class FeasibilityMatrixHandler(BaseHandler):
+    async def post(self):
+        payload = self.body()
+        self.require(payload, "genres", "story", "team", "duration", "budget")
+        constraints = {key: payload[key] for key in ("story", "team", "duration", "budget")}
+        rows = await self.run(
+            lambda: self.client.evaluate_genres_batch(
+                payload["genres"], constraints, force_refresh=bool(payload.get("force_refresh"))
+            )
+        )
+        self.finish({"rows": rows})
+
+
+class WikiHandler(BaseHandler):
+    async def get(self, genre):
+        self.finish(await self.run(self.client.get_genre_wiki_info, genre))
+
+
+class ItemJobHandler(BaseHandler):
+    """POST {item} (plus img_b64 for pdf) -> 202 with a job id."""
+
+    def initialize(self, client, executor, kind):
+        super().initialize(client, executor)
+        self.kind = kind
+
+    def post(self):
+        payload = self.body()
+        self.require(payload, "item")
+        job = {"item": payload["item"]}
+        if self.kind == "pdf":
+            job["img_b64"] = payload.get("img_b64")
+        self.submit(self.kind, job)
+
+
+class JobHandler(BaseHandler):
+    async def get(self, job_id):
+        # ?wait=<seconds> long-polls until the job finishes.
+        try:
+            wait = min(max(float(self.get_query_argument("wait", 0) or 0), 0.0), 60.0)
+        except ValueError:
+            raise tornado.web.HTTPError(400, reason="wait must be a number of seconds")
+        job = self.client.jobs.get(job_id)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + wait
+        while job and job["state"] in ("queued", "running") and loop.time() < deadline:
+            await asyncio.sleep(0.25)
+            job = self.client.jobs.get(job_id)
+        if job is None:
+            raise tornado.web.HTTPError(404, reason="unknown job")
+        status = {key: job[key] for key in ("id", "kind", "state", "progress", "message", "error")}
+        if job["state"] == "done":
+            if job["kind"] in MEDIA_RESULTS:
+                status["result_url"] = f"/jobs/{job_id}/result"
+            else:
+                status["result"] = job["result"]
+        self.finish(status)
+
+    def delete(self, job_id):
+        self.finish({"cancelled": self.client.jobs.cancel(job_id)})
+
+
+class JobResultHandler(BaseHandler):
+    async def get(self, job_id):
+        job = self.client.jobs.get(job_id)
+        if job is None:
+            raise tornado.web.HTTPError(404, reason="unknown job")
+        if job["state"] != "done":
+            raise tornado.web.HTTPError(409, reason=f"job is {job['state']}")
+        if job["kind"] not in MEDIA_RESULTS:
+            self.finish({"result": job["result"]})
+            return
+        data = base64.b64decode(job["result"] or "")
+        self.set_header("Content-Type", MEDIA_RESULTS[job["kind"]](data))
+        self.set_header("Content-Length", str(len(data)))
+        if job["kind"] == "pdf":
+            self.set_header("Content-Disposition", f'attachment; filename="{job_id}.pdf"')
+        # Chunked writes so large audio/PDF bodies don't sit in the output buffer whole.
+        for start in range(0, len(data), STREAM_CHUNK):
+            self.write(data[start:start + STREAM_CHUNK])
+            await self.flush()
+        self.finish()
+
+
+def make_app(client=None, workers=None):
+    """One GameAIClient (and its caches, job queue and prefetcher) shared by every caller."""
+    if client is None:
+        client = GameAIClient(os.environ.get("GOOGLE_API_KEY"), os.environ.get("HF_TOKEN"))
+    if workers is None:
+        try:
+            workers = int(os.environ.get("API_WORKERS", 8))
+        except (TypeError, ValueError):
+            workers = 8
+    shared = {"client": client, "executor": ThreadPoolExecutor(max_workers=max(1, workers))}
+    return tornado.web.Application([
+        (r"/health", HealthHandler, shared),
+        (r"/proposals", ProposalHandler, shared),
+        (r"/proposals/expand", ExpandHandler, shared),
+        (r"/feasibility", FeasibilityHandler, shared),
+        (r"/feasibility/matrix", FeasibilityMatrixHandler, shared),
+        (r"/wiki/([^/]+)", WikiHandler, shared),
+        (r"/images", ItemJobHandler, dict(shared, kind="cover")),
+        (r"/music", ItemJobHandler, dict(shared, kind="music")),
+        (r"/gdd", ItemJobHandler, dict(shared, kind="pdf")),
+        (r"/jobs/([0-9a-f]+)", JobHandler, shared),
+        (r"/jobs/([0-9a-f]+)/result", JobResultHandler, shared),
+    ])
+
+
+def main(argv=None):
+    from dotenv import load_dotenv
+
+    # Before argparse, so API_HOST / API_PORT from .env become the defaults.
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Headless HTTP API around GameAIClient.")
+    parser.add_argument("--host", default=os.environ.get("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("API_PORT", 8600)))
+    args = parser.parse_args(argv)
+
+    app = make_app()
+    app.listen(args.port, address=args.host)
+    print(f"GameAIClient API listening on http://{args.host}:{args.port}")
+    tornado.ioloop.IOLoop.current().start()
+
+
+if __name__ == "__main__":
+    main()
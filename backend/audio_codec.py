@@ -0,0 +1,162 @@
+import functools
+import io
+import os
+import shutil
+import subprocess
+import wave
+
+# codec -> (soundfile format, soundfile subtype, ffmpeg args, mime type)
+CODECS = {
+    "opus": ("OGG", "OPUS", ["-c:a", "libopus", "-ar", "48000", "-f", "ogg"], "audio/ogg"),
+    "ogg": ("OGG", "VORBIS", ["-c:a", "libvorbis", "-f", "ogg"], "audio/ogg"),
+    "flac": ("FLAC", "PCM_16", ["-c:a", "flac", "-f", "flac"], "audio/flac"),
+    "wav": (None, None, None, "audio/wav"),
+}
+# Sample rates libsndfile's Opus encoder accepts; MusicGen's 32 kHz is not one of them.
+OPUS_RATES = (8000, 12000, 16000, 24000, 48000)
+
+# Outcome of the most recent encode_audio call, reported by get_music_diagnostics.
+_LAST_ENCODE = {}
+
+
+def pcm16_to_wav(pcm_bytes, channels, sample_rate):
+    """Interleaved 16-bit PCM -> WAV container bytes."""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav_file:
+        wav_file.setnchannels(channels)
+        wav_file.setsampwidth(2)
+        wav_file.setframerate(sample_rate)
+        wav_file.writeframes(pcm_bytes)
+    return buffer.getvalue()
+
+
+def sniff_mime(data):
+    """MIME type from the container magic bytes; audio/wav when unknown."""
+    head = bytes(data[:64]) if data else b""
+    if head.startswith(b"fLaC"):
+        return "audio/flac"
+    if head.startswith(b"OggS"):
+        return "audio/ogg"
+    if head.startswith(b"ID3") or head[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "audio/mpeg"
+    return "audio/wav"
+
+
+@functools.lru_cache(maxsize=1)
+def _soundfile():
+    try:
+        import soundfile
+        return soundfile
+    except Exception:
+        return None
+
+
+def available_encoders():
+    """Codecs each local encoder can produce; WAV needs no encoder."""
+    encoders = {"wav": ["builtin"]}
+    soundfile = _soundfile()
+    for codec, (fmt, subtype, _, _) in CODECS.items():
+        if fmt is None:
+            continue
+        if soundfile is not None and soundfile.check_format(fmt, subtype):
+            encoders.setdefault(codec, []).append("soundfile")
+        if shutil.which("ffmpeg"):
+            encoders.setdefault(codec, []).append("ffmpeg")
+    return encoders
+
+
+def _resample(samples, source_rate, target_rate):
+    """Band-limited FFT resample of int16 frames along axis 0."""
+    import numpy as np
+
+    frames = samples.shape[0]
+    target_frames = int(round(frames * target_rate / source_rate))
+    spectrum = np.fft.rfft(samples.astype(np.float32), axis=0)
+    resampled = np.fft.irfft(spectrum, n=target_frames, axis=0) * (target_frames / frames)
+    return np.clip(np.round(resampled), -32768, 32767).astype(np.int16)
+
+
+def _encode_with_soundfile(wav_bytes, codec, bitrate_kbps):
+    """
+    libsndfile has no kbps setting for lossy codecs, only a 0..1
+    compression_level (Vorbis quality / Opus bitrate between its per-channel
+    limits). bitrate_kbps is mapped onto it linearly, so the output rate only
+    approximates the request; ffmpeg honours it exactly.
+    """
+    soundfile = _soundfile()
+    fmt, subtype, _, _ = CODECS[codec]
+    if soundfile is None or not soundfile.check_format(fmt, subtype):
+        return None
+    samples, sample_rate = soundfile.read(io.BytesIO(wav_bytes), dtype="int16")
+    if codec == "opus" and sample_rate not in OPUS_RATES:
+        samples, sample_rate = _resample(samples, sample_rate, 48000), 48000
+    options = {}
+    if codec in ("opus", "ogg"):
+        options["compression_level"] = max(0.0, min(1.0, 1.0 - bitrate_kbps / 256.0))
+    buffer = io.BytesIO()
+    try:
+        soundfile.write(buffer, samples, sample_rate, format=fmt, subtype=subtype, **options)
+    except TypeError:
+        buffer = io.BytesIO()
+        soundfile.write(buffer, samples, sample_rate, format=fmt, subtype=subtype)
+    return buffer.getvalue()
+
+
+def _encode_with_ffmpeg(wav_bytes, codec, bitrate_kbps, timeout=30):
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return None
+    args = list(CODECS[codec][2])
+    if codec in ("opus", "ogg"):
+        args[2:2] = ["-b:a", f"{bitrate_kbps}k"]
+    result = subprocess.run(
+        [ffmpeg, "-hide_banner", "-loglevel", "error", "-f", "wav", "-i", "pipe:0", *args, "pipe:1"],
+        input=wav_bytes, capture_output=True, timeout=timeout, check=False,
+    )
+    if result.returncode != 0 or not result.stdout:
+        raise RuntimeError(result.stderr.decode("utf-8", "replace").strip() or "ffmpeg failed")
+    return result.stdout
+
+
+def encode_audio(wav_bytes, codec=None, bitrate_kbps=None):
+    """
+    Re-encodes a WAV clip with the first local encoder that supports `codec`
+    (MUSIC_AUDIO_CODEC, default opus) at MUSIC_AUDIO_BITRATE kbps (default 96)
+    for lossy codecs. Returns (bytes, mime); falls back to the WAV input
+    with a warning when no encoder is installed or all of them fail.
+    """
+    codec = (codec or os.environ.get("MUSIC_AUDIO_CODEC", "opus")).lower()
+    if bitrate_kbps is None:
+        try:
+            bitrate_kbps = int(os.environ.get("MUSIC_AUDIO_BITRATE", 96))
+        except (TypeError, ValueError):
+            bitrate_kbps = 96
+    if not wav_bytes or codec not in CODECS or codec == "wav":
+        return wav_bytes, "audio/wav"
+
+    errors = []
+    for name, encoder in (("soundfile", _encode_with_soundfile), ("ffmpeg", _encode_with_ffmpeg)):
+        try:
+            encoded = encoder(wav_bytes, codec, bitrate_kbps)
+        except Exception as exc:
+            print(f"Audio encoding ({codec}, {name}) failed: {exc}")
+            errors.append(f"{name}: {exc}")
+            continue
+        if encoded:
+            _record_encode(codec, name, None)
+            return encoded, CODECS[codec][3]
+
+    reason = "; ".join(errors) or "no encoder installed (pip install soundfile, or put ffmpeg on PATH)"
+    print(f"Warning: {codec} encoding unavailable, serving WAV: {reason}")
+    _record_encode(codec, "wav", reason)
+    return wav_bytes, "audio/wav"
+
+
+def _record_encode(codec, encoder, fallback_reason):
+    _LAST_ENCODE.clear()
+    _LAST_ENCODE.update({"requested": codec, "encoder": encoder, "fallback": fallback_reason})
+
+
+def last_encode():
+    """The requested codec, the encoder that produced it ('wav' on fallback) and why it fell back."""
+    return dict(_LAST_ENCODE)
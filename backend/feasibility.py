@@ -0,0 +1,252 @@
+import json
+import re
+import sys
+
+# Per-genre production complexity (1 = tiny hypercasual scope, 10 = MMO scale),
+# matching aliases and a default core loop used for instant verdicts.
+GENRE_RULES = {
+    "hypercasual": {
+        "complexity": 1.0,
+        "aliases": ["hypercasual", "hyper casual", "hyper-casual"],
+        "core_loop": "One-touch action, instant fail/retry, score chase with light meta progression.",
+        "references": ["Flappy Bird", "Crossy Road"],
+    },
+    "idle clicker": {
+        "complexity": 1.0,
+        "aliases": ["idle", "clicker", "incremental"],
+        "core_loop": "Tap to earn, buy generators, automate income, prestige to reset with multipliers.",
+        "references": ["Cookie Clicker", "Adventure Capitalist"],
+    },
+    "puzzle": {
+        "complexity": 1.2,
+        "aliases": ["puzzle", "match-3", "match 3", "sokoban"],
+        "core_loop": "Read the board, plan a solution, execute moves, unlock the next handcrafted level.",
+        "references": ["Baba Is You", "The Witness"],
+    },
+    "visual novel": {
+        "complexity": 1.5,
+        "aliases": ["visual novel", "interactive fiction", "dating sim"],
+        "core_loop": "Read scenes, make branching choices, track relationships, unlock alternate endings.",
+        "references": ["Doki Doki Literature Club!", "Steins;Gate"],
+    },
+    "platformer": {
+        "complexity": 2.0,
+        "aliases": ["platformer", "platforming", "jump"],
+        "core_loop": "Traverse hazards with tight movement, collect optional pickups, beat escalating levels.",
+        "references": ["Celeste", "Super Meat Boy"],
+    },
+    "tower defense": {
+        "complexity": 2.0,
+        "aliases": ["tower defense", "tower defence", "td"],
+        "core_loop": "Place and upgrade towers along a path, survive waves, spend earnings between rounds.",
+        "references": ["Bloons TD 6", "Kingdom Rush"],
+    },
+    "deckbuilder": {
+        "complexity": 2.5,
+        "aliases": ["deckbuilder", "deck-builder", "deck builder", "card battler", "card game"],
+        "core_loop": "Draft cards after fights, build synergies, battle encounters, push deeper into the run.",
+        "references": ["Slay the Spire", "Monster Train"],
+    },
+    "roguelike": {
+        "complexity": 3.0,
+        "aliases": ["roguelike", "roguelite", "rogue-like", "rogue-lite"],
+        "core_loop": "Enter a procedural run, gather upgrades, die, keep meta unlocks, try again.",
+        "references": ["Hades", "The Binding of Isaac"],
+    },
+    "metroidvania": {
+        "complexity": 4.0,
+        "aliases": ["metroidvania"],
+        "core_loop": "Explore an interconnected map, gain abilities, backtrack to open gated areas.",
+        "references": ["Hollow Knight", "Ori and the Blind Forest"],
+    },
+    "turn-based strategy": {
+        "complexity": 4.0,
+        "aliases": ["turn-based strategy", "turn based strategy", "tactics", "4x", "strategy"],
+        "core_loop": "Position units, resolve turns, manage resources, capture objectives across a campaign.",
+        "references": ["Into the Breach", "XCOM 2"],
+    },
+    "survival horror": {
+        "complexity": 5.0,
+        "aliases": ["survival horror", "horror"],
+        "core_loop": "Explore under threat, scavenge scarce resources, solve puzzles, evade or fight enemies.",
+        "references": ["Resident Evil 2", "Amnesia: The Dark Descent"],
+    },
+    "rpg": {
+        "complexity": 6.0,
+        "aliases": ["rpg", "role-playing", "role playing", "jrpg", "crpg"],
+        "core_loop": "Take quests, fight encounters, level characters, make story choices, gear up.",
+        "references": ["Disco Elysium", "Cyberpunk 2077"],
+    },
+    "fps": {
+        "complexity": 7.0,
+        "aliases": ["fps", "first-person shooter", "first person shooter", "shooter"],
+        "core_loop": "Move through combat spaces, aim and shoot, manage ammo and cover, clear objectives.",
+        "references": ["DOOM (2016)", "Ultrakill"],
+    },
+    "moba": {
+        "complexity": 9.0,
+        "aliases": ["moba", "arena battle"],
+        "core_loop": "Pick a hero, farm lanes, team-fight for objectives, destroy the enemy base.",
+        "references": ["Dota 2", "League of Legends"],
+    },
+    "mmorpg": {
+        "complexity": 10.0,
+        "aliases": ["mmorpg", "mmo", "massively multiplayer"],
+        "core_loop": "Quest and grind with other players, join guilds, raid, trade in a persistent world.",
+        "references": ["World of Warcraft", "Old School RuneScape"],
+    },
+}
+
+# Full-game thresholds scale with complexity; the rules only answer when the
+# constraints clear a threshold by MARGIN, everything in between goes to the model.
+FULL_GAME_BUDGET_PER_COMPLEXITY = 5000
+FULL_GAME_PERSON_MONTHS_PER_COMPLEXITY = 6
+MIN_FULL_GAME_MONTHS = 6
+HEAVY_GENRE_COMPLEXITY = 5.0
+# Vertical-slice floor for heavy genres: $5k (survival horror) up to $10k (MMORPG),
+# so it fires inside the $1k-$100k range the app's budget controls offer.
+MIN_VIABLE_BUDGET_PER_COMPLEXITY = 1000
+MIN_VIABLE_PERSON_MONTHS_PER_COMPLEXITY = 0.5
+MARGIN = 1.5
+
+
+def match_genre(genre):
+    """Returns the GENRE_RULES key for a free-text genre name, or None."""
+    text = " ".join(re.findall(r"[a-z0-9\-;]+", str(genre or "").lower()))
+    best_key, best_len = None, 0
+    for key, rule in GENRE_RULES.items():
+        for alias in rule["aliases"]:
+            if re.search(rf"(?<![a-z]){re.escape(alias)}(?![a-z])", text) and len(alias) > best_len:
+                best_key, best_len = key, len(alias)
+    return best_key
+
+
+def _to_number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def prescreen(genre, team, duration, budget):
+    """
+    Table-driven feasibility check. Returns {"status", "reason", "rule"} for
+    clear-cut cases ("impossible" or "feasible_game") and None when the
+    constraints are ambiguous or the genre is unknown.
+    """
+    key = match_genre(genre)
+    team, duration, budget = _to_number(team), _to_number(duration), _to_number(budget)
+    if key is None or None in (team, duration, budget):
+        return None
+
+    complexity = GENRE_RULES[key]["complexity"]
+    capacity = team * duration
+
+    min_budget = MIN_VIABLE_BUDGET_PER_COMPLEXITY * complexity
+    min_capacity = MIN_VIABLE_PERSON_MONTHS_PER_COMPLEXITY * complexity
+    if capacity < min_capacity:
+        return {
+            "status": "impossible",
+            "reason": (
+                f"A {genre} project needs at least {min_capacity:g} person-months even for a "
+                f"prototype; {team:g} people x {duration:g} months gives {capacity:g}."
+            ),
+            "rule": key,
+        }
+    if complexity >= HEAVY_GENRE_COMPLEXITY and budget < min_budget:
+        return {
+            "status": "impossible",
+            "reason": (
+                f"{genre} is a high-complexity genre; ${budget:,.0f} is below the ${min_budget:,.0f} "
+                "floor needed for even a vertical slice (servers, assets, tooling)."
+            ),
+            "rule": key,
+        }
+
+    game_budget = FULL_GAME_BUDGET_PER_COMPLEXITY * complexity * MARGIN
+    game_capacity = FULL_GAME_PERSON_MONTHS_PER_COMPLEXITY * complexity * MARGIN
+    if budget >= game_budget and capacity >= game_capacity and duration > MIN_FULL_GAME_MONTHS:
+        return {
+            "status": "feasible_game",
+            "reason": (
+                f"${budget:,.0f} and {capacity:g} person-months over {duration:g} months comfortably "
+                f"exceed the ${game_budget:,.0f} / {game_capacity:g} person-month bar for a full {genre} release."
+            ),
+            "rule": key,
+        }
+    return None
+
+
+def build_rule_result(verdict, genre, story, team, duration, budget):
+    """
+    Wraps a prescreen verdict in the evaluate_specific_genre response format.
+    A feasible_game verdict carries a summary card (no details); it is
+    expanded on demand like any other summary proposal.
+    """
+    result = {"status": verdict["status"], "reason": verdict["reason"], "source": "rules"}
+    if verdict["status"] != "feasible_game":
+        return result
+
+    rule = GENRE_RULES[verdict["rule"]]
+    result["data"] = {
+        "name": f"{genre} Project",
+        "reason": verdict["reason"],
+        "cycle": f"{duration} months (Full Release)",
+        "visual_prompt": f"{genre} video game key art, {story}",
+        "classic_references": [{"title": title, "url": "#"} for title in rule["references"]],
+        "category": "achievable",
+        "constraints": {"story": story, "team": team, "duration": duration, "budget": budget},
+    }
+    return result
+
+
+def evaluate_prescreen(records):
+    """
+    Offline comparison of prescreen verdicts against cached model verdicts.
+    `records` are dicts with genre, team, duration, budget and the model's status.
+    """
+    total = decided = agreed = 0
+    confusion = {}
+    for record in records:
+        model_status = record.get("status")
+        if not model_status:
+            continue
+        total += 1
+        verdict = prescreen(
+            record.get("genre"), record.get("team"), record.get("duration"), record.get("budget")
+        )
+        rule_status = verdict["status"] if verdict else "defer"
+        confusion[(rule_status, model_status)] = confusion.get((rule_status, model_status), 0) + 1
+        if verdict:
+            decided += 1
+            agreed += int(rule_status == model_status)
+
+    return {
+        "total": total,
+        "decided": decided,
+        "coverage": (decided / total) if total else 0.0,
+        "agreement": (agreed / decided) if decided else 0.0,
+        "confusion": confusion,
+    }
+
+
+def load_verdicts(path):
+    records = []
+    with open(path, "r", encoding="utf-8") as handle:
+        for line in handle:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python -m backend.feasibility <verdicts.jsonl>")
+        sys.exit(2)
+    report = evaluate_prescreen(load_verdicts(sys.argv[1]))
+    print(f"records:   {report['total']}")
+    print(f"coverage:  {report['coverage']:.1%} answered locally ({report['decided']})")
+    print(f"agreement: {report['agreement']:.1%} with model verdicts")
+    for (rule_status, model_status), count in sorted(report["confusion"].items()):
+        print(f"  rules={rule_status:<14} model={model_status:<14} {count}")
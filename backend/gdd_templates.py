@@ -0,0 +1,147 @@
+import functools
+import html
+import re
+from string import Template
+
+from backend.music_profile import get_default_classifier
+from backend.pdf_generator import build_sections
+
+# Style families for the HTML GDD export. Colours and fonts stay within what
+# xhtml2pdf renders reliably (flat colours, core PDF fonts).
+THEMES = {
+    "minimal": {
+        "background": "#ffffff", "text": "#1f2937", "accent": "#2563eb", "panel": "#f1f5f9",
+        "border": "#cbd5e1", "heading_font": "Helvetica", "body_font": "Helvetica",
+    },
+    "cyberpunk": {
+        "background": "#0b0f1a", "text": "#e2e8f0", "accent": "#ff2bd6", "panel": "#111827",
+        "border": "#22d3ee", "heading_font": "Courier", "body_font": "Helvetica",
+    },
+    "fantasy": {
+        "background": "#f6ecd2", "text": "#3b2f1e", "accent": "#8b1e1e", "panel": "#efe0b9",
+        "border": "#a07a3c", "heading_font": "Times", "body_font": "Times",
+    },
+    "horror": {
+        "background": "#0d0d0d", "text": "#d4d4d4", "accent": "#b91c1c", "panel": "#1a1a1a",
+        "border": "#450a0a", "heading_font": "Times", "body_font": "Helvetica",
+    },
+    "scifi": {
+        "background": "#0f172a", "text": "#e2e8f0", "accent": "#38bdf8", "panel": "#1e293b",
+        "border": "#334155", "heading_font": "Helvetica", "body_font": "Helvetica",
+    },
+    "retro": {
+        "background": "#1b1b3a", "text": "#fef3c7", "accent": "#facc15", "panel": "#2a2a5a",
+        "border": "#f97316", "heading_font": "Courier", "body_font": "Courier",
+    },
+    "cozy": {
+        "background": "#fffaf0", "text": "#44403c", "accent": "#c2410c", "panel": "#fdebd3",
+        "border": "#e7c9a0", "heading_font": "Times", "body_font": "Helvetica",
+    },
+}
+
+DEFAULT_THEME = "minimal"
+
+# Music classifier label -> theme, used when no model picks the theme.
+THEME_FOR_LABEL = {
+    "horror": "horror",
+    "cyberpunk": "cyberpunk",
+    "fantasy": "fantasy",
+    "strategy": "minimal",
+    "retro_arcade": "retro",
+    "cozy": "cozy",
+    "action": "scifi",
+}
+
+ALLOWED_FONTS = ("Helvetica", "Times", "Courier")
+_HEX_COLOR = re.compile(r"^#[0-9a-fA-F]{6}$")
+
+_PAGE = Template("""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<style>
+@page { size: a4 portrait; margin: 1.6cm; background-color: $background; }
+body { background-color: $background; color: $text; font-family: $body_font; font-size: 11pt; }
+h1 { font-family: $heading_font; color: $accent; font-size: 28pt; text-align: center; margin: 0; }
+h2 { font-family: $heading_font; color: $accent; font-size: 15pt; border-bottom: 1px solid $border;
+     padding-bottom: 3px; margin-top: 18px; }
+.subtitle { text-align: center; color: $border; letter-spacing: 3px; font-size: 10pt; }
+.cover { text-align: center; margin: 18px 0; }
+.section { background-color: $panel; border-left: 4px solid $accent; padding: 8px 12px; }
+li { margin-bottom: 3px; }
+</style>
+</head>
+<body>
+""")
+
+_BODY = Template("""<p class="subtitle">GAME DESIGN SPECIFICATION</p>
+<h1>$title</h1>
+$cover
+$sections
+</body>
+</html>
+""")
+
+_COVER = Template('<div class="cover"><img src="data:image/png;base64,$img_b64" width="420"></div>')
+_SECTION = Template('<h2>$title</h2>\n<div class="section">$body</div>')
+
+
+def _escape(value):
+    return html.escape(str(value)).replace("\n", "<br/>")
+
+
+def sanitize_overrides(overrides):
+    """Keeps only colour/font tweaks the templates know how to apply."""
+    clean = {}
+    for key, value in (overrides or {}).items():
+        if key in ("background", "text", "accent", "panel", "border") and _HEX_COLOR.match(str(value)):
+            clean[key] = str(value)
+        elif key in ("heading_font", "body_font") and value in ALLOWED_FONTS:
+            clean[key] = value
+    return clean
+
+
+@functools.lru_cache(maxsize=64)
+def _compiled_page(theme, overrides):
+    """Theme CSS substituted once; only the body placeholders remain per render."""
+    palette = dict(THEMES.get(theme, THEMES[DEFAULT_THEME]), **dict(overrides))
+    return Template(_PAGE.substitute(palette).replace("$", "$$") + _BODY.template)
+
+
+def pick_theme(data):
+    """Local theme choice from the music profile classifier; no model call."""
+    _, confidence, label = get_default_classifier().classify(data)
+    if confidence < 0.5:
+        return DEFAULT_THEME
+    return THEME_FOR_LABEL.get(label, DEFAULT_THEME)
+
+
+def render_sections(data, enrichment=None):
+    parts = []
+    for title, content, list_mode in build_sections(data, enrichment):
+        if list_mode:
+            if isinstance(content, (list, tuple)):
+                items = [item for item in content if item not in (None, "")]
+            else:
+                items = [content] if content else []
+            if not items:
+                continue
+            body = "<ul>" + "".join(f"<li>{_escape(item)}</li>" for item in items) + "</ul>"
+        else:
+            if not content:
+                continue
+            body = f"<p>{_escape(content)}</p>"
+        parts.append(_SECTION.substitute(title=_escape(title), body=body))
+    return "\n".join(parts)
+
+
+def render_gdd_html(data, enrichment=None, theme=None, img_b64=None, overrides=None):
+    """Fills the themed GDD template from the game data and GDD enrichment."""
+    data = data if isinstance(data, dict) else {}
+    theme = theme if theme in THEMES else pick_theme(data)
+    page = _compiled_page(theme, tuple(sorted(sanitize_overrides(overrides).items())))
+    return page.substitute(
+        title=_escape(data.get("name", "Untitled")),
+        cover=_COVER.substitute(img_b64=img_b64) if img_b64 else "",
+        sections=render_sections(data, enrichment),
+    )
@@ -0,0 +1,182 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import subprocess
+import sys
+import time
+
+# CPU performance profiles for the local music backends (LOCAL_MUSIC_PROFILE).
+PROFILES = {
+    "default": {"quantize": False, "dtype": None, "inference_mode": False, "tune_threads": False},
+    "fast": {"quantize": False, "dtype": None, "inference_mode": True, "tune_threads": True},
+    "int8": {"quantize": True, "dtype": None, "inference_mode": True, "tune_threads": True},
+    "bf16": {"quantize": False, "dtype": "bfloat16", "inference_mode": True, "tune_threads": True},
+}
+
+_THREADS_CONFIGURED = False
+
+
+def get_profile(name=None):
+    name = name or os.environ.get("LOCAL_MUSIC_PROFILE", "fast")
+    if name not in PROFILES:
+        print(f"Unknown LOCAL_MUSIC_PROFILE '{name}', using 'fast'")
+        name = "fast"
+    return dict(PROFILES[name], name=name)
+
+
+def cpu_quota():
+    """CPUs available to this process, honouring cgroup v2/v1 quotas and affinity."""
+    limits = []
+    try:
+        with open("/sys/fs/cgroup/cpu.max", "r", encoding="utf-8") as handle:
+            quota, period = handle.read().split()[:2]
+        if quota != "max":
+            limits.append(int(quota) / int(period))
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us", "r", encoding="utf-8") as handle:
+                quota = int(handle.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us", "r", encoding="utf-8") as handle:
+                period = int(handle.read())
+            if quota > 0 and period > 0:
+                limits.append(quota / period)
+        except (OSError, ValueError):
+            pass
+    try:
+        limits.append(len(os.sched_getaffinity(0)))
+    except (AttributeError, OSError):
+        limits.append(os.cpu_count() or 1)
+    return max(1, int(math.ceil(min(limits))))
+
+
+def configure_threads(profile):
+    """Sets torch intra/inter-op threads once per process from the CPU quota."""
+    global _THREADS_CONFIGURED
+    if _THREADS_CONFIGURED or not profile.get("tune_threads"):
+        return
+    try:
+        import torch
+    except Exception:
+        return
+
+    cpus = cpu_quota()
+    intra = int(os.environ.get("LOCAL_MUSIC_THREADS", cpus))
+    inter = int(os.environ.get("LOCAL_MUSIC_INTEROP_THREADS", max(1, cpus // 4)))
+    torch.set_num_threads(max(1, intra))
+    try:
+        torch.set_num_interop_threads(max(1, inter))
+    except RuntimeError:
+        # Inter-op threads can only be set before the first parallel op.
+        pass
+    _THREADS_CONFIGURED = True
+
+
+def optimize_module(module, profile, device=None):
+    """Applies eval mode, dynamic int8 quantization of Linear layers or a bf16 cast."""
+    import torch
+
+    module.eval()
+    on_cpu = not device or str(device).startswith("cpu")
+    if profile.get("quantize") and on_cpu:
+        module = torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+    elif profile.get("dtype") == "bfloat16":
+        module = module.to(torch.bfloat16)
+    return module
+
+
+def inference_context(profile):
+    try:
+        import torch
+    except Exception:
+        return contextlib.nullcontext()
+    if profile.get("inference_mode"):
+        return torch.inference_mode()
+    return torch.no_grad()
+
+
+def _peak_rss_mb():
+    """Peak RSS in MB, or None where the resource module is missing (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0, 1)
+
+
+def _run_one(profile_name, backend, model_name, duration, prompt):
+    os.environ["LOCAL_MUSIC_PROFILE"] = profile_name
+    from backend import text_to_music
+
+    generate = {
+        "audiocraft": text_to_music._generate_with_audiocraft,
+        "transformers": text_to_music._generate_with_transformers,
+    }[backend]
+
+    start = time.perf_counter()
+    generate(prompt, 1, model_name, "cpu")
+    load_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    audio_bytes, error = generate(prompt, duration, model_name, "cpu")
+    elapsed = time.perf_counter() - start
+    return {
+        "profile": profile_name,
+        "ok": bool(audio_bytes),
+        "error": error,
+        "warmup_s": round(load_seconds, 2),
+        "generate_s": round(elapsed, 2),
+        "rtf": round(elapsed / duration, 3),
+        "peak_rss_mb": _peak_rss_mb(),
+        "threads": cpu_quota(),
+    }
+
+
+def benchmark(profiles, backend="transformers", model_name="small", duration=4,
+              prompt="calm synthwave loop, game background music"):
+    """Runs each profile in a fresh subprocess and returns one result dict per profile."""
+    results = []
+    for name in profiles:
+        command = [
+            sys.executable, "-m", "backend.inference_profile", "--run-one", name,
+            "--backend", backend, "--model", model_name, "--duration", str(duration),
+            "--prompt", prompt,
+        ]
+        completed = subprocess.run(command, capture_output=True, text=True)
+        lines = [line for line in completed.stdout.splitlines() if line.startswith("{")]
+        if lines:
+            results.append(json.loads(lines[-1]))
+        else:
+            results.append({"profile": name, "ok": False, "error": completed.stderr.strip()[-300:]})
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark local MusicGen CPU profiles.")
+    parser.add_argument("--profiles", default=",".join(PROFILES))
+    parser.add_argument("--backend", default="transformers", choices=["transformers", "audiocraft"])
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--duration", type=float, default=4)
+    parser.add_argument("--prompt", default="calm synthwave loop, game background music")
+    parser.add_argument("--run-one", default=None)
+    args = parser.parse_args(argv)
+
+    if args.run_one:
+        result = _run_one(args.run_one, args.backend, args.model, args.duration, args.prompt)
+        print(json.dumps(result))
+        return
+
+    print(f"{'profile':<10}{'ok':<6}{'RTF':>8}{'gen s':>9}{'peak RSS MB':>14}")
+    for result in benchmark(args.profiles.split(","), args.backend, args.model, args.duration, args.prompt):
+        if not result.get("ok"):
+            print(f"{result['profile']:<10}{'no':<6}  {result.get('error')}")
+            continue
+        print(
+            f"{result['profile']:<10}{'yes':<6}{result['rtf']:>8}{result['generate_s']:>9}"
+            f"{str(result['peak_rss_mb'] or 'n/a'):>14}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    idempotency_key TEXT UNIQUE,
+    session TEXT,
+    payload TEXT NOT NULL,
+    state TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, created_at);
+CREATE INDEX IF NOT EXISTS jobs_session ON jobs (session, kind, created_at);
+"""
+
+# States a job can be reattached to; failed/cancelled jobs are resubmitted instead.
+LIVE_STATES = ("queued", "running", "done")
+
+
+class Requeue(Exception):
+    """
+    Raised by a handler that is waiting on work running elsewhere: the job
+    goes back to the queue behind the jobs queued before this attempt, and
+    the worker is freed for them.
+    """
+
+
+def default_db_path():
+    return os.environ.get(
+        "JOB_DB_PATH",
+        os.path.join(os.path.expanduser("~"), ".cache", "gamerecommend", "jobs.sqlite3"),
+    )
+
+
+def idempotency_key(kind, payload):
+    """Stable key for a job: kind plus the canonical JSON of its payload."""
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return f"{kind}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:32]}"
+
+
+def _owner_alive(owner, current_owner):
+    """
+    Whether the process that claimed a job may still be running it. A job
+    stamped with this process's PID but another queue's owner id is from a
+    previous process whose PID was reused (e.g. PID 1 after a container
+    restart), so it is dead.
+    """
+    pid = str(owner).split(":")[0]
+    if pid == str(os.getpid()):
+        return owner == current_owner
+    try:
+        os.kill(int(pid), 0)
+    except (ValueError, ProcessLookupError):
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """
+    SQLite-backed job queue with an in-process worker pool. Jobs survive
+    Streamlit reruns and browser refreshes: callers resubmit with the same
+    idempotency key and get the running (or finished) job back instead of
+    starting the work again. Handlers are fn(payload, progress) returning a
+    JSON-serialisable result; progress(fraction, message) updates the row.
+    Workers claim the lowest-priority kind first, then the oldest job, and
+    re-run the recovery/retention pass every `cleanup_interval` seconds.
+    """
+
+    def __init__(self, path=None, workers=None, retention_hours=None, cleanup_interval=None):
+        def env_number(name, default, cast):
+            try:
+                return cast(os.environ.get(name, default))
+            except (TypeError, ValueError):
+                return default
+
+        self.path = path or default_db_path()
+        self.workers = workers if workers is not None else env_number("JOB_WORKERS", 2, int)
+        self.retention_hours = (
+            retention_hours if retention_hours is not None else env_number("JOB_RETENTION_HOURS", 24.0, float)
+        )
+        self.cleanup_interval = (
+            cleanup_interval if cleanup_interval is not None else env_number("JOB_CLEANUP_INTERVAL", 600.0, float)
+        )
+        self.owner = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._handlers = {}
+        self._priorities = {}
+        self._last_recover = time.monotonic()
+        self._lock = threading.Lock()
+        self._wake = threading.Condition()
+        self._threads = []
+        if self.path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+        self._recover()
+
+    def _recover(self):
+        """Requeues jobs whose worker process died; drops finished jobs past retention."""
+        cutoff = time.time() - self.retention_hours * 3600
+        with self._lock:
+            rows = self._conn.execute("SELECT id, owner FROM jobs WHERE state = 'running'").fetchall()
+            for row in rows:
+                if not _owner_alive(row["owner"], self.owner):
+                    self._conn.execute(
+                        "UPDATE jobs SET state = 'queued', owner = NULL, progress = 0 WHERE id = ?", (row["id"],)
+                    )
+            self._conn.execute(
+                "DELETE FROM jobs WHERE state IN ('done', 'failed', 'cancelled') AND finished_at < ?", (cutoff,)
+            )
+
+    def _maybe_recover(self):
+        """Runs _recover when cleanup_interval has passed since the last run."""
+        with self._lock:
+            if time.monotonic() - self._last_recover < self.cleanup_interval:
+                return
+            self._last_recover = time.monotonic()
+        self._recover()
+
+    def register(self, kind, handler, priority=0):
+        """Handles `kind` jobs; lower priorities are claimed first."""
+        self._handlers[kind] = handler
+        self._priorities[kind] = priority
+        self._ensure_workers()
+        with self._wake:
+            self._wake.notify_all()
+
+    def _ensure_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, kind, payload, key=None, session=None, replace=False):
+        """
+        Returns the job id for (kind, payload). An existing queued, running or
+        finished job with the same idempotency key is reused unless replace.
+        """
+        key = key or idempotency_key(kind, payload)
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT id, state FROM jobs WHERE idempotency_key = ?", (key,)).fetchone()
+            if row and row["state"] in LIVE_STATES and not replace:
+                if session is not None:
+                    self._conn.execute("UPDATE jobs SET session = ? WHERE id = ?", (session, row["id"]))
+                return row["id"]
+            if row:
+                # Keep the old row for history but free the key for the new attempt.
+                self._conn.execute("UPDATE jobs SET idempotency_key = NULL WHERE id = ?", (row["id"],))
+            job_id = uuid.uuid4().hex
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, idempotency_key, session, payload, state, created_at) "
+                "VALUES (?, ?, ?, ?, ?, 'queued', ?)",
+                (job_id, kind, key, session, json.dumps(payload, default=str), now),
+            )
+        with self._wake:
+            self._wake.notify()
+        return job_id
+
+    def _decode(self, row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"]) if job["payload"] else None
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._decode(row)
+
+    def find(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE idempotency_key = ?", (key,)).fetchone()
+        return self._decode(row)
+
+    def latest(self, session, kind):
+        """Most recent job of `kind` submitted from `session`."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM jobs WHERE session = ? AND kind = ? ORDER BY created_at DESC LIMIT 1",
+                (session, kind),
+            ).fetchone()
+        return self._decode(row)
+
+    def wait(self, job_id, timeout=None, poll=0.25):
+        """Blocks until the job finishes or timeout passes; returns the job row."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["state"] in ("done", "failed", "cancelled"):
+                return job
+            if deadline is not None and time.monotonic() >= deadline:
+                return job
+            time.sleep(poll)
+
+    def cancel(self, job_id):
+        """Cancels a queued job; a running job finishes but is marked cancelled."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET state = 'cancelled', finished_at = ? WHERE id = ? AND state IN ('queued', 'running')",
+                (time.time(), job_id),
+            )
+            return cursor.rowcount > 0
+
+    def _claim(self):
+        kinds = list(self._handlers)
+        if not kinds:
+            return None
+        marks = ",".join("?" * len(kinds))
+        ranks = " ".join("WHEN ? THEN ?" for _ in kinds)
+        rank_args = [value for kind in kinds for value in (kind, self._priorities.get(kind, 0))]
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                # A requeued job waits behind everything queued before its last attempt started.
+                row = self._conn.execute(
+                    f"SELECT * FROM jobs WHERE state = 'queued' AND kind IN ({marks}) "
+                    f"ORDER BY CASE kind {ranks} END, COALESCE(started_at, created_at) LIMIT 1",
+                    kinds + rank_args,
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET state = 'running', owner = ?, started_at = ? WHERE id = ?",
+                        (self.owner, time.time(), row["id"]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._decode(row)
+
+    def _progress(self, job_id):
+        def report(fraction, message=None):
+            with self._lock:
+                self._conn.execute(
+                    "UPDATE jobs SET progress = ?, message = COALESCE(?, message) WHERE id = ? AND state = 'running'",
+                    (max(0.0, min(1.0, float(fraction))), message, job_id),
+                )
+        return report
+
+    def _finish(self, job_id, result=None, error=None):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, progress = 1, result = ?, error = ?, finished_at = ? "
+                "WHERE id = ? AND state = 'running'",
+                (
+                    "failed" if error else "done",
+                    None if error else json.dumps(result, default=str),
+                    error,
+                    time.time(),
+                    job_id,
+                ),
+            )
+
+    def _requeue(self, job_id):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = 'queued', owner = NULL WHERE id = ? AND state = 'running'", (job_id,)
+            )
+        with self._wake:
+            self._wake.notify()
+
+    def _run(self):
+        while True:
+            self._maybe_recover()
+            job = self._claim()
+            if job is None:
+                # Other processes can enqueue too, so poll as well as waiting for a notify.
+                with self._wake:
+                    self._wake.wait(timeout=1.0)
+                continue
+            handler = self._handlers[job["kind"]]
+            try:
+                result = handler(job["payload"], self._progress(job["id"]))
+            except Requeue:
+                self._requeue(job["id"])
+                continue
+            except Exception as exc:
+                print(f"Job {job['kind']} {job['id']} failed: {exc}")
+                self._finish(job["id"], error=str(exc) or exc.__class__.__name__)
+                continue
+            self._finish(job["id"], result=result)
+
+    def stats(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT state, COUNT(*) AS n FROM jobs GROUP BY state").fetchall()
+        stats = {state: 0 for state in ("queued", "running", "done", "failed", "cancelled")}
+        stats.update({row["state"]: row["n"] for row in rows})
+        stats["workers"] = self.workers
+        return stats
+
+
+_QUEUE = None
+_QUEUE_LOCK = threading.Lock()
+
+
+def get_job_queue():
+    """Process-wide queue, so every Streamlit session shares one worker pool."""
+    global _QUEUE
+    with _QUEUE_LOCK:
+        if _QUEUE is None:
+            _QUEUE = JobQueue()
+        return _QUEUE
@@ -0,0 +1,136 @@
+import contextlib
+import threading
+import time
+from collections import OrderedDict
+
+
+def estimate_size(value):
+    """Approximate bytes held by a model (or tuple of models) from its tensors."""
+    if isinstance(value, (tuple, list)):
+        return sum(estimate_size(item) for item in value)
+
+    modules = [value] if hasattr(value, "parameters") else [
+        getattr(value, name) for name in ("lm", "compression_model") if hasattr(value, name)
+    ]
+    total, seen = 0, set()
+    for module in modules:
+        tensors = list(module.parameters())
+        if hasattr(module, "buffers"):
+            tensors += list(module.buffers())
+        for tensor in tensors:
+            pointer = tensor.data_ptr()
+            if pointer in seen:
+                continue
+            seen.add(pointer)
+            total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class ModelRegistry:
+    """
+    Process-wide model cache with a memory budget and LRU eviction.
+    Models are borrowed with `acquire`, which reference-counts them so an
+    entry is never evicted mid-generation, and loads each key at most once
+    even when several threads ask for it concurrently.
+    """
+
+    def __init__(self, budget_bytes):
+        self.budget_bytes = budget_bytes
+        self._entries = OrderedDict()
+        self._loading = set()
+        self._cond = threading.Condition()
+        self._hits = 0
+        self._loads = 0
+        self._load_failures = 0
+        self._evictions = 0
+
+    def _used_bytes(self):
+        return sum(entry["size"] for entry in self._entries.values())
+
+    def _evict(self):
+        for key in list(self._entries):
+            if self._used_bytes() <= self.budget_bytes:
+                break
+            entry = self._entries[key]
+            if entry["refs"] > 0 or len(self._entries) == 1:
+                continue
+            del self._entries[key]
+            self._evictions += 1
+            print(f"Model registry evicted {key} ({entry['size'] / 2**20:.0f} MB)")
+
+    def _checkout(self, key, loader):
+        with self._cond:
+            while key in self._loading:
+                self._cond.wait()
+            entry = self._entries.get(key)
+            if entry:
+                entry["refs"] += 1
+                entry["last_used"] = time.time()
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry["value"], None
+            self._loading.add(key)
+
+        value, error = None, None
+        try:
+            value, error = loader()
+        except Exception as exc:
+            error = f"model_load_failed: {exc}"
+        finally:
+            with self._cond:
+                self._loading.discard(key)
+                if value is not None:
+                    self._entries[key] = {
+                        "value": value,
+                        "size": estimate_size(value),
+                        "refs": 1,
+                        "last_used": time.time(),
+                    }
+                    self._loads += 1
+                    self._evict()
+                else:
+                    self._load_failures += 1
+                self._cond.notify_all()
+        return value, error
+
+    def release(self, key):
+        with self._cond:
+            entry = self._entries.get(key)
+            if entry and entry["refs"] > 0:
+                entry["refs"] -= 1
+            self._evict()
+
+    @contextlib.contextmanager
+    def acquire(self, key, loader):
+        """Yields (model, error); the model stays pinned until the block exits."""
+        value, error = self._checkout(key, loader)
+        try:
+            yield value, error
+        finally:
+            if value is not None:
+                self.release(key)
+
+    def clear(self):
+        with self._cond:
+            for key in [key for key, entry in self._entries.items() if entry["refs"] == 0]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._cond:
+            return {
+                "budget_mb": round(self.budget_bytes / 2**20, 1),
+                "used_mb": round(self._used_bytes() / 2**20, 1),
+                "hits": self._hits,
+                "loads": self._loads,
+                "load_failures": self._load_failures,
+                "evictions": self._evictions,
+                "models": [
+                    {
+                        "key": "/".join(str(part) for part in key if part),
+                        "size_mb": round(entry["size"] / 2**20, 1),
+                        "refs": entry["refs"],
+                        "idle_s": round(time.time() - entry["last_used"], 1),
+                    }
+                    for key, entry in self._entries.items()
+                ],
+            }
@@ -0,0 +1,293 @@
+import argparse
+import copy
+import json
+import math
+import os
+import re
+
+# Genre -> music profile table. Keyword weights are the classifier's features;
+# extend the table or tune the weights from cached Gemini profiles.
+PROFILE_TABLE = [
+    {
+        "label": "horror",
+        "keywords": {"horror": 3.0, "survival": 1.5, "nightmare": 2.0, "eerie": 2.0, "haunted": 2.0,
+                     "ghost": 1.5, "dread": 2.0, "zombie": 1.5, "monster": 1.0, "dark": 1.0, "asylum": 1.5},
+        "profile": {
+            "mood": "tense, eerie",
+            "tempo_bpm": 80,
+            "energy": 0.35,
+            "instruments": ["low strings", "ambient drones", "sub bass"],
+            "style_tags": ["dark", "atmospheric", "minimal"],
+            "notes": "Sparse pulses and distant textures.",
+        },
+    },
+    {
+        "label": "cyberpunk",
+        "keywords": {"cyberpunk": 3.0, "sci-fi": 2.0, "sci fi": 2.0, "scifi": 2.0, "futuristic": 2.0, "neon": 2.5,
+                     "hacker": 1.5, "android": 1.5, "cyber": 2.0, "dystopia": 1.5, "megacity": 1.5,
+                     "detective": 0.5, "synth": 1.0},
+        "profile": {
+            "mood": "edgy, futuristic",
+            "tempo_bpm": 120,
+            "energy": 0.7,
+            "instruments": ["synth bass", "analog pads", "electronic drums"],
+            "style_tags": ["neon", "noir", "electronic"],
+            "notes": "Driving groove with shimmering synth layers.",
+        },
+    },
+    {
+        "label": "fantasy",
+        "keywords": {"fantasy": 3.0, "magic": 2.0, "myth": 1.5, "kingdom": 1.5, "dragon": 2.0,
+                     "knight": 1.5, "quest": 1.0, "wizard": 1.5, "sword": 1.0, "elf": 1.5, "epic": 1.0},
+        "profile": {
+            "mood": "epic, hopeful",
+            "tempo_bpm": 100,
+            "energy": 0.6,
+            "instruments": ["strings", "choir", "orchestral percussion"],
+            "style_tags": ["cinematic", "orchestral", "heroic"],
+            "notes": "Warm harmonies and sweeping melodies.",
+        },
+    },
+    {
+        "label": "strategy",
+        "keywords": {"strategy": 2.5, "tactics": 2.0, "turn-based": 2.0, "management": 2.0,
+                     "simulation": 2.0, "tycoon": 2.0, "colony": 1.5, "city": 1.0, "resource": 1.0,
+                     "economy": 1.5, "builder": 1.0},
+        "profile": {
+            "mood": "focused, measured",
+            "tempo_bpm": 90,
+            "energy": 0.45,
+            "instruments": ["piano", "soft synths", "light percussion"],
+            "style_tags": ["minimal", "ambient", "steady"],
+            "notes": "Subtle layers with a steady pulse.",
+        },
+    },
+    {
+        "label": "retro_arcade",
+        "keywords": {"arcade": 2.5, "retro": 2.0, "pixel": 2.0, "platformer": 2.0, "8-bit": 3.0,
+                     "chiptune": 3.0, "jump": 1.0, "score": 1.0, "hypercasual": 1.5, "runner": 1.5},
+        "profile": {
+            "mood": "playful, upbeat",
+            "tempo_bpm": 140,
+            "energy": 0.8,
+            "instruments": ["square lead", "chip bass", "noise drums"],
+            "style_tags": ["chiptune", "retro", "bouncy"],
+            "notes": "Bright arpeggios over a punchy chip groove.",
+        },
+    },
+    {
+        "label": "cozy",
+        "keywords": {"cozy": 3.0, "farming": 2.5, "farm": 2.0, "puzzle": 1.5, "relaxing": 2.5,
+                     "garden": 2.0, "village": 1.5, "cat": 1.0, "cafe": 2.0, "wholesome": 2.5,
+                     "visual novel": 1.0, "romance": 1.5},
+        "profile": {
+            "mood": "warm, gentle",
+            "tempo_bpm": 85,
+            "energy": 0.3,
+            "instruments": ["acoustic guitar", "piano", "soft pads"],
+            "style_tags": ["lo-fi", "acoustic", "cozy"],
+            "notes": "Light, unhurried melodies with a soft backbeat.",
+        },
+    },
+    {
+        "label": "action",
+        "keywords": {"shooter": 2.5, "fps": 2.5, "combat": 1.5, "battle": 1.5, "racing": 2.5,
+                     "arena": 1.5, "war": 1.5, "moba": 2.0, "boss": 1.0, "fight": 1.5, "roguelike": 1.0},
+        "profile": {
+            "mood": "intense, driving",
+            "tempo_bpm": 150,
+            "energy": 0.9,
+            "instruments": ["distorted guitar", "synth bass", "heavy drums"],
+            "style_tags": ["aggressive", "rock", "electronic"],
+            "notes": "Relentless rhythm section with bold hooks.",
+        },
+    },
+]
+
+DEFAULT_PROFILE = {
+    "mood": "cinematic, neutral",
+    "tempo_bpm": 100,
+    "energy": 0.5,
+    "instruments": ["synth pads", "drums", "bass"],
+    "style_tags": ["ambient", "cinematic", "modern"],
+    "notes": "Balanced, unobtrusive background loop.",
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:-[a-z0-9]+)*")
+
+
+def _tokenize(text):
+    tokens = _TOKEN_RE.findall(str(text or "").lower())
+    return tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+
+
+def game_text(data):
+    details = data.get("details", {}) if isinstance(data, dict) else {}
+    return " ".join(
+        str(value)
+        for value in [
+            data.get("name", "") if isinstance(data, dict) else "",
+            details.get("release_blurb", ""),
+            details.get("core_loop", ""),
+            details.get("storyline", ""),
+        ]
+    )
+
+
+class MusicProfileClassifier:
+    """
+    Weighted-keyword classifier over PROFILE_TABLE. Keyword weights are scaled
+    by an IDF factor (keywords shared by several genres count less) and term
+    counts are log-damped; a softmax over the scores gives the confidence.
+    """
+
+    def __init__(self, table=None, temperature=1.5):
+        self.table = copy.deepcopy(table or PROFILE_TABLE)
+        self.temperature = temperature
+        self._rebuild()
+
+    def _rebuild(self):
+        document_freq = {}
+        for entry in self.table:
+            for keyword in entry["keywords"]:
+                document_freq[keyword] = document_freq.get(keyword, 0) + 1
+        count = len(self.table)
+        self._index = {}
+        for position, entry in enumerate(self.table):
+            for keyword, weight in entry["keywords"].items():
+                idf = math.log(1.0 + count / document_freq[keyword])
+                self._index.setdefault(keyword, []).append((position, weight * idf))
+
+    def scores(self, text):
+        counts = {}
+        for token in _tokenize(text):
+            if token in self._index:
+                counts[token] = counts.get(token, 0) + 1
+        scores = [0.0] * len(self.table)
+        for token, tf in counts.items():
+            for position, weight in self._index[token]:
+                scores[position] += weight * (1.0 + math.log(tf))
+        return scores
+
+    def classify(self, data):
+        """Returns (profile, confidence, label); the default profile when nothing matches."""
+        scores = self.scores(game_text(data))
+        best = max(range(len(scores)), key=scores.__getitem__) if scores else None
+        if best is None or scores[best] <= 0:
+            return copy.deepcopy(DEFAULT_PROFILE), 0.0, "default"
+
+        # The zero-score "neutral" option keeps lone weak matches from looking certain.
+        exps = [math.exp(score / self.temperature) for score in scores] + [1.0]
+        confidence = exps[best] / sum(exps)
+        entry = self.table[best]
+        return copy.deepcopy(entry["profile"]), confidence, entry["label"]
+
+    def nearest_label(self, profile):
+        """Maps an LLM-produced profile onto the closest table entry."""
+        def words(value):
+            if isinstance(value, (list, tuple)):
+                value = " ".join(str(item) for item in value)
+            return set(_TOKEN_RE.findall(str(value or "").lower()))
+
+        target = words(profile.get("mood")) | words(profile.get("style_tags")) | words(profile.get("instruments"))
+        try:
+            tempo = float(profile.get("tempo_bpm") or 100)
+        except (TypeError, ValueError):
+            tempo = 100.0
+
+        best_label, best_score = None, None
+        for entry in self.table:
+            candidate = entry["profile"]
+            overlap = len(target & (
+                words(candidate["mood"]) | words(candidate["style_tags"]) | words(candidate["instruments"])
+            ))
+            score = overlap - abs(tempo - candidate["tempo_bpm"]) / 40.0
+            if best_score is None or score > best_score:
+                best_label, best_score = entry["label"], score
+        return best_label
+
+    def tune(self, records, epochs=5, learning_rate=0.3):
+        """
+        Perceptron-style tuning from cached (game data, Gemini profile) records.
+        Returns accuracy against the mapped labels before and after tuning.
+        """
+        labelled = [
+            (game_text(record["data"]), self.nearest_label(record["profile"]))
+            for record in records
+            if isinstance(record.get("data"), dict) and isinstance(record.get("profile"), dict)
+        ]
+        positions = {entry["label"]: position for position, entry in enumerate(self.table)}
+
+        def accuracy():
+            if not labelled:
+                return 0.0
+            correct = 0
+            for text, label in labelled:
+                scores = self.scores(text)
+                correct += int(self.table[max(range(len(scores)), key=scores.__getitem__)]["label"] == label)
+            return correct / len(labelled)
+
+        before = accuracy()
+        for _ in range(epochs):
+            for text, label in labelled:
+                scores = self.scores(text)
+                predicted = max(range(len(scores)), key=scores.__getitem__)
+                target = positions[label]
+                if predicted == target and scores[target] > 0:
+                    continue
+                tokens = set(token for token in _tokenize(text) if len(token) > 3)
+                for token in tokens:
+                    keywords = self.table[target]["keywords"]
+                    keywords[token] = keywords.get(token, 0.0) + learning_rate
+                    if predicted != target and token in self.table[predicted]["keywords"]:
+                        wrong = self.table[predicted]["keywords"]
+                        wrong[token] = max(0.0, wrong[token] - learning_rate)
+                self._rebuild()
+        return {"records": len(labelled), "accuracy_before": before, "accuracy_after": accuracy()}
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as handle:
+            json.dump(self.table, handle, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "r", encoding="utf-8") as handle:
+            return cls(table=json.load(handle))
+
+
+_DEFAULT_CLASSIFIER = None
+
+
+def get_default_classifier():
+    """Shared classifier, loaded from MUSIC_PROFILE_WEIGHTS when set."""
+    global _DEFAULT_CLASSIFIER
+    if _DEFAULT_CLASSIFIER is None:
+        path = os.environ.get("MUSIC_PROFILE_WEIGHTS")
+        if path and os.path.exists(path):
+            _DEFAULT_CLASSIFIER = MusicProfileClassifier.load(path)
+        else:
+            _DEFAULT_CLASSIFIER = MusicProfileClassifier()
+    return _DEFAULT_CLASSIFIER
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tune the music profile classifier from logged Gemini profiles.")
+    parser.add_argument("log", help="JSONL written via MUSIC_PROFILE_LOG")
+    parser.add_argument("output", help="weights file to load via MUSIC_PROFILE_WEIGHTS")
+    parser.add_argument("--epochs", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with open(args.log, "r", encoding="utf-8") as handle:
+        records = [json.loads(line) for line in handle if line.strip()]
+    classifier = get_default_classifier()
+    classifier = MusicProfileClassifier(table=classifier.table, temperature=classifier.temperature)
+    report = classifier.tune(records, epochs=args.epochs)
+    classifier.save(args.output)
+    print(
+        f"tuned on {report['records']} records: accuracy "
+        f"{report['accuracy_before']:.1%} -> {report['accuracy_after']:.1%}"
+    )
+
+
+if __name__ == "__main__":
+    main()
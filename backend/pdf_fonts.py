@@ -0,0 +1,147 @@
+import copy
+import functools
+import io
+import os
+import threading
+import time
+
+from fontTools import ttLib
+from fpdf import FPDF
+
+UNICODE_FAMILY = "gddsans"
+FALLBACK_FAMILY = "gddfallback"
+
+# (regular, bold) pairs tried in order when PDF_UNICODE_FONT is not set.
+FONT_CANDIDATES = [
+    ("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/dejavu/DejaVuSans.ttf", "/usr/share/fonts/dejavu/DejaVuSans-Bold.ttf"),
+    ("/usr/share/fonts/truetype/noto/NotoSans-Regular.ttf", "/usr/share/fonts/truetype/noto/NotoSans-Bold.ttf"),
+    ("/usr/share/fonts/noto/NotoSans-Regular.ttf", "/usr/share/fonts/noto/NotoSans-Bold.ttf"),
+    (
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Regular.ttf",
+        "/usr/share/fonts/truetype/liberation/LiberationSans-Bold.ttf",
+    ),
+    ("/Library/Fonts/Arial Unicode.ttf", None),
+    ("C:\\Windows\\Fonts\\arial.ttf", "C:\\Windows\\Fonts\\arialbd.ttf"),
+]
+FALLBACK_CANDIDATES = [
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/noto-cjk/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/noto/NotoColorEmoji.ttf",
+]
+
+_TEMPLATE = None
+_TEMPLATE_BUILT = False
+_PARSES = 0
+_LOCK = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def unicode_font_paths():
+    """(regular, bold, [fallbacks]) from PDF_UNICODE_FONT* or system fonts; regular is None if none found."""
+    candidates = [(os.environ.get("PDF_UNICODE_FONT"), os.environ.get("PDF_UNICODE_FONT_BOLD"))]
+    regular, bold = next(
+        ((regular, bold) for regular, bold in candidates + FONT_CANDIDATES if regular and os.path.exists(regular)),
+        (None, None),
+    )
+    if not regular:
+        return None, None, []
+    bold = bold if bold and os.path.exists(bold) else regular
+    configured = os.environ.get("PDF_UNICODE_FALLBACK_FONTS")
+    fallbacks = configured.split(os.pathsep) if configured else FALLBACK_CANDIDATES
+    fallbacks = [path for path in fallbacks if path and os.path.exists(path)]
+    return regular, bold, fallbacks
+
+
+def _add_fonts(pdf, regular, bold, fallbacks):
+    """Parses and adds the faces with add_font; returns the fallback family names."""
+    pdf.add_font(UNICODE_FAMILY, "", regular)
+    pdf.add_font(UNICODE_FAMILY, "B", bold)
+    names = []
+    for index, path in enumerate(fallbacks):
+        name = f"{FALLBACK_FAMILY}{index}"
+        pdf.add_font(name, "", path)
+        names.append(name)
+    return names
+
+
+def _template():
+    """
+    (FPDF, fallback names, {path: bytes}) with every face parsed once per
+    process, or None when no Unicode font is usable.
+    """
+    global _TEMPLATE, _TEMPLATE_BUILT, _PARSES
+    with _LOCK:
+        if not _TEMPLATE_BUILT:
+            _TEMPLATE_BUILT = True
+            regular, bold, fallbacks = unicode_font_paths()
+            if regular:
+                try:
+                    template = FPDF()
+                    names = _add_fonts(template, regular, bold, fallbacks)
+                    _PARSES += 1
+                    data = {}
+                    for path in {regular, bold, *fallbacks}:
+                        with open(path, "rb") as handle:
+                            data[path] = handle.read()
+                    _TEMPLATE = (template, names, data)
+                except Exception as exc:
+                    print(f"Unicode font unavailable, using core fonts: {exc}")
+        return _TEMPLATE
+
+
+def register_unicode_fonts(pdf):
+    """
+    Adds the Unicode family (plus fallbacks) to `pdf`; returns its name, or
+    None for core fonts. Fonts are deep-copied from the process-wide template
+    (fpdf2 shares the parsed cmap and widths between copies), so exports
+    don't re-parse the faces.
+    """
+    template = _template()
+    if template is None:
+        return None
+    template_pdf, names, data = template
+    try:
+        if pdf.fonts:
+            # Font numbers follow registration order, so only a fresh document can take the copies.
+            regular, bold, fallbacks = unicode_font_paths()
+            names = _add_fonts(pdf, regular, bold, fallbacks)
+        else:
+            for fontkey, font in template_pdf.fonts.items():
+                clone = copy.deepcopy(font)
+                # fpdf2 subsets ttfont in place when writing, so each document opens its own.
+                clone.ttfont = ttLib.TTFont(
+                    io.BytesIO(data[str(font.ttffile)]), recalcTimestamp=False, lazy=True,
+                    fontNumber=font.collection_font_number,
+                )
+                pdf.fonts[fontkey] = clone
+        if names:
+            pdf.set_fallback_fonts(names, exact_match=False)
+    except Exception as exc:
+        print(f"Unicode font unavailable, using core fonts: {exc}")
+        return None
+    return UNICODE_FAMILY
+
+
+def cache_stats():
+    with _LOCK:
+        return {"template_parses": _PARSES, "faces": len(_TEMPLATE[0].fonts) if _TEMPLATE else 0}
+
+
+def main():
+    """Times two consecutive registrations; the second must not parse the faces again."""
+    timings = []
+    for _ in range(2):
+        started = time.perf_counter()
+        family = register_unicode_fonts(FPDF())
+        timings.append(time.perf_counter() - started)
+    stats = cache_stats()
+    print(
+        f"family={family} faces={stats['faces']} parses={stats['template_parses']} "
+        f"first={timings[0] * 1000:.1f} ms second={timings[1] * 1000:.1f} ms"
+    )
+    if stats["template_parses"] > 1:
+        raise SystemExit("fonts were parsed more than once")
+
+
+if __name__ == "__main__":
+    main()
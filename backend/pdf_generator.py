@@ -1,9 +1,12 @@
 from fpdf import FPDF
 from PIL import Image
-from xhtml2pdf import pisa
 import io
 import base64
+import functools
 import os
+from concurrent.futures import ProcessPoolExecutor
+from backend.pdf_fonts import register_unicode_fonts
+from backend.pdf_sandbox import convert_in_process, get_sandbox, sandbox_enabled
 
 
 def _safe_text(value):
@@ -18,6 +21,13 @@ def _latin1(value):
     return _safe_text(value).encode("latin-1", "replace").decode("latin-1")
 
 
+def _text(value):
+    """Text as the active font can encode it: as-is for the Unicode TTF, latin-1 for core fonts."""
+    if _font_family() == CORE_FAMILY:
+        return _latin1(value)
+    return _safe_text(value)
+
+
 def _normalize_list(value):
     if value is None:
         return []
@@ -26,59 +36,192 @@ def _normalize_list(value):
     return [value]
 
 
-def _write_section(pdf, title, content=None, list_mode=False):
+PAGE_MARGIN = 10
+BOTTOM_MARGIN = 15
+CORE_FAMILY = "Helvetica"
+HEADING_FONT = ("B", 14)
+BODY_FONT = ("", 11)
+# Words longer than this are measured per character, so huge spaceless runs don't flood the width cache.
+LONG_WORD_CHARS = 48
+_MEASURER = None
+_FAMILY = CORE_FAMILY
+_LAYOUT_POOL = None
+
+
+def _measurer():
+    global _MEASURER, _FAMILY
+    if _MEASURER is None:
+        measurer = FPDF()
+        measurer.set_margins(PAGE_MARGIN, PAGE_MARGIN)
+        _FAMILY = register_unicode_fonts(measurer) or CORE_FAMILY
+        _MEASURER = measurer
+    return _MEASURER
+
+
+def _font_family():
+    _measurer()
+    return _FAMILY
+
+
+@functools.lru_cache(maxsize=65536)
+def _text_width(font, text):
+    """Width of a word in mm, cached per (font, word) for the life of the process."""
+    measurer = _measurer()
+    measurer.set_font(*font)
+    return measurer.get_string_width(text)
+
+
+def _word_width(font, word):
+    """Cached width for normal words; long spaceless runs (e.g. CJK) are summed per character."""
+    if len(word) > LONG_WORD_CHARS:
+        return sum(_text_width(font, char) for char in word)
+    return _text_width(font, word)
+
+
+def _hard_break(word, font, max_width):
+    """Splits a word wider than a line into line-sized chunks in one pass over its characters."""
+    chunks, start, width = [], 0, 0.0
+    for index, char in enumerate(word):
+        char_width = _text_width(font, char)
+        if width + char_width > max_width and index > start:
+            chunks.append((word[start:index], width))
+            start, width = index, 0.0
+        width += char_width
+    chunks.append((word[start:], width))
+    return chunks
+
+
+def _wrap(text, font, max_width):
+    """Greedy word wrap equivalent to multi_cell's, using cached word widths."""
+    lines = []
+    space = _text_width(font, " ")
+    for paragraph in text.split("\n"):
+        line, width = [], 0.0
+        for word in paragraph.split(" "):
+            word_width = _word_width(font, word)
+            if word_width > max_width:
+                # Hard-break words longer than a whole line.
+                if line:
+                    lines.append(" ".join(line))
+                    line, width = [], 0.0
+                chunks = _hard_break(word, font, max_width)
+                lines.extend(chunk for chunk, _ in chunks[:-1])
+                word, word_width = chunks[-1]
+            extra = word_width + (space if line else 0.0)
+            if line and width + extra > max_width:
+                lines.append(" ".join(line))
+                line, width = [word], word_width
+            else:
+                line.append(word)
+                width += extra
+        lines.append(" ".join(line))
+    return lines
+
+
+def _layout_section(section):
+    """
+    Lays out one section into [(kind, text), ...] lines. Pure and picklable,
+    so sections can be laid out in a process pool and emitted in order.
+    """
+    title, content, list_mode = section
     if list_mode:
-        items = _normalize_list(content)
-        if not items:
+        paragraphs = [f"- {item}" for item in _normalize_list(content)]
+    else:
+        paragraphs = [content] if content else []
+    if not paragraphs:
+        return []
+
+    measurer = _measurer()
+    max_width = measurer.epw - 2 * measurer.c_margin
+    body_font = (_font_family(),) + BODY_FONT
+    lines = [("heading", _text(title))]
+    for paragraph in paragraphs:
+        lines.extend(("body", line) for line in _wrap(_text(paragraph), body_font, max_width))
+    return lines
+
+
+def _layout_workers():
+    try:
+        return int(os.environ.get("PDF_LAYOUT_WORKERS", 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+def _layout_pool(workers):
+    global _LAYOUT_POOL
+    if _LAYOUT_POOL is None:
+        _LAYOUT_POOL = ProcessPoolExecutor(max_workers=workers)
+    return _LAYOUT_POOL
+
+
+def layout_sections(sections, parallel=True):
+    """
+    Lays out every section, in PDF_LAYOUT_WORKERS processes when the text is
+    long enough (PDF_PARALLEL_MIN_CHARS) to pay for the hand-off.
+    """
+    workers = _layout_workers() if parallel else 0
+    try:
+        min_chars = int(os.environ.get("PDF_PARALLEL_MIN_CHARS", 20000))
+    except (TypeError, ValueError):
+        min_chars = 20000
+    total_chars = sum(len(_safe_text(content)) for _, content, _ in sections)
+    if workers > 1 and total_chars >= min_chars:
+        try:
+            return list(_layout_pool(workers).map(_layout_section, sections))
+        except Exception as exc:
+            print(f"Parallel PDF layout failed, laying out serially: {exc}")
+    return [_layout_section(section) for section in sections]
+
+
+def _render_toc(pdf, outline):
+    pdf.set_font(pdf.gdd_family, "B", 18)
+    pdf.cell(0, 14, "Contents", ln=True)
+    pdf.set_font(pdf.gdd_family, *BODY_FONT)
+    for section in outline:
+        link = pdf.add_link(page=section.page_number)
+        pdf.cell(pdf.epw - 20, 7, section.name, link=link)
+        pdf.cell(20, 7, str(section.page_number), align="R", ln=True, link=link)
+
+
+class _ManualPDF(FPDF):
+    gdd_family = CORE_FAMILY
+
+    def footer(self):
+        if self.page_no() == 1:
             return
-        pdf.set_font("Helvetica", "B", 14)
-        pdf.cell(0, 10, _latin1(title), ln=True)
-        pdf.set_font("Helvetica", "", 11)
-        for item in items:
-            pdf.multi_cell(0, 6, _latin1(f"- {item}"))
-        pdf.ln(3)
-        return
-    if not content:
+        self.set_y(-12)
+        self.set_font("Helvetica", "", 9)
+        self.set_text_color(120, 120, 120)
+        self.cell(0, 8, f"{self.page_no()} / {{nb}}", align="C")
+
+
+def _emit_lines(pdf, title, lines):
+    """
+    Writes pre-laid-out lines one cell each, with manual page breaks; the
+    line breaking already happened in _layout_section. cell() (unlike text())
+    switches to the fallback fonts for glyphs the main font lacks.
+    """
+    if not lines:
         return
-    pdf.set_font("Helvetica", "B", 14)
-    pdf.cell(0, 10, _latin1(title), ln=True)
-    pdf.set_font("Helvetica", "", 11)
-    pdf.multi_cell(0, 6, _latin1(content))
-    pdf.ln(3)
+    heights = [10 if kind == "heading" else 6 for kind, _ in lines]
+    # Break before recording the TOC entry, keeping the heading with its first line.
+    if pdf.get_y() + sum(heights[:2]) > pdf.page_break_trigger:
+        pdf.add_page()
+    pdf.start_section(_text(title))
+    for (kind, text), height in zip(lines, heights):
+        font = HEADING_FONT if kind == "heading" else BODY_FONT
+        if pdf.get_y() + height > pdf.page_break_trigger:
+            pdf.add_page()
+        pdf.set_font(pdf.gdd_family, *font)
+        pdf.cell(0, height, text, ln=True)
+    pdf.set_y(pdf.get_y() + 3)
 
-# Method A: Traditional FPDF manual typesetting
-def create_manual_pdf(data, img_b64=None, enrichment=None):
-    pdf = FPDF()
-    pdf.set_auto_page_break(auto=True, margin=15)
-    
-    pdf.add_page()
-    pdf.set_fill_color(15, 23, 42) 
-    pdf.rect(0, 0, 210, 297, 'F') 
-    
-    pdf.set_text_color(255, 255, 255)
-    pdf.set_font("Helvetica", 'B', 32)
-    pdf.set_y(80)
-    pdf.cell(0, 15, "GAME DESIGN", ln=True, align='C')
-    pdf.cell(0, 15, "SPECIFICATION", ln=True, align='C')
-    
-    pdf.set_font("Helvetica", '', 20)
-    pdf.ln(20)
-    
-    title = data.get('name', 'Untitled').encode('latin-1', 'replace').decode('latin-1')
-    pdf.cell(0, 10, title, ln=True, align='C')
-    
-    if img_b64:
-        try:
-            img_data = base64.b64decode(img_b64)
-            img_io = io.BytesIO(img_data)
-            img = Image.open(img_io)
-            pdf.image(img, x=45, y=160, w=120) 
-        except Exception:
-            pass 
-            
-    pdf.add_page()
-    pdf.set_text_color(0, 0, 0)
-    
+
+def build_sections(data, enrichment=None):
+    """
+    Returns the GDD body as [(title, content, list_mode), ...], shared by the
+    FPDF layout and the HTML templates.
+    """
     details = data.get("details", {}) if isinstance(data, dict) else {}
     enrichment = enrichment if isinstance(enrichment, dict) else {}
 
@@ -194,51 +337,111 @@ def create_manual_pdf(data, img_b64=None, enrichment=None):
             else:
                 production_lines.append(str(phase))
 
-    _write_section(pdf, "1. Executive Summary", exec_summary)
-    _write_section(pdf, "2. Design Pillars", pillars, list_mode=True)
-    _write_section(pdf, "3. Target Audience & Experience", experience_text)
-    _write_section(pdf, "4. Narrative Overview", narrative_text)
-    _write_section(pdf, "5. Core Gameplay Loop", core_loop)
-    _write_section(pdf, "6. Key Features", key_features, list_mode=True)
-    _write_section(pdf, "7. Progression & Content Scope", scope_text)
-    _write_section(pdf, "8. Art & Audio Direction", art_audio_text)
-    _write_section(pdf, "9. UI/UX & Accessibility", ui_text)
-    _write_section(pdf, "10. Technical Scope", tech_scope)
-    _write_section(pdf, "11. Production Plan", production_lines, list_mode=True)
-    _write_section(pdf, "12. Schedule & Budget Outlook", schedule_text)
-    _write_section(pdf, "13. Risks & Mitigations", risks, list_mode=True)
-    _write_section(pdf, "14. Success Metrics", success_metrics, list_mode=True)
-    _write_section(pdf, "15. Monetization & Live Ops", "\n".join(filter(None, [monetization, live_ops])))
-    _write_section(pdf, "16. Marketing Hooks", marketing_hooks, list_mode=True)
-    _write_section(pdf, "17. References & Positioning", refs_text)
+    return [
+        ("1. Executive Summary", exec_summary, False),
+        ("2. Design Pillars", pillars, True),
+        ("3. Target Audience & Experience", experience_text, False),
+        ("4. Narrative Overview", narrative_text, False),
+        ("5. Core Gameplay Loop", core_loop, False),
+        ("6. Key Features", key_features, True),
+        ("7. Progression & Content Scope", scope_text, False),
+        ("8. Art & Audio Direction", art_audio_text, False),
+        ("9. UI/UX & Accessibility", ui_text, False),
+        ("10. Technical Scope", tech_scope, False),
+        ("11. Production Plan", production_lines, True),
+        ("12. Schedule & Budget Outlook", schedule_text, False),
+        ("13. Risks & Mitigations", risks, True),
+        ("14. Success Metrics", success_metrics, True),
+        ("15. Monetization & Live Ops", "\n".join(filter(None, [monetization, live_ops])), False),
+        ("16. Marketing Hooks", marketing_hooks, True),
+        ("17. References & Positioning", refs_text, False),
+    ]
+
+# Method A: Traditional FPDF manual typesetting
+def create_manual_pdf(data, img_b64=None, enrichment=None, parallel=True):
+    sections = build_sections(data, enrichment)
+    layouts = layout_sections(sections, parallel=parallel)
+
+    pdf = _ManualPDF()
+    pdf.gdd_family = register_unicode_fonts(pdf) or CORE_FAMILY
+    pdf.set_margins(PAGE_MARGIN, PAGE_MARGIN)
+    pdf.set_auto_page_break(auto=True, margin=BOTTOM_MARGIN)
+    
+    pdf.add_page()
+    pdf.set_fill_color(15, 23, 42) 
+    pdf.rect(0, 0, 210, 297, 'F') 
+    
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_font(pdf.gdd_family, 'B', 32)
+    pdf.set_y(80)
+    pdf.cell(0, 15, "GAME DESIGN", ln=True, align='C')
+    pdf.cell(0, 15, "SPECIFICATION", ln=True, align='C')
+    
+    pdf.set_font(pdf.gdd_family, '', 20)
+    pdf.ln(20)
+    
+    title = _text(data.get('name', 'Untitled'))
+    pdf.cell(0, 10, title, ln=True, align='C')
+    
+    if img_b64:
+        try:
+            img_data = base64.b64decode(img_b64)
+            img_io = io.BytesIO(img_data)
+            img = Image.open(img_io)
+            pdf.image(img, x=45, y=160, w=120) 
+        except Exception:
+            pass 
+            
+    pdf.add_page()
+    pdf.set_text_color(0, 0, 0)
+    pdf.insert_toc_placeholder(_render_toc)
+
+    for (title, _, _), lines in zip(sections, layouts):
+        _emit_lines(pdf, title, lines)
 
     pdf_output = pdf.output(dest='S')
     if isinstance(pdf_output, str):
         return pdf_output.encode('latin-1')
     return bytes(pdf_output)
 
+def _create_manual_pdf_job(document):
+    return create_manual_pdf(
+        document.get("data", {}),
+        document.get("img_b64"),
+        enrichment=document.get("enrichment"),
+        parallel=False,
+    )
+
+
+def create_manual_pdfs(documents, workers=None):
+    """
+    Batch export: [{"data", "img_b64", "enrichment"}, ...] -> [pdf bytes, ...],
+    one document per worker process.
+    """
+    workers = _layout_workers() if workers is None else workers
+    if workers > 1 and len(documents) > 1:
+        try:
+            return list(_layout_pool(workers).map(_create_manual_pdf_job, documents))
+        except Exception as exc:
+            print(f"Parallel PDF export failed, exporting serially: {exc}")
+    return [_create_manual_pdf_job(document) for document in documents]
+
 # Method B: HTML to PDF (AI Design Solution)
 def convert_html_to_pdf(html_content):
     """
     Use xhtml2pdf to convert the HTML string generated by AI into a PDF binary stream.
+    Runs in the sandboxed worker pool (time and memory limited, no network
+    fetches) unless PDF_SANDBOX=0. Returns b"" on failure so callers fall
+    back to create_manual_pdf.
     """
-    pdf_output = io.BytesIO()
-    
-    try:
-        pisa_status = pisa.CreatePDF(
-            io.StringIO(html_content),
-            dest=pdf_output
-        )
-        
-        if pisa_status.err:
-            print("PDF Generation Failed")
-            return b""
-            
-        return pdf_output.getvalue()
-        
-    except Exception as e:
-        print(f"转换异常: {e}")
+    if sandbox_enabled():
+        pdf_bytes, error = get_sandbox().convert(html_content)
+    else:
+        pdf_bytes, error = convert_in_process(html_content, os.environ.get("PDF_ASSET_DIR"))
+    if error:
+        print(f"PDF Generation Failed: {error}")
         return b""
+    return pdf_bytes
 
 # Fallback method: Should the AI fail to generate the HTML template
 def get_fallback_html(data):
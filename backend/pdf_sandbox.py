@@ -0,0 +1,225 @@
+import io
+import multiprocessing
+import os
+import queue
+import threading
+import time
+
+
+def _env_number(name, default, cast=float):
+    try:
+        return cast(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+def sandbox_enabled():
+    return os.environ.get("PDF_SANDBOX", "1") != "0"
+
+
+# Returned for refused resources: xhtml2pdf falls back to the original URI
+# when the callback returns nothing, so refusals map to an empty resource.
+BLOCKED_RESOURCE = "data:text/plain;base64,"
+
+
+def make_link_callback(asset_dir=None):
+    """
+    xhtml2pdf resource resolver: data URIs pass through, relative paths resolve
+    inside asset_dir (PDF_ASSET_DIR), everything else (http, file, absolute
+    paths) is refused so model-written HTML can't trigger fetches.
+    """
+    root = os.path.realpath(asset_dir) if asset_dir else None
+
+    def link_callback(uri, rel):
+        uri = str(uri or "")
+        if uri.startswith("data:"):
+            return uri
+        if root is None or "://" in uri or uri.startswith(("/", "\\", "file:")):
+            return BLOCKED_RESOURCE
+        path = os.path.realpath(os.path.join(root, uri))
+        if not path.startswith(root + os.sep) or not os.path.isfile(path):
+            return BLOCKED_RESOURCE
+        return path
+
+    return link_callback
+
+
+def convert_in_process(html_content, asset_dir=None):
+    """Runs pisa.CreatePDF with the restricted link_callback; returns (pdf_bytes, error)."""
+    from xhtml2pdf import pisa
+
+    pdf_output = io.BytesIO()
+    try:
+        status = pisa.CreatePDF(
+            io.StringIO(html_content),
+            dest=pdf_output,
+            link_callback=make_link_callback(asset_dir),
+        )
+    except MemoryError:
+        return b"", "memory_limit"
+    except Exception as exc:
+        return b"", f"conversion_failed: {exc}"
+    if status.err:
+        return b"", "conversion_failed: pisa reported errors"
+    return pdf_output.getvalue(), None
+
+
+def _worker_main(conn, memory_mb, asset_dir):
+    if memory_mb > 0:
+        try:
+            import resource
+            limit = int(memory_mb * 2**20)
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+        except (ImportError, ValueError, OSError):
+            pass
+    while True:
+        try:
+            html_content = conn.recv()
+        except EOFError:
+            return
+        if html_content is None:
+            return
+        conn.send(convert_in_process(html_content, asset_dir))
+
+
+class _Worker:
+    def __init__(self, context, memory_mb, asset_dir):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn, memory_mb, asset_dir), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks = 0
+
+    def alive(self):
+        return self.process.is_alive()
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.join(1)
+        except Exception:
+            pass
+        self.conn.close()
+
+
+class PdfSandbox:
+    """
+    Pool of worker subprocesses for HTML-to-PDF conversion. Each worker runs
+    under an address-space limit; a conversion that exceeds the wall-clock
+    timeout gets its worker killed and replaced. Workers are recycled after
+    max_tasks conversions. A conversion that waits longer than queue_timeout
+    (PDF_SANDBOX_QUEUE_TIMEOUT, default: the conversion timeout) for a free
+    worker fails with "sandbox_busy".
+    """
+
+    def __init__(self, workers=None, timeout=None, memory_mb=None, max_tasks=None, asset_dir=None,
+                 queue_timeout=None):
+        self.size = workers if workers is not None else _env_number("PDF_SANDBOX_WORKERS", 2, int)
+        self.timeout = timeout if timeout is not None else _env_number("PDF_SANDBOX_TIMEOUT", 20)
+        self.memory_mb = memory_mb if memory_mb is not None else _env_number("PDF_SANDBOX_MEMORY_MB", 1024)
+        self.max_tasks = max_tasks if max_tasks is not None else _env_number("PDF_SANDBOX_MAX_TASKS", 50, int)
+        self.asset_dir = asset_dir if asset_dir is not None else os.environ.get("PDF_ASSET_DIR")
+        if queue_timeout is None:
+            queue_timeout = _env_number("PDF_SANDBOX_QUEUE_TIMEOUT", self.timeout)
+        self.queue_timeout = queue_timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._started = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "conversions": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "memory_limit": 0,
+            "busy": 0,
+            "worker_restarts": 0,
+            "total_seconds": 0.0,
+        }
+
+    def _checkout(self):
+        """An idle (or fresh) worker, or None if none frees up within queue_timeout."""
+        with self._lock:
+            if self._started < self.size:
+                self._started += 1
+                return _Worker(self._context, self.memory_mb, self.asset_dir)
+        try:
+            worker = self._idle.get(timeout=self.queue_timeout)
+        except queue.Empty:
+            return None
+        if not worker.alive():
+            worker.kill()
+            with self._lock:
+                self._stats["worker_restarts"] += 1
+            return _Worker(self._context, self.memory_mb, self.asset_dir)
+        return worker
+
+    def _checkin(self, worker, healthy):
+        if not healthy or worker.tasks >= self.max_tasks:
+            worker.kill()
+            worker = _Worker(self._context, self.memory_mb, self.asset_dir)
+            if not healthy:
+                with self._lock:
+                    self._stats["worker_restarts"] += 1
+        self._idle.put(worker)
+
+    def _record(self, started, error):
+        with self._lock:
+            self._stats["conversions"] += 1
+            self._stats["total_seconds"] += time.perf_counter() - started
+            if error is None:
+                self._stats["succeeded"] += 1
+                return
+            self._stats["failed"] += 1
+            if error == "timeout":
+                self._stats["timeouts"] += 1
+            elif error == "memory_limit":
+                self._stats["memory_limit"] += 1
+            elif error == "sandbox_busy":
+                self._stats["busy"] += 1
+
+    def convert(self, html_content):
+        """Returns (pdf_bytes, error); error is None, 'timeout', 'memory_limit', 'sandbox_busy' or a message."""
+        started = time.perf_counter()
+        worker = self._checkout()
+        if worker is None:
+            self._record(started, "sandbox_busy")
+            return b"", "sandbox_busy"
+        healthy, result = True, (b"", None)
+        try:
+            worker.conn.send(html_content)
+            if worker.conn.poll(self.timeout):
+                result = worker.conn.recv()
+            else:
+                healthy, result = False, (b"", "timeout")
+        except (EOFError, OSError, BrokenPipeError) as exc:
+            healthy, result = False, (b"", f"worker_crashed: {exc}")
+        worker.tasks += 1
+        if result[1] == "memory_limit":
+            healthy = False
+        self._checkin(worker, healthy)
+        self._record(started, result[1])
+        return result
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        done = stats["conversions"]
+        stats["avg_seconds"] = round(stats.pop("total_seconds") / done, 3) if done else 0.0
+        stats["failure_rate"] = (stats["failed"] / done) if done else 0.0
+        stats.update(workers=self.size, timeout_s=self.timeout, queue_timeout_s=self.queue_timeout, memory_mb=self.memory_mb)
+        return stats
+
+
+_SANDBOX = None
+_SANDBOX_LOCK = threading.Lock()
+
+
+def get_sandbox():
+    global _SANDBOX
+    with _SANDBOX_LOCK:
+        if _SANDBOX is None:
+            _SANDBOX = PdfSandbox()
+        return _SANDBOX
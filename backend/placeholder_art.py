@@ -0,0 +1,163 @@
+import base64
+import functools
+import io
+import textwrap
+import zlib
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+from backend.music_profile import game_text, get_default_classifier
+from backend.pdf_fonts import unicode_font_paths
+
+# (sky top, sky bottom, accent, title colour) per music profile label, so the
+# placeholder cover and the fallback soundtrack agree on the genre.
+PALETTES = {
+    "horror": ((10, 8, 12), (58, 10, 14), (185, 28, 28), (236, 228, 228)),
+    "cyberpunk": ((12, 6, 38), (92, 14, 96), (34, 211, 238), (255, 43, 214)),
+    "fantasy": ((28, 44, 96), (214, 158, 96), (250, 232, 170), (255, 244, 214)),
+    "strategy": ((22, 40, 52), (64, 92, 84), (196, 170, 108), (240, 232, 210)),
+    "retro_arcade": ((24, 24, 58), (58, 24, 88), (250, 204, 21), (254, 243, 199)),
+    "cozy": ((255, 214, 170), (246, 176, 148), (255, 250, 240), (92, 56, 40)),
+    "action": ((20, 24, 40), (156, 48, 20), (251, 146, 60), (255, 255, 255)),
+    "default": ((30, 41, 59), (71, 85, 105), (148, 163, 184), (241, 245, 249)),
+}
+
+
+def pick_label(data=None, prompt=""):
+    """Genre label for the art: the music classifier over the game text (or the image prompt)."""
+    classifier = get_default_classifier()
+    text = game_text(data) if isinstance(data, dict) else ""
+    scores = classifier.scores(f"{text} {prompt or ''}")
+    best = max(range(len(scores)), key=scores.__getitem__) if scores else None
+    if best is None or scores[best] <= 0:
+        return "default"
+    return classifier.table[best]["label"]
+
+
+def _gradient(size, top, bottom):
+    height, width = size
+    t = np.linspace(0.0, 1.0, height, dtype=np.float32)[:, None, None]
+    column = (1.0 - t) * np.array(top, np.float32) + t * np.array(bottom, np.float32)
+    return np.broadcast_to(column, (height, width, 3)).copy()
+
+
+def _blend(canvas, mask, colour, strength=1.0):
+    mask = np.clip(mask * strength, 0.0, 1.0)[..., None]
+    canvas *= 1.0 - mask
+    canvas += mask * np.array(colour, np.float32)
+
+
+def _motif(canvas, label, accent, rng):
+    height, width, _ = canvas.shape
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    u, v = x / width, y / height
+
+    if label == "horror":
+        moon = np.hypot(u - 0.7, v - 0.22)
+        _blend(canvas, (moon < 0.09).astype(np.float32), (220, 214, 200), 0.9)
+        _blend(canvas, np.exp(-((moon - 0.09) ** 2) / 0.004), accent, 0.35)
+        vignette = np.hypot(u - 0.5, v - 0.5) * 1.6
+        canvas *= np.clip(1.1 - vignette, 0.15, 1.0)[..., None]
+        fog = np.sin(u * 9.0 + rng.uniform(0, 6)) * np.sin(v * 5.0) * 0.5 + 0.5
+        _blend(canvas, fog * (v > 0.6), (90, 80, 90), 0.25)
+    elif label == "cyberpunk":
+        horizon = 0.58
+        below = v > horizon
+        depth = np.where(below, (v - horizon) / (1.0 - horizon), 1.0) + 1e-3
+        rows = (np.abs(np.sin(np.pi * 6.0 / depth)) < 0.08) & (depth > 0.05)
+        cols = np.abs(np.sin(np.pi * 14.0 * (u - 0.5) / depth)) < 0.06
+        _blend(canvas, ((rows | cols) & below).astype(np.float32), accent, 0.85)
+        sun = (np.hypot(u - 0.5, (v - horizon) * 1.2) < 0.22) & ~below
+        stripes = np.sin(v * 120.0) > -0.3
+        _blend(canvas, (sun & stripes).astype(np.float32), (255, 120, 200), 0.9)
+    elif label == "fantasy":
+        stars = (rng.random((height, width)) > 0.9985) & (v < 0.5)
+        _blend(canvas, stars.astype(np.float32), accent)
+        for layer, shade in ((0.55, 0.45), (0.68, 0.25)):
+            phase = rng.uniform(0, 2 * np.pi, 3)
+            ridge = layer - 0.08 * (np.sin(u * 7 + phase[0]) + 0.5 * np.sin(u * 17 + phase[1])
+                                    + 0.25 * np.sin(u * 41 + phase[2]))
+            _blend(canvas, (v > ridge).astype(np.float32), (24, 30, 60), 1.0 - shade)
+    elif label == "strategy":
+        cell = 0.06
+        hex_u = (u / cell) % 1.0
+        hex_v = ((v / (cell * 0.866)) + np.floor(u / cell) * 0.5) % 1.0
+        lines = (np.minimum(hex_u, 1 - hex_u) < 0.04) | (np.minimum(hex_v, 1 - hex_v) < 0.04)
+        _blend(canvas, lines.astype(np.float32), accent, 0.35)
+        _blend(canvas, np.exp(-(np.hypot(u - 0.5, v - 0.45) ** 2) / 0.05), accent, 0.25)
+    elif label == "retro_arcade":
+        block = max(8, width // 24)
+        grid = rng.random((height // block + 1, width // block + 1)) > 0.86
+        pixels = np.kron(grid, np.ones((block, block)))[:height, :width]
+        _blend(canvas, pixels * (v < 0.6), accent, 0.8)
+        scanlines = (y.astype(np.int32) % 4 == 0).astype(np.float32)
+        canvas *= (1.0 - 0.18 * scanlines)[..., None]
+    elif label == "cozy":
+        for _ in range(14):
+            cx, cy, radius = rng.uniform(0, 1), rng.uniform(0, 0.7), rng.uniform(0.03, 0.1)
+            # Blend only the bokeh's bounding box; a full-frame exp per circle is the slow part.
+            y0, y1 = int(max(0.0, cy - 3 * radius) * height), int(min(1.0, cy + 3 * radius) * height)
+            x0, x1 = int(max(0.0, cx - 3 * radius) * width), int(min(1.0, cx + 3 * radius) * width)
+            glow = np.exp(-(np.hypot(u[y0:y1, x0:x1] - cx, v[y0:y1, x0:x1] - cy) ** 2) / (radius ** 2))
+            _blend(canvas[y0:y1, x0:x1], glow, accent, 0.35)
+    elif label == "action":
+        streaks = np.sin((u * 0.8 + v) * 60.0 + rng.uniform(0, 6)) > 0.92
+        _blend(canvas, streaks.astype(np.float32) * (1.0 - v), accent, 0.6)
+        _blend(canvas, np.exp(-(np.hypot(u - 0.5, v - 0.4) ** 2) / 0.02), (255, 220, 160), 0.5)
+    else:
+        bands = np.sin((u + v) * 12.0) * 0.5 + 0.5
+        _blend(canvas, bands, accent, 0.12)
+
+
+@functools.lru_cache(maxsize=8)
+def _font(size):
+    _, bold, _ = unicode_font_paths()
+    if bold:
+        try:
+            return ImageFont.truetype(bold, size)
+        except OSError:
+            pass
+    return ImageFont.load_default(size=size)
+
+
+def _draw_title(image, title, colour):
+    draw = ImageDraw.Draw(image)
+    width, height = image.size
+    size = max(18, width // 11)
+    while True:
+        font = _font(size)
+        per_line = max(6, int(width * 0.86 / (size * 0.6)))
+        lines = textwrap.wrap(title, per_line)[:3] or [""]
+        if size <= 18 or all(draw.textlength(line, font=font) <= width * 0.9 for line in lines):
+            break
+        size = int(size * 0.85)
+    line_height = int(size * 1.15)
+    top = int(height * 0.78) - line_height * len(lines) // 2
+    shadow = max(2, size // 16)
+    for index, line in enumerate(lines):
+        left = (width - draw.textlength(line, font=font)) / 2
+        y = top + index * line_height
+        draw.text((left + shadow, y + shadow), line, font=font, fill=(0, 0, 0))
+        draw.text((left, y), line, font=font, fill=colour)
+
+
+def render_placeholder(title, data=None, prompt="", size=(512, 512), label=None):
+    """Procedural cover: genre gradient and motif plus the title; deterministic per title."""
+    label = label if label in PALETTES else pick_label(data, prompt)
+    top, bottom, accent, title_colour = PALETTES[label]
+    width, height = size
+    rng = np.random.default_rng(zlib.crc32(f"{title}|{label}".encode("utf-8")))
+
+    canvas = _gradient((height, width), top, bottom)
+    _motif(canvas, label, accent, rng)
+    image = Image.fromarray(np.clip(canvas, 0, 255).astype(np.uint8), "RGB")
+    _draw_title(image, str(title or "Untitled"), title_colour)
+    return image
+
+
+def placeholder_cover_b64(title, data=None, prompt="", size=(512, 512)):
+    image = render_placeholder(title, data=data, prompt=prompt, size=size)
+    buffered = io.BytesIO()
+    image.save(buffered, format="PNG")
+    return base64.b64encode(buffered.getvalue()).decode("utf-8")
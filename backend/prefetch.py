@@ -0,0 +1,214 @@
+import heapq
+import itertools
+import os
+import threading
+import time
+
+
+class PrefetchJob:
+    def __init__(self, key, fn, args, priority, session):
+        self.key = key
+        self.fn = fn
+        self.args = args
+        self.priority = priority
+        self.session = session
+        # Every session that asked for this job; cancel/reprioritize only act once no other session wants it.
+        self.sessions = {session} if session is not None else set()
+        # Whether the job still counts against its submitting session's in-flight budget.
+        self.charged = session is not None
+        self.state = "queued"
+        self.value = None
+        self.error = None
+        self.finished_at = None
+        self.done = threading.Event()
+
+
+class PrefetchScheduler:
+    """
+    Priority queue of speculative jobs (cover art, music profile, ...) run by
+    a few background threads. Queued jobs can be cancelled or reprioritised;
+    a job that is already running is left to finish. Each session may have
+    at most `session_budget` speculative jobs queued or running, so
+    prefetching cannot flood the providers. Finished results stay until every
+    interested session has taken them, but no longer than `result_ttl`
+    seconds, and only the newest `max_results` are kept.
+    """
+
+    def __init__(self, workers=None, session_budget=None, result_ttl=None, max_results=None):
+        def env_number(name, default, cast):
+            try:
+                return cast(os.environ.get(name, default))
+            except (TypeError, ValueError):
+                return default
+
+        self.workers = workers if workers is not None else env_number("PREFETCH_WORKERS", 2, int)
+        self.session_budget = (
+            session_budget if session_budget is not None else env_number("PREFETCH_SESSION_BUDGET", 12, int)
+        )
+        self.result_ttl = result_ttl if result_ttl is not None else env_number("PREFETCH_RESULT_TTL", 600.0, float)
+        self.max_results = max_results if max_results is not None else env_number("PREFETCH_MAX_RESULTS", 64, int)
+        self._heap = []
+        self._jobs = {}
+        self._in_flight = {}
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stats = {
+            "submitted": 0, "over_budget": 0, "cancelled": 0, "used": 0, "completed": 0, "failed": 0,
+            "expired": 0,
+        }
+
+    def _ensure_workers(self):
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._run, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _push(self, job):
+        # Lower numbers run first; the counter keeps FIFO order within a priority.
+        heapq.heappush(self._heap, (job.priority, next(self._counter), job))
+
+    def _release(self, job):
+        """Returns the job's slot to its session's in-flight budget (once)."""
+        if not job.charged:
+            return
+        job.charged = False
+        remaining = self._in_flight.get(job.session, 0) - 1
+        if remaining > 0:
+            self._in_flight[job.session] = remaining
+        else:
+            self._in_flight.pop(job.session, None)
+
+    def _evict(self):
+        """Drops finished results past result_ttl, then the oldest beyond max_results."""
+        now = time.monotonic()
+        finished = sorted(
+            (job for job in self._jobs.values() if job.state == "done"), key=lambda job: job.finished_at
+        )
+        overflow = max(0, len(finished) - max(0, self.max_results))
+        for index, job in enumerate(finished):
+            if index < overflow or now - job.finished_at > self.result_ttl:
+                del self._jobs[job.key]
+                self._stats["expired"] += 1
+
+    def submit(self, key, fn, *args, priority=10, session=None):
+        """Queues fn(*args) under key; returns the existing job for a known key, None when over budget."""
+        with self._cond:
+            self._evict()
+            job = self._jobs.get(key)
+            if job and job.state != "cancelled" and not (job.state == "done" and job.error):
+                if session is not None:
+                    job.sessions.add(session)
+                return job
+            if session is not None and self._in_flight.get(session, 0) >= self.session_budget:
+                self._stats["over_budget"] += 1
+                return None
+            if session is not None:
+                self._in_flight[session] = self._in_flight.get(session, 0) + 1
+            job = PrefetchJob(key, fn, args, priority, session)
+            self._jobs[key] = job
+            self._push(job)
+            self._stats["submitted"] += 1
+            self._ensure_workers()
+            self._cond.notify()
+            return job
+
+    def interest(self, key, session):
+        """Records that `session` wants the job under key, without charging its budget."""
+        with self._cond:
+            job = self._jobs.get(key)
+            if job and session is not None:
+                job.sessions.add(session)
+
+    def reprioritize(self, key, priority, session=None):
+        """Moves a queued job; with `session`, only if no other session is interested in it."""
+        with self._cond:
+            job = self._jobs.get(key)
+            if not job or job.state != "queued" or job.priority == priority:
+                return False
+            if session is not None and job.sessions - {session}:
+                return False
+            # The stale heap entry is skipped when popped (priority no longer matches).
+            job.priority = priority
+            self._push(job)
+            self._cond.notify()
+            return True
+
+    def cancel(self, key, session=None):
+        """
+        Drops a queued job (freeing its budget slot); running jobs finish but
+        are discarded. With `session`, only that session's interest is
+        withdrawn and the job survives while other sessions still want it.
+        """
+        with self._cond:
+            job = self._jobs.get(key)
+            if not job:
+                return False
+            if session is not None:
+                job.sessions.discard(session)
+                if job.sessions:
+                    return False
+            del self._jobs[key]
+            if job.state == "queued":
+                job.state = "cancelled"
+                job.done.set()
+                self._release(job)
+            self._stats["cancelled"] += 1
+            return True
+
+    def take(self, key, timeout=None, session=None):
+        """
+        Returns (value, error, found). A queued job is moved to the front;
+        found is False when no job exists for the key. A finished result is
+        forgotten once no other session is interested in it (taking with
+        `session` withdraws that session's interest); otherwise it stays
+        until it expires.
+        """
+        with self._cond:
+            job = self._jobs.get(key)
+            if not job:
+                return None, None, False
+        self.reprioritize(key, -1)
+        finished = job.done.wait(timeout)
+        with self._cond:
+            if finished and session is not None:
+                job.sessions.discard(session)
+            if self._jobs.get(key) is job and finished and (job.error or not job.sessions):
+                del self._jobs[key]
+            if finished and job.state == "done":
+                self._stats["used"] += 1
+        if not finished:
+            return None, "prefetch_timeout", True
+        return job.value, job.error, True
+
+    def _run(self):
+        while True:
+            with self._cond:
+                job = None
+                while job is None:
+                    while not self._heap:
+                        self._cond.wait()
+                    priority, _, candidate = heapq.heappop(self._heap)
+                    if candidate.state == "queued" and candidate.priority == priority:
+                        job = candidate
+                job.state = "running"
+            try:
+                job.value = job.fn(*job.args)
+            except Exception as exc:
+                job.error = str(exc)
+            with self._cond:
+                job.state = "done"
+                job.finished_at = time.monotonic()
+                self._release(job)
+                self._stats["failed" if job.error else "completed"] += 1
+                self._evict()
+            job.done.set()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["queued"] = sum(1 for job in self._jobs.values() if job.state == "queued")
+            stats["running"] = sum(1 for job in self._jobs.values() if job.state == "running")
+            stats["finished"] = sum(1 for job in self._jobs.values() if job.state == "done")
+            stats["session_budget"] = self.session_budget
+            return stats
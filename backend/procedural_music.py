@@ -0,0 +1,240 @@
+import zlib
+
+import numpy as np
+
+TABLE_SIZE = 4096
+STEPS_PER_BAR = 16
+BARS_PER_LOOP = 4
+
+_MINOR_WORDS = (
+    "dark", "tense", "eerie", "sad", "melanch", "edgy", "ominous", "grim", "noir",
+    "mysterious", "somber", "haunting", "gloomy", "horror",
+)
+
+# (chord root in semitones above the key root, chord intervals)
+_PROGRESSIONS = {
+    "minor": [
+        [(0, (0, 3, 7)), (8, (0, 4, 7)), (3, (0, 4, 7)), (10, (0, 4, 7))],
+        [(0, (0, 3, 7)), (5, (0, 3, 7)), (8, (0, 4, 7)), (7, (0, 4, 7))],
+    ],
+    "major": [
+        [(0, (0, 4, 7)), (7, (0, 4, 7)), (9, (0, 3, 7)), (5, (0, 4, 7))],
+        [(0, (0, 4, 7)), (5, (0, 4, 7)), (9, (0, 3, 7)), (7, (0, 4, 7))],
+    ],
+}
+_KEY_ROOTS = [55.0, 58.27, 61.74, 65.41, 69.3, 73.42, 77.78, 82.41]
+
+_WAVETABLES = None
+
+
+def _additive_table(harmonics):
+    phase = np.arange(TABLE_SIZE, dtype=np.float64) * (2.0 * np.pi / TABLE_SIZE)
+    table = np.zeros(TABLE_SIZE, dtype=np.float64)
+    for number, amplitude in harmonics:
+        table += amplitude * np.sin(number * phase)
+    return _normalize(table)
+
+
+def _normalize(table):
+    return (table / np.max(np.abs(table))).astype(np.float32)
+
+
+def get_wavetables():
+    """Band-limited single-cycle tables, built once per process."""
+    global _WAVETABLES
+    if _WAVETABLES is None:
+        _WAVETABLES = {
+            "sine": _additive_table([(1, 1.0)]),
+            "saw": _additive_table([(n, 1.0 / n) for n in range(1, 24)]),
+            "soft_saw": _additive_table([(n, 1.0 / (n * n)) for n in range(1, 8)]),
+            "square": _additive_table([(n, 1.0 / n) for n in range(1, 24, 2)]),
+            "triangle": _additive_table([(n, (-1) ** (n // 2) / (n * n)) for n in range(1, 16, 2)]),
+        }
+        _WAVETABLES["pad"] = _normalize(_WAVETABLES["triangle"] + 0.35 * _WAVETABLES["saw"])
+    return _WAVETABLES
+
+
+def _oscillate(table, segments, sample_rate, phase=0.0):
+    """
+    Reads `table` for consecutive (length, frequency) segments, keeping the
+    phase continuous across segment boundaries.
+    """
+    total = sum(length for length, _ in segments)
+    out = np.empty(total, dtype=np.float32)
+    ramp = np.arange(max(length for length, _ in segments), dtype=np.float64)
+    position = 0
+    for length, freq in segments:
+        increment = freq * TABLE_SIZE / sample_rate
+        indices = (phase + increment * ramp[:length]).astype(np.int32) & (TABLE_SIZE - 1)
+        out[position:position + length] = table[indices]
+        phase += increment * length
+        position += length
+    return out
+
+
+def _decay(length, seconds, sample_rate):
+    return np.exp(-np.arange(length, dtype=np.float32) / (seconds * sample_rate))
+
+
+def _drum_kit(sample_rate, rng):
+    length = int(0.35 * sample_rate)
+    t = np.arange(length, dtype=np.float64) / sample_rate
+    sweep = 50.0 + 110.0 * np.exp(-t * 30.0)
+    kick = np.sin(2 * np.pi * np.cumsum(sweep) / sample_rate) * _decay(length, 0.12, sample_rate)
+
+    length = int(0.2 * sample_rate)
+    noise = rng.standard_normal(length).astype(np.float32)
+    tone = np.sin(2 * np.pi * 190.0 * np.arange(length) / sample_rate)
+    snare = (0.6 * noise + 0.5 * tone) * _decay(length, 0.05, sample_rate)
+
+    length = int(0.06 * sample_rate)
+    noise = rng.standard_normal(length + 1).astype(np.float32)
+    hat = np.diff(noise) * 0.35 * _decay(length, 0.012, sample_rate)
+
+    return {
+        "kick": kick.astype(np.float32),
+        "snare": snare.astype(np.float32),
+        "hat": hat.astype(np.float32),
+    }
+
+
+def _place(track, hit, positions):
+    for start in positions:
+        end = min(len(track), start + len(hit))
+        track[start:end] += hit[:end - start]
+
+
+def _wants(instruments, *words):
+    return any(word in instruments for word in words)
+
+
+def _render_drums(kit, step_samples, energy, loop_samples):
+    track = np.zeros(loop_samples, dtype=np.float32)
+    hats = np.zeros(loop_samples, dtype=np.float32)
+    total_steps = STEPS_PER_BAR * BARS_PER_LOOP
+    kick_steps = [0, 8] if energy < 0.6 else [0, 6, 8, 10]
+    hat_every = 4 if energy < 0.35 else (2 if energy < 0.75 else 1)
+    kicks, snares, hat_hits = [], [], []
+    for step in range(total_steps):
+        in_bar = step % STEPS_PER_BAR
+        if in_bar in kick_steps:
+            kicks.append(step * step_samples)
+        if energy >= 0.3 and in_bar in (4, 12):
+            snares.append(step * step_samples)
+        if in_bar % hat_every == 0:
+            hat_hits.append(step * step_samples)
+    _place(track, kit["kick"], kicks)
+    _place(track, kit["snare"] * 0.7, snares)
+    _place(hats, kit["hat"], hat_hits)
+    return track, hats
+
+
+def _render_bass(table, chords, root, step_samples, energy, sample_rate, loop_samples):
+    note_steps = 2 if energy >= 0.5 else 4
+    note_len = note_steps * step_samples
+    segments = []
+    for offset, _ in chords:
+        base = root * 2.0 ** (offset / 12.0)
+        for note in range(STEPS_PER_BAR // note_steps):
+            octave = 2.0 if (energy >= 0.7 and note % 2) else 1.0
+            segments.append((note_len, base * octave))
+    envelope = np.tile(_decay(note_len, 0.25, sample_rate), loop_samples // note_len)
+    return _oscillate(table, segments, sample_rate) * envelope
+
+
+def _render_pads(table, chords, root, bar_samples, sample_rate, detune):
+    fade = min(int(0.08 * sample_rate), bar_samples // 4)
+    bar_env = np.ones(bar_samples, dtype=np.float32)
+    bar_env[:fade] = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+    bar_env[-fade:] = np.linspace(1.0, 0.0, fade, dtype=np.float32)
+    envelope = np.tile(bar_env, BARS_PER_LOOP) / 3.0
+
+    channels = []
+    for side, cents in enumerate((-detune, detune)):
+        ratio = 2.0 ** (cents / 1200.0)
+        mix = None
+        for voice in range(3):
+            segments = [
+                (bar_samples, root * 4.0 * ratio * 2.0 ** ((offset + intervals[voice]) / 12.0))
+                for offset, intervals in chords
+            ]
+            layer = _oscillate(table, segments, sample_rate, phase=side * 977.0 + voice * 331.0)
+            mix = layer if mix is None else mix + layer
+        channels.append(mix * envelope)
+    return channels
+
+
+def render_track(profile=None, duration=8, sample_rate=32000, seed=0):
+    """
+    Renders a stereo float32 array shaped (2, samples) from a music profile
+    (tempo_bpm, energy, instruments, mood). One 4-bar block is synthesised from
+    precomputed wavetables and one-shots, then tiled to `duration` seconds.
+    """
+    profile = profile if isinstance(profile, dict) else {}
+    rng = np.random.default_rng(seed)
+    tables = get_wavetables()
+
+    try:
+        tempo = float(profile.get("tempo_bpm") or 100)
+    except (TypeError, ValueError):
+        tempo = 100.0
+    tempo = min(180.0, max(60.0, tempo))
+    try:
+        energy = float(profile.get("energy", 0.5))
+    except (TypeError, ValueError):
+        energy = 0.5
+    energy = min(1.0, max(0.0, energy))
+
+    instruments = profile.get("instruments") or []
+    if isinstance(instruments, (list, tuple)):
+        instruments = " ".join(str(item) for item in instruments)
+    instruments = str(instruments).lower()
+    mood = str(profile.get("mood") or "").lower()
+
+    use_drums = _wants(instruments, "drum", "percussion", "beat", "kit") or (not instruments and energy >= 0.4)
+    use_bass = _wants(instruments, "bass", "cello", "low strings") or not instruments
+    use_pads = _wants(instruments, "pad", "string", "synth", "choir", "drone", "piano", "organ") or not instruments
+    if not (use_drums or use_bass or use_pads):
+        use_pads = use_bass = True
+
+    scale = "minor" if any(word in mood for word in _MINOR_WORDS) else "major"
+    progressions = _PROGRESSIONS[scale]
+    chords = progressions[int(rng.integers(len(progressions)))]
+    root = _KEY_ROOTS[int(rng.integers(len(_KEY_ROOTS)))]
+
+    step_samples = max(1, int(round(sample_rate * 60.0 / tempo / 4.0)))
+    bar_samples = step_samples * STEPS_PER_BAR
+    loop_samples = bar_samples * BARS_PER_LOOP
+
+    left = np.zeros(loop_samples, dtype=np.float32)
+    right = np.zeros(loop_samples, dtype=np.float32)
+    if use_drums:
+        drums, hats = _render_drums(_drum_kit(sample_rate, rng), step_samples, energy, loop_samples)
+        drum_gain = 0.35 + 0.4 * energy
+        left += drum_gain * (drums + 0.8 * hats)
+        right += drum_gain * (drums + 1.2 * hats)
+    if use_bass:
+        bass = _render_bass(
+            tables["soft_saw"], chords, root, step_samples, energy, sample_rate, loop_samples
+        )
+        left += 0.45 * bass
+        right += 0.45 * bass
+    if use_pads:
+        pad_left, pad_right = _render_pads(
+            tables["pad"], chords, root, bar_samples, sample_rate, detune=6.0
+        )
+        pad_gain = 0.45 - 0.15 * energy
+        left += pad_gain * pad_left
+        right += pad_gain * pad_right
+
+    block = np.stack([left, right])
+    peak = float(np.max(np.abs(block))) or 1.0
+    block = np.tanh(block * (1.2 / peak)).astype(np.float32) * 0.9
+
+    total = max(1, int(round(duration * sample_rate)))
+    repeats = -(-total // loop_samples)
+    return np.tile(block, (1, repeats))[:, :total]
+
+
+def seed_from_text(text):
+    return zlib.crc32(str(text or "").encode("utf-8"))
@@ -0,0 +1,133 @@
+import contextlib
+import contextvars
+import functools
+import inspect
+import os
+import re
+import threading
+from collections import OrderedDict
+
+# Normalized prompt of the generation running in this thread/context (see keyed()).
+_PROMPT_KEY = contextvars.ContextVar("prompt_cache_key", default=None)
+# Encoder kwargs the cache keys on; any other kwarg passed with a non-default value bypasses it.
+_KEYED_KWARGS = ("input_ids", "attention_mask", "return_dict")
+
+
+def normalize_prompt(prompt):
+    """
+    Canonical form of a comma-separated music prompt: lower-case, collapsed
+    whitespace, duplicate fragments dropped and fragments sorted, so prompts
+    built from the same mood/instrument/style tags map to the same text.
+    """
+    fragments = []
+    for fragment in str(prompt or "").lower().split(","):
+        fragment = re.sub(r"\s+", " ", fragment).strip(" .")
+        if fragment and fragment not in fragments:
+            fragments.append(fragment)
+    return ", ".join(sorted(fragments))
+
+
+class PromptEmbeddingCache:
+    """
+    LRU cache of text-encoder outputs keyed by the encoder's token ids.
+    `install` wraps an encoder module's forward so generation code that calls
+    the encoder internally (transformers MusicGen, audiocraft's T5 conditioner)
+    gets the cached conditioning tensors on a hit. Inside `keyed(prompt)` the
+    normalized prompt replaces the token ids in the key, so reordered tags
+    share an entry while the model still sees the caller's prompt.
+    """
+
+    def __init__(self, max_entries=None):
+        if max_entries is None:
+            try:
+                max_entries = int(os.environ.get("LOCAL_MUSIC_PROMPT_CACHE_SIZE", 64))
+            except (TypeError, ValueError):
+                max_entries = 64
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    @contextlib.contextmanager
+    def keyed(self, prompt):
+        """Keys encoder calls made inside the block on normalize_prompt(prompt)."""
+        token = _PROMPT_KEY.set(normalize_prompt(prompt) if self.max_entries > 0 else None)
+        try:
+            yield
+        finally:
+            _PROMPT_KEY.reset(token)
+
+    def _key(self, scope, input_ids, attention_mask):
+        prompt_key = _PROMPT_KEY.get()
+        if prompt_key is not None:
+            # Shape stays in the key so a hit always matches the caller's attention mask.
+            key = [scope, tuple(input_ids.shape), prompt_key]
+        else:
+            key = [scope, tuple(input_ids.shape), input_ids.detach().cpu().numpy().tobytes()]
+        if attention_mask is not None:
+            key.append(attention_mask.detach().cpu().numpy().tobytes())
+        return tuple(key)
+
+    def install(self, encoder, scope):
+        """
+        Memoizes `encoder.forward(input_ids=..., attention_mask=...)` calls.
+        The wrapper keeps the original signature, since transformers filters
+        the kwargs it passes to the encoder by inspecting it.
+        """
+        if self.max_entries <= 0 or getattr(encoder, "_prompt_cache_installed", False):
+            return encoder
+        original = encoder.forward
+        signature = inspect.signature(original)
+
+        @functools.wraps(original)
+        def forward(*args, **kwargs):
+            try:
+                bound = signature.bind(*args, **kwargs)
+            except TypeError:
+                return original(*args, **kwargs)
+            arguments = bound.arguments
+            input_ids = arguments.get("input_ids")
+            extra = [
+                name for name, value in arguments.items()
+                if name not in _KEYED_KWARGS and value is not None and value is not False
+            ]
+            if input_ids is None or extra:
+                return original(*args, **kwargs)
+
+            key = self._key(scope, input_ids, arguments.get("attention_mask"))
+            key += (arguments.get("return_dict"),)
+            with self._lock:
+                cached = self._entries.get(key)
+                if cached is not None:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return cached
+                self._misses += 1
+
+            output = original(*args, **kwargs)
+            with self._lock:
+                self._entries[key] = output
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            return output
+
+        forward.__signature__ = signature
+        encoder.forward = forward
+        encoder._prompt_cache_installed = True
+        return encoder
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+            }
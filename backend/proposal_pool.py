@@ -0,0 +1,120 @@
+import re
+import threading
+from collections import deque
+
+_NAME_STOPWORDS = {
+    "a", "an", "and", "the", "of", "with", "game", "games", "project",
+    "demo", "prototype", "vertical", "slice",
+}
+
+
+def _genre_tokens(name):
+    words = re.findall(r"[a-z0-9]+", str(name or "").lower())
+    # Fold simple plurals ("Shooters" == "Shooter") but keep every other letter significant.
+    return frozenset(
+        word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+        for word in words if word not in _NAME_STOPWORDS
+    )
+
+
+def genre_similarity(name_a, name_b):
+    """
+    Returns a 0-1 similarity between two genre/idea names as the overlap of
+    their token sets. Tokens must match exactly, so near-spellings that are
+    distinct genres ("2D"/"3D Platformer", "Roguelike"/"Roguelite") stay apart.
+    """
+    tokens_a = _genre_tokens(name_a)
+    tokens_b = _genre_tokens(name_b)
+    if not tokens_a or not tokens_b:
+        return 0.0
+    return len(tokens_a & tokens_b) / len(tokens_a | tokens_b)
+
+
+class ProposalPool:
+    """
+    Holds surplus proposal candidates per category so a rejected card can be
+    swapped without another model round trip. When a category drains below
+    `low_water`, the optional `refill` callable is run on a background thread
+    with the names already seen per category and must return
+    {category: [items]}. At most `max_refills` top-ups are attempted.
+    """
+
+    def __init__(self, refill=None, low_water=1, similarity_threshold=0.75, max_refills=2):
+        self._queues = {}
+        self._seen = {}
+        self._lock = threading.Lock()
+        self._refill = refill
+        self._refill_thread = None
+        self._refills_left = max_refills
+        self.low_water = low_water
+        self.similarity_threshold = similarity_threshold
+
+    def _is_duplicate(self, category, name):
+        for seen_name in self._seen.get(category, []):
+            if genre_similarity(name, seen_name) >= self.similarity_threshold:
+                return True
+        return False
+
+    def add(self, category, items):
+        added = 0
+        with self._lock:
+            queue = self._queues.setdefault(category, deque())
+            seen = self._seen.setdefault(category, [])
+            for item in items or []:
+                if not isinstance(item, dict) or not item.get("name"):
+                    continue
+                if self._is_duplicate(category, item["name"]):
+                    continue
+                seen.append(item["name"])
+                queue.append(item)
+                added += 1
+        return added
+
+    def take(self, category):
+        with self._lock:
+            queue = self._queues.get(category)
+            item = queue.popleft() if queue else None
+        self._maybe_refill()
+        return item
+
+    def take_many(self, category, count):
+        items = []
+        with self._lock:
+            queue = self._queues.get(category)
+            while queue and len(items) < count:
+                items.append(queue.popleft())
+        self._maybe_refill()
+        return items
+
+    def available(self, category):
+        with self._lock:
+            return len(self._queues.get(category, ()))
+
+    def is_refilling(self):
+        thread = self._refill_thread
+        return thread is not None and thread.is_alive()
+
+    def _maybe_refill(self):
+        if not self._refill or self.is_refilling():
+            return
+        with self._lock:
+            drained = any(len(queue) < self.low_water for queue in self._queues.values())
+            if not drained or self._refills_left <= 0:
+                return
+            self._refills_left -= 1
+            seen = {category: list(names) for category, names in self._seen.items()}
+        self._refill_thread = threading.Thread(
+            target=self._run_refill, args=(seen,), daemon=True
+        )
+        self._refill_thread.start()
+
+    def _run_refill(self, seen):
+        try:
+            batch = self._refill(seen)
+        except Exception as exc:
+            print(f"Proposal pool refill failed: {exc}")
+            return
+        if not isinstance(batch, dict):
+            return
+        for category, items in batch.items():
+            self.add(category, items)
@@ -1,12 +1,28 @@
 import os
+import re
 import json
 import requests
 import time
 import base64
+import hashlib
 import io
-from backend.pdf_generator import create_manual_pdf, convert_html_to_pdf, get_fallback_html
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from backend.pdf_generator import create_manual_pdf, convert_html_to_pdf
+from backend.pdf_sandbox import get_sandbox
+from backend.gdd_templates import THEMES, pick_theme, render_gdd_html
 from huggingface_hub import InferenceClient
-from backend.text_to_music import generate_local_music
+from backend.text_to_music import generate_local_music, get_music_diagnostics, probe_backends
+from backend.audio_codec import encode_audio
+from backend.proposal_pool import ProposalPool
+from backend.similarity_cache import SimilarityCache
+from backend.feasibility import prescreen, build_rule_result
+from backend.music_profile import get_default_classifier
+from backend.prefetch import PrefetchScheduler
+from backend.placeholder_art import placeholder_cover_b64
+from backend.jobs import Requeue, get_job_queue, idempotency_key
 
 _GENAI_BACKEND = None
 _GENAI_IMPORT_ERROR = None
@@ -21,6 +37,198 @@ except Exception as exc:
         _GENAI_IMPORT_ERROR = exc2
 
 
+def _env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+_MONEY_PATTERN = re.compile(r"\$\s*(\d[\d,]*(?:\.\d+)?)\s*(million|thousand|[km])?\b", re.IGNORECASE)
+_MONEY_UNITS = {"k": 1e3, "thousand": 1e3, "m": 1e6, "million": 1e6}
+
+
+def _format_money(amount):
+    if amount >= 1e6:
+        return f"${amount / 1e6:.1f}M".replace(".0M", "M")
+    if amount >= 1e3:
+        return f"${amount / 1e3:.0f}k"
+    return f"${amount:.0f}"
+
+
+def _scale_money_text(text, factor):
+    """Multiplies every dollar amount in a free-text budget ("$250k", "$1.2 million") by factor."""
+    def scale(match):
+        amount = float(match.group(1).replace(",", ""))
+        amount *= _MONEY_UNITS.get((match.group(2) or "").lower(), 1.0)
+        return _format_money(amount * factor)
+    return _MONEY_PATTERN.sub(scale, str(text))
+
+
+def _adapt_cached_proposal(data, duration, budget=None, cached_budget=None):
+    """
+    Rewrites the request-derived fields of a cached proposal for a near-duplicate
+    request: the full-release cycle, and demo full-game budget projections
+    rescaled from the cached request's budget to this one.
+    """
+    if not isinstance(data, dict):
+        return data
+    for item in data.get("achievable_genres", []) or []:
+        if isinstance(item, dict) and "(Full Release)" in str(item.get("cycle", "")):
+            item["cycle"] = f"{duration} months (Full Release)"
+    try:
+        factor = float(budget) / float(cached_budget)
+    except (TypeError, ValueError, ZeroDivisionError):
+        factor = 1.0
+    if factor > 0 and factor != 1.0:
+        for item in data.get("demo_ideas", []) or []:
+            details = item.get("details") if isinstance(item, dict) else None
+            prediction = details.get("full_game_prediction") if isinstance(details, dict) else None
+            if isinstance(prediction, dict) and prediction.get("budget"):
+                prediction["budget"] = _scale_money_text(prediction["budget"], factor)
+    return data
+
+
+# Job handlers are registered once per process and dispatch on the payload's
+# "client" key (a hash of the credentials), so clients sharing the process-wide
+# queue never replace each other's handlers.
+_JOB_CLIENTS = weakref.WeakValueDictionary()
+
+
+def _job_handler(method):
+    def handler(payload, progress):
+        client = _JOB_CLIENTS.get(payload.get("client"))
+        if client is None:
+            raise RuntimeError("no GameAIClient with this job's credentials in this process")
+        return getattr(client, method)(payload, progress)
+    return handler
+
+
+_JOB_HANDLERS = {
+    "proposal": _job_handler("_proposal_job"),
+    "cover": _job_handler("_cover_job"),
+    "music": _job_handler("_music_job"),
+    "pdf": _job_handler("_pdf_job"),
+}
+# Claim order when workers are contended: proposals keep the search page responsive.
+_JOB_PRIORITIES = {"proposal": 0, "cover": 10, "music": 20, "pdf": 20}
+
+
+def _stamp_constraints(data, story, team_size, duration, budget):
+    """Tags each card with its category and request constraints so it can be expanded later."""
+    if not isinstance(data, dict):
+        return data
+    constraints = {"story": story, "team": team_size, "duration": duration, "budget": budget}
+    for category, key in (("achievable", "achievable_genres"), ("demos", "demo_ideas")):
+        for item in data.get(key, []) or []:
+            if isinstance(item, dict):
+                item["category"] = category
+                item["constraints"] = dict(constraints)
+    return data
+
+
+def _lru_get(cache, key):
+    value = cache.get(key)
+    if value is not None:
+        cache.move_to_end(key)
+    return value
+
+
+def _lru_put(cache, key, value, limit):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max(1, limit):
+        cache.popitem(last=False)
+
+
+def _expansion_key(item):
+    constraints = item.get("constraints", {})
+    return (
+        str(item.get("name", "")).strip().lower(),
+        item.get("category"),
+        str(constraints.get("story", "")),
+        constraints.get("team"),
+        constraints.get("duration"),
+        constraints.get("budget"),
+    )
+
+
+def _asset_key(kind, item):
+    """Prefetch/preview key for a card's asset: the card identity, not just its name, so users don't collide."""
+    return (kind,) + (_expansion_key(item) if isinstance(item, dict) else ("",))
+
+
+# Error a cover job fails with when the provider was unavailable and only
+# placeholder art could be drawn: the job is not reused and the app retries it.
+COVER_PLACEHOLDER_ERROR = "placeholder_only"
+
+# Feasibility matrix score bands (0-100) per status; rows sort consistently
+# whether the verdict came from the rules, the cache or the model.
+FEASIBILITY_SCORE_BANDS = {
+    "feasible_game": (80, 100),
+    "feasible_demo": (40, 79),
+    "impossible": (0, 39),
+}
+
+
+def _matrix_row(genre, status, reason, source, score=None, cycle=None):
+    low, high = FEASIBILITY_SCORE_BANDS.get(status, (None, None))
+    if low is not None:
+        try:
+            score = min(high, max(low, int(round(float(score)))))
+        except (TypeError, ValueError):
+            score = (low + high) // 2
+    else:
+        score = None
+    return {
+        "genre": genre,
+        "status": status or "unknown",
+        "score": score,
+        "cycle": cycle or "",
+        "reason": reason or "",
+        "source": source,
+    }
+
+
+def _log_feasibility_verdict(genre, team, duration, budget, status):
+    """Appends model verdicts to FEASIBILITY_VERDICT_LOG for offline prescreen evaluation."""
+    path = os.environ.get("FEASIBILITY_VERDICT_LOG")
+    if not path:
+        return
+    record = {"genre": genre, "team": team, "duration": duration, "budget": budget, "status": status}
+    try:
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(record) + "\n")
+    except OSError as exc:
+        print(f"Could not log feasibility verdict: {exc}")
+
+
+def _log_music_profile(payload, profile):
+    """Appends Gemini music profiles to MUSIC_PROFILE_LOG for tuning the local classifier."""
+    path = os.environ.get("MUSIC_PROFILE_LOG")
+    if not path:
+        return
+    record = {
+        "data": {
+            "name": payload.get("name", ""),
+            "details": {key: value for key, value in payload.items() if key != "name"},
+        },
+        "profile": profile,
+    }
+    try:
+        with open(path, "a", encoding="utf-8") as handle:
+            handle.write(json.dumps(record) + "\n")
+    except OSError as exc:
+        print(f"Could not log music profile: {exc}")
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
 class _GenAIClientCompat:
     def __init__(self, api_key):
         if not _GENAI_BACKEND:
@@ -63,23 +271,105 @@ class GameAIClient:
         self.hf_music_url = "https://huggingface.co/facebook/musicgen-small"
         self.hf_image_url = "https://huggingface.co/stabilityai/stable-diffusion-xl-base-1.0"
         self.hf_coder_url = "https://huggingface.co/Qwen/Qwen2.5-Coder-7B-Instruct"
+        # +/-1 person always counts as a near-duplicate team size (3 vs 4 is 25%).
+        self.proposal_cache = SimilarityCache(field_slack={"team": 1})
+        self.feasibility_cache = SimilarityCache(field_slack={"team": 1})
+        self.music_classifier = get_default_classifier()
+        # LRU-bounded by EXPANSION_CACHE_SIZE / COVER_PREVIEW_CACHE_SIZE.
+        self._expansions = OrderedDict()
+        self._expansion_lock = threading.Lock()
+        self._expansion_executor = ThreadPoolExecutor(max_workers=2)
+        self.prefetcher = PrefetchScheduler()
+        self._cover_previews = OrderedDict()
+        self._image_executor = ThreadPoolExecutor(max_workers=4)
+        self.jobs = get_job_queue()
+        self.job_client_key = hashlib.sha256(f"{self.api_key}|{self.hf_token}".encode("utf-8")).hexdigest()[:16]
+        _JOB_CLIENTS[self.job_client_key] = self
+        for kind, handler in _JOB_HANDLERS.items():
+            self.jobs.register(kind, handler, priority=_JOB_PRIORITIES.get(kind, 0))
+        probe_backends()
 
-    def generate_proposal(self, story, team_size, duration, budget):
+    def cache_stats(self):
+        return {
+            "proposals": self.proposal_cache.stats(),
+            "feasibility": self.feasibility_cache.stats(),
+        }
+
+    def generate_proposal(self, story, team_size, duration, budget,
+                          genre_count=None, demo_count=None, exclude=None,
+                          force_refresh=False, summary_only=None):
         """
         Interacts with Gemini to generate game design proposals.
-        Returns detailed JSON with both Achievable concepts and Demo ideas.
+        Returns JSON with both Achievable concepts and Demo ideas.
+        Asks for more candidates than the dashboard shows (PROPOSAL_POOL_GENRES /
+        PROPOSAL_POOL_DEMOS) so rejected cards can be swapped from the pool.
+        Near-duplicate requests are answered from proposal_cache unless
+        force_refresh is set.
+        In summary mode (PROPOSAL_SUMMARY_MODE, default on) each card only has
+        name, reason and cycle; expand_proposal fills in the details on demand.
         """
-        prompt = f"""
+        if genre_count is None:
+            genre_count = _env_int("PROPOSAL_POOL_GENRES", 6)
+        if demo_count is None:
+            demo_count = _env_int("PROPOSAL_POOL_DEMOS", 4)
+        if summary_only is None:
+            summary_only = os.environ.get("PROPOSAL_SUMMARY_MODE", "1") != "0"
+
+        use_cache = not exclude
+        cache_numbers = {"team": team_size, "duration": duration, "budget": budget}
+        cache_scope = f"{genre_count}:{demo_count}:{'summary' if summary_only else 'full'}"
+        if use_cache and force_refresh:
+            self.proposal_cache.record_bypass()
+        elif use_cache:
+            cached, cached_numbers, _ = self.proposal_cache.match(story, cache_numbers, scope=cache_scope)
+            if cached:
+                return _adapt_cached_proposal(
+                    _stamp_constraints(cached, story, team_size, duration, budget),
+                    duration, budget, cached_numbers.get("budget"),
+                )
+
+        exclude_note = ""
+        if exclude:
+            exclude_note = (
+                "\n        Do NOT repeat or lightly rename these already suggested ideas: "
+                + "; ".join(str(name) for name in exclude)
+            )
+
+        if summary_only:
+            prompt = f"""
+        Act as a Senior Executive Game Producer. Analyze these constraints:
+        Story Idea: {story}
+        Team: {team_size} people | Duration: {duration} months | Initial Budget: ${budget}
+
+        Task:
+        1. "Achievable Genres": {genre_count} distinct genres that can result in a HIGH-QUALITY FULL GAME within these STRICT constraints.
+        2. "Demo Prototypes": {demo_count} distinct vertical slice/prototype ideas to prove the core mechanic in {duration} months.
+
+        Keep it brief: only the card summary, no outlines or storylines.
+        Every idea must be a clearly different genre or mechanic, not a variant of another.{exclude_note}
+
+        Return ONLY raw JSON (NO MARKDOWN) with this structure:
+        {{
+            "achievable_genres": [
+                {{"name": "Genre Name", "reason": "2 sentences on fit and market", "cycle": "{duration} months (Full Release)"}}
+            ],
+            "demo_ideas": [
+                {{"name": "Demo Name", "reason": "2 sentences on what the prototype proves", "cycle": "1-2 months (Vertical Slice)"}}
+            ]
+        }}
+        """
+        else:
+            prompt = f"""
         Act as a Senior Executive Game Producer and Architect. Analyze these constraints:
         Story Idea: {story}
         Team: {team_size} people | Duration: {duration} months | Initial Budget: ${budget}
 
         Task:
-        1. "Achievable Genres": Identify 3 genres that can result in a HIGH-QUALITY FULL GAME within these STRICT constraints. 
+        1. "Achievable Genres": Identify {genre_count} distinct genres that can result in a HIGH-QUALITY FULL GAME within these STRICT constraints. 
            - Focus: Commercial viability and immediate development.
            - Detail: The 'optimized_outline' and 'reason' must be at least 4 high-density sentences.
 
-        2. "Demo Prototypes": Identify 2 vertical slice/prototype ideas to prove the core mechanic in {duration} months.
+        2. "Demo Prototypes": Identify {demo_count} distinct vertical slice/prototype ideas to prove the core mechanic in {duration} months.
            - Focus: Technical feasibility and "fun factor" verification.
            - Logic: These are small-scale tests. If expanded to a full game later, the budget MUST BE REASONABLE.
 
@@ -87,6 +377,7 @@ class GameAIClient:
         - For ANY 'full_game_prediction', the budget MUST be at least 5 to 10 times the initial budget (e.g., if initial is $10k, full game must be $100k+).
         - NEVER suggest a full game budget lower than the initial input.
         - Descriptions must be professional, technical, and exhaustive.
+        - Every idea must be a clearly different genre or mechanic, not a variant of another.{exclude_note}
 
         Return ONLY raw JSON (NO MARKDOWN) with this structure:
         {{
@@ -135,12 +426,266 @@ class GameAIClient:
                 contents=prompt,
                 config={'response_mime_type': 'application/json'}
             )
-            return json.loads(response.text)
+            result = json.loads(response.text)
         except Exception as e:
             print(f"Error generating proposal: {e}")
             return None
 
-    def generate_image(self, prompt):
+        if use_cache and isinstance(result, dict):
+            self.proposal_cache.store(story, cache_numbers, result, scope=cache_scope)
+        return _stamp_constraints(result, story, team_size, duration, budget)
+
+    def expand_proposal(self, item, timeout=None):
+        """
+        Returns the item with its details (outline, protagonist, storyline,
+        blurb, core loop, references; full-game prediction for demos).
+        Expansions are cached and shared with prefetch_expansion, so a card
+        opened after its prefetch started costs no second model call.
+        Returns the item unchanged if expansion fails.
+        """
+        if not isinstance(item, dict) or item.get("details"):
+            return item
+        future = self.prefetch_expansion(item)
+        try:
+            expansion = future.result(timeout=timeout)
+        except Exception as exc:
+            print(f"Proposal expansion failed: {exc}")
+            return item
+        if not expansion:
+            return item
+        expanded = dict(item)
+        expanded.update(expansion)
+        return expanded
+
+    def prefetch_expansion(self, item):
+        """Starts expanding a summary card in the background; returns its future."""
+        key = _expansion_key(item)
+        with self._expansion_lock:
+            future = _lru_get(self._expansions, key)
+            if future is None or (future.done() and future.exception() is not None):
+                future = self._expansion_executor.submit(self._expand_proposal, item)
+                _lru_put(self._expansions, key, future, _env_int("EXPANSION_CACHE_SIZE", 256))
+        return future
+
+    def _expand_proposal(self, item):
+        constraints = item.get("constraints", {})
+        is_demo = item.get("category") == "demos"
+        prediction = ""
+        if is_demo:
+            prediction = f""",
+                "full_game_prediction": {{
+                    "cycle": "Projected full development time (e.g., 24 months)",
+                    "budget": "Projected commercial budget (MUST be > 5x ${constraints.get('budget')})"
+                }}"""
+        prompt = f"""
+        Act as a Senior Executive Game Producer and Architect.
+        Expand this {'vertical slice/prototype' if is_demo else 'full game'} idea into a detailed proposal.
+        Idea: {item.get('name')} - {item.get('reason', '')} ({item.get('cycle', '')})
+        Story Idea: {constraints.get('story', '')}
+        Team: {constraints.get('team')} people | Duration: {constraints.get('duration')} months | Initial Budget: ${constraints.get('budget')}
+
+        Descriptions must be professional, technical, and exhaustive.
+
+        Return ONLY raw JSON (NO MARKDOWN) with this structure:
+        {{
+            "visual_prompt": "Cinematic English prompt for concept art",
+            "classic_references": [{{"title": "Game Name", "url": "URL"}}],
+            "details": {{
+                "optimized_outline": "Narrative structure and world-building (4+ sentences)...",
+                "protagonist": "Detailed character profile",
+                "storyline": "Comprehensive plot summary",
+                "release_blurb": "Punchy marketing hook",
+                "core_loop": "Gameplay mechanics and player progression..."{prediction}
+            }}
+        }}
+        """
+        response = self.client.models.generate_content(
+            model='gemini-2.5-flash-preview-09-2025',
+            contents=prompt,
+            config={'response_mime_type': 'application/json'}
+        )
+        expansion = json.loads(response.text)
+        if not isinstance(expansion, dict) or not isinstance(expansion.get("details"), dict):
+            raise ValueError("expansion is missing details")
+        return expansion
+
+    def build_proposal_pool(self, data, story, team_size, duration, budget):
+        """
+        Wraps a generate_proposal result in a ProposalPool that tops itself up
+        in the background with fresh, non-duplicate ideas as cards are rejected.
+        """
+        def refill(seen):
+            exclude = seen.get("achievable", []) + seen.get("demos", [])
+            more = self.generate_proposal(
+                story, team_size, duration, budget,
+                genre_count=3, demo_count=2, exclude=exclude,
+            )
+            if not more:
+                return None
+            return {
+                "achievable": more.get("achievable_genres", []),
+                "demos": more.get("demo_ideas", []),
+            }
+
+        pool = ProposalPool(refill=refill)
+        if isinstance(data, dict):
+            pool.add("achievable", data.get("achievable_genres", []))
+            pool.add("demos", data.get("demo_ideas", []))
+        return pool
+
+    def cover_prompt(self, item):
+        details = item.get("details", {}) if isinstance(item, dict) else {}
+        return (
+            f"Video game cover art for {item.get('name', 'Game')}, {details.get('release_blurb', '')}, "
+            "high quality, trending on artstation"
+        )
+
+    def _speculative_cover(self, item):
+        item = self.expand_proposal(item)
+        return self.render_image(self.cover_prompt(item), item=item)
+
+    def _speculative_music_profile(self, item):
+        return self.generate_music_profile(self.expand_proposal(item))
+
+    def prefetch_assets(self, item, session=None):
+        """
+        Speculatively starts the card expansion, cover image and (unless
+        PREFETCH_MUSIC_PROFILE=0) music profile for a card the user is looking
+        at. Jobs count against the session's prefetch budget.
+        """
+        if not isinstance(item, dict):
+            return
+        if not item.get("details"):
+            self.prefetch_expansion(item)
+        self.prefetcher.submit(
+            _asset_key("image", item), self._speculative_cover, item, priority=10, session=session
+        )
+        if os.environ.get("PREFETCH_MUSIC_PROFILE", "1") != "0":
+            self.prefetcher.submit(
+                _asset_key("music_profile", item), self._speculative_music_profile, item,
+                priority=20, session=session,
+            )
+
+    def deprioritize_prefetch(self, item, session=None):
+        """Pushes a card's speculative jobs back, unless another session still wants them."""
+        self.prefetcher.reprioritize(_asset_key("image", item), 50, session=session)
+        self.prefetcher.reprioritize(_asset_key("music_profile", item), 60, session=session)
+
+    def cancel_prefetch(self, item, session=None):
+        """Withdraws the session's interest in a card's speculative jobs; the last one out cancels them."""
+        self.prefetcher.cancel(_asset_key("image", item), session=session)
+        self.prefetcher.cancel(_asset_key("music_profile", item), session=session)
+
+    def generate_cover(self, item, timeout=None):
+        """
+        Cover art for a card as (b64, is_placeholder): the prefetched image
+        when it is a real render, else a fresh render. (None, False) when
+        `timeout` passes while the speculative render is still running.
+        """
+        value, error, found = self.prefetcher.take(_asset_key("image", item), timeout=timeout)
+        if found and value and value[0] and not value[1]:
+            return value
+        if error == "prefetch_timeout":
+            return None, False
+        if error:
+            print(f"Prefetched cover failed, generating again: {error}")
+        return self.render_image(self.cover_prompt(item), item=item)
+
+    def music_profile_for(self, item):
+        value, _, found = self.prefetcher.take(_asset_key("music_profile", item))
+        if found and isinstance(value, dict):
+            return value
+        return self.generate_music_profile(item)
+
+    def generate_image_preview(self, prompt, item=None):
+        """
+        Fast, low-resolution cover preview: IMAGE_PREVIEW_STEPS denoising steps
+        (default 4) at IMAGE_PREVIEW_SIZE px (default 512) instead of the
+        provider's full-quality defaults. Returns (b64, is_placeholder).
+        """
+        size = _env_int("IMAGE_PREVIEW_SIZE", 512)
+        return self.render_image(
+            prompt, steps=_env_int("IMAGE_PREVIEW_STEPS", 4), width=size, height=size, item=item,
+            deadline=_env_float("IMAGE_PREVIEW_DEADLINE", 10),
+        )
+
+    def cover_preview(self, item):
+        name = item.get("name", "") if isinstance(item, dict) else ""
+        key = _asset_key("preview", item)
+        with self._expansion_lock:
+            cached = _lru_get(self._cover_previews, key)
+        if cached:
+            return cached
+        try:
+            preview, is_placeholder = self.generate_image_preview(self.cover_prompt(item), item=item)
+        except Exception as exc:
+            print(f"Cover preview failed for {name}: {exc}")
+            return None
+        if is_placeholder:
+            # Shown, but not cached, so the next look asks the provider again.
+            return preview
+        with self._expansion_lock:
+            _lru_put(self._cover_previews, key, preview, _env_int("COVER_PREVIEW_CACHE_SIZE", 64))
+        return preview
+
+    def forget_cover(self, item, session=None):
+        """Drops the cached preview and the session's speculative render so a regenerate starts clean."""
+        with self._expansion_lock:
+            self._cover_previews.pop(_asset_key("preview", item), None)
+        self.prefetcher.cancel(_asset_key("image", item), session=session)
+
+    def cover_previews(self, items):
+        """Batch preview for every visible card, rendered in parallel; returns {name: b64}."""
+        items = [item for item in items if isinstance(item, dict)]
+        if not items:
+            return {}
+        workers = max(1, min(len(items), _env_int("IMAGE_PREVIEW_WORKERS", 4)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            previews = list(executor.map(self.cover_preview, items))
+        return {item.get("name", ""): preview for item, preview in zip(items, previews) if preview}
+
+    def start_cover_render(self, item, session=None):
+        """Queues the full-quality cover at top priority (reusing a speculative job); see generate_cover."""
+        key = _asset_key("image", item)
+        self.prefetcher.submit(key, self._speculative_cover, item, priority=0)
+        self.prefetcher.interest(key, session)
+
+    def generate_image(self, prompt, steps=None, width=None, height=None, item=None, deadline=None):
+        """Cover art as base64; see render_image for the placeholder fallback."""
+        return self.render_image(prompt, steps, width, height, item=item, deadline=deadline)[0]
+
+    def render_image(self, prompt, steps=None, width=None, height=None, item=None, deadline=None):
+        """
+        Cover art from the HF provider as (b64, is_placeholder). When the
+        provider errors or misses the deadline (IMAGE_DEADLINE_SECONDS, default
+        30), a local procedural placeholder is returned with is_placeholder set,
+        so callers can show it without caching it as the final cover;
+        IMAGE_PLACEHOLDER=0 restores the old raise-on-failure behaviour.
+        """
+        if os.environ.get("IMAGE_PLACEHOLDER", "1") == "0":
+            return self._render_remote_image(prompt, steps, width, height), False
+        if deadline is None:
+            deadline = _env_float("IMAGE_DEADLINE_SECONDS", 30)
+
+        if self.hf_token:
+            future = self._image_executor.submit(self._render_remote_image, prompt, steps, width, height)
+            try:
+                return future.result(timeout=deadline), False
+            except FutureTimeout:
+                # The request keeps running in the background; its result is dropped.
+                print(f"Image provider missed the {deadline}s deadline, using placeholder art.")
+            except Exception as e:
+                print(f"Image provider failed, using placeholder art: {e}")
+        return self.placeholder_image(prompt, item=item, width=width, height=height), True
+
+    def placeholder_image(self, prompt, item=None, width=None, height=None):
+        title = item.get("name", "") if isinstance(item, dict) else ""
+        size = _env_int("IMAGE_PLACEHOLDER_SIZE", 768)
+        return placeholder_cover_b64(
+            title or "Untitled", data=item, prompt=prompt, size=(width or size, height or size)
+        )
+
+    def _render_remote_image(self, prompt, steps=None, width=None, height=None):
 
         client = InferenceClient(
         provider="nscale",
@@ -150,9 +695,11 @@ class GameAIClient:
         image = client.text_to_image(
         prompt,
         model="stabilityai/stable-diffusion-xl-base-1.0",
+        num_inference_steps=steps,
+        width=width,
+        height=height,
         )
 
-        image.save("test_output3.png")
             # Convert the image into a Base64 string
         buffered = io.BytesIO()
         image.save(buffered, format="PNG")
@@ -160,28 +707,53 @@ class GameAIClient:
             
         return img_str
 
-    def generate_audio(self, prompt):
-        """Generates audio via the local MusicGen pipeline."""
+    def generate_audio(self, prompt, profile=None):
+        """
+        Generates audio via the local MusicGen pipeline. The music profile
+        drives the procedural synthesizer when no model backend is available.
+        The WAV result is re-encoded (MUSIC_AUDIO_CODEC / MUSIC_AUDIO_BITRATE)
+        before it is base64'd into session state.
+        """
         model_name = os.environ.get("LOCAL_MUSIC_MODEL", "small")
         device = os.environ.get("LOCAL_MUSIC_DEVICE") or None
         try:
             duration = int(os.environ.get("LOCAL_MUSIC_DURATION", 8))
         except (TypeError, ValueError):
             duration = 8
+        loop_seconds = None
+        if os.environ.get("LOCAL_MUSIC_LOOP", "1") != "0":
+            loop_seconds = _env_float("LOCAL_MUSIC_LOOP_SECONDS", 8.0)
 
         audio_bytes, error = generate_local_music(
             prompt,
             duration=duration,
             model_name=model_name,
             device=device,
+            profile=profile,
+            loop_seconds=loop_seconds,
+            crossfade=_env_float("LOCAL_MUSIC_CROSSFADE", 0.5),
+            window=_env_float("LOCAL_MUSIC_WINDOW", 20.0),
         )
         if audio_bytes:
+            audio_bytes, _ = encode_audio(audio_bytes)
             return base64.b64encode(audio_bytes).decode("utf-8")
         if error:
             print(f"Local music generation failed: {error}")
         return None
 
-    def generate_music_profile(self, data):
+    def music_diagnostics(self):
+        return get_music_diagnostics()
+
+    def generate_music_profile(self, data, force_llm=False):
+        """
+        Local classifier first; Gemini is only asked when the classifier's
+        confidence is below MUSIC_PROFILE_MIN_CONFIDENCE (or force_llm).
+        """
+        local_profile, confidence, _ = self.music_classifier.classify(data)
+        threshold = _env_float("MUSIC_PROFILE_MIN_CONFIDENCE", 0.6)
+        if (confidence >= threshold and not force_llm) or not self.api_key:
+            return local_profile
+
         details = data.get("details", {}) if isinstance(data, dict) else {}
         payload = {
             "name": data.get("name", "") if isinstance(data, dict) else "",
@@ -192,27 +764,27 @@ class GameAIClient:
         }
 
         profile = None
-        if self.api_key:
-            prompt = (
-                "You are a game music director. Given the game data JSON, "
-                "produce a compact music brief in JSON with keys: "
-                "mood (2-3 words), tempo_bpm (int 60-180), energy (0-1 float), "
-                "instruments (list 3-6), style_tags (list 3-6), notes (1 short sentence). "
-                "Return only JSON.\n"
-                f"Game data: {json.dumps(payload, ensure_ascii=True)}"
+        prompt = (
+            "You are a game music director. Given the game data JSON, "
+            "produce a compact music brief in JSON with keys: "
+            "mood (2-3 words), tempo_bpm (int 60-180), energy (0-1 float), "
+            "instruments (list 3-6), style_tags (list 3-6), notes (1 short sentence). "
+            "Return only JSON.\n"
+            f"Game data: {json.dumps(payload, ensure_ascii=True)}"
+        )
+        try:
+            response = self.client.models.generate_content(
+                model="gemini-2.5-flash-preview-09-2025",
+                contents=prompt,
+                config={"response_mime_type": "application/json"},
             )
-            try:
-                response = self.client.models.generate_content(
-                    model="gemini-2.5-flash-preview-09-2025",
-                    contents=prompt,
-                    config={"response_mime_type": "application/json"},
-                )
-                profile = json.loads(response.text)
-            except Exception as exc:
-                print(f"Music profile generation failed: {exc}")
+            profile = json.loads(response.text)
+        except Exception as exc:
+            print(f"Music profile generation failed: {exc}")
 
         if not isinstance(profile, dict):
-            profile = self._fallback_music_profile(data)
+            return local_profile
+        _log_music_profile(payload, profile)
         return profile
 
     def compose_music_prompt(self, data, profile=None):
@@ -251,62 +823,7 @@ class GameAIClient:
         return ", ".join([part for part in parts if part])
 
     def _fallback_music_profile(self, data):
-        details = data.get("details", {}) if isinstance(data, dict) else {}
-        text = " ".join(
-            str(value)
-            for value in [
-                data.get("name", "") if isinstance(data, dict) else "",
-                details.get("release_blurb", ""),
-                details.get("core_loop", ""),
-                details.get("storyline", ""),
-            ]
-        ).lower()
-
-        if any(key in text for key in ("horror", "survival", "nightmare", "eerie")):
-            return {
-                "mood": "tense, eerie",
-                "tempo_bpm": 80,
-                "energy": 0.35,
-                "instruments": ["low strings", "ambient drones", "sub bass"],
-                "style_tags": ["dark", "atmospheric", "minimal"],
-                "notes": "Sparse pulses and distant textures.",
-            }
-        if any(key in text for key in ("cyberpunk", "sci-fi", "sci fi", "futuristic", "neon")):
-            return {
-                "mood": "edgy, futuristic",
-                "tempo_bpm": 120,
-                "energy": 0.7,
-                "instruments": ["synth bass", "analog pads", "electronic drums"],
-                "style_tags": ["neon", "noir", "electronic"],
-                "notes": "Driving groove with shimmering synth layers.",
-            }
-        if any(key in text for key in ("fantasy", "magic", "myth", "kingdom", "dragon")):
-            return {
-                "mood": "epic, hopeful",
-                "tempo_bpm": 100,
-                "energy": 0.6,
-                "instruments": ["strings", "choir", "orchestral percussion"],
-                "style_tags": ["cinematic", "orchestral", "heroic"],
-                "notes": "Warm harmonies and sweeping melodies.",
-            }
-        if any(key in text for key in ("strategy", "tactics", "turn-based", "management", "simulation")):
-            return {
-                "mood": "focused, measured",
-                "tempo_bpm": 90,
-                "energy": 0.45,
-                "instruments": ["piano", "soft synths", "light percussion"],
-                "style_tags": ["minimal", "ambient", "steady"],
-                "notes": "Subtle layers with a steady pulse.",
-            }
-
-        return {
-            "mood": "cinematic, neutral",
-            "tempo_bpm": 100,
-            "energy": 0.5,
-            "instruments": ["synth pads", "drums", "bass"],
-            "style_tags": ["ambient", "cinematic", "modern"],
-            "notes": "Balanced, unobtrusive background loop.",
-        }
+        return self.music_classifier.classify(data)[0]
 
     def generate_gdd_enrichment(self, data):
         if not self.api_key or not isinstance(data, dict):
@@ -383,73 +900,105 @@ class GameAIClient:
             print(f"GDD enrichment fallback failed: {exc}")
             return None
 
-    def generate_html_design(self, data, img_b64=None, enrichment=None):
+    def choose_gdd_theme(self, data):
         """
-        Responsible solely for generating HTML code strings
-        """
-        if not self.hf_token: 
-            return get_fallback_html(data)
-
-        genre = data.get('name', 'Game')
-        details = data.get('details', {})
-        
-        extra_notes = ""
-        if isinstance(enrichment, dict):
-            summary = enrichment.get("executive_summary")
-            pillars = enrichment.get("pillars")
-            features = enrichment.get("key_features")
-            if summary:
-                extra_notes += f"\n- Executive Summary: {summary}"
-            if pillars:
-                extra_notes += f"\n- Design Pillars: {pillars}"
-            if features:
-                extra_notes += f"\n- Key Features: {features}"
-
-        prompt_content = f"""
-        You are an expert Frontend Developer. 
-        Task: Create a highly stylized, single-file HTML5 Design Document.
-        
-        Game Info:
-        - Title: {genre}
-        - Theme: {genre} style (e.g. Cyberpunk=neon, Fantasy=parchment).
-        - Description: {details.get('release_blurb', 'N/A')}
-        - Core Loop: {details.get('core_loop', 'N/A')}
-        {extra_notes}
-        
-        Requirements:
-        1. Use internal CSS (<style>) for aggressive styling.
-        2. RETURN ONLY VALID HTML CODE. Start with <!DOCTYPE html>.
+        Asks the coder model only for a theme name and an optional accent colour
+        (a few tokens); falls back to the local pick when it is unavailable.
         """
+        local_theme = pick_theme(data)
+        if not self.hf_token:
+            return local_theme, {}
 
+        details = data.get("details", {}) if isinstance(data, dict) else {}
+        prompt_content = (
+            f"Pick a document theme for the game design document of '{data.get('name', 'Game')}' "
+            f"({details.get('release_blurb', 'N/A')}). "
+            f"Themes: {', '.join(THEMES)}. "
+            'Return only JSON like {"theme": "minimal", "accent": "#2563eb"}.'
+        )
         payload = {
             "inputs": prompt_content,
-            "parameters": {"max_new_tokens": 2048, "temperature": 0.7, "return_full_text": False}
+            "parameters": {"max_new_tokens": 32, "temperature": 0.2, "return_full_text": False}
         }
-        
         headers = {"Authorization": f"Bearer {self.hf_token}"}
 
         try:
-            response = requests.post(self.hf_coder_url, headers=headers, json=payload, timeout=60)
+            response = requests.post(
+                self.hf_coder_url, headers=headers, json=payload,
+                timeout=_env_float("GDD_THEME_TIMEOUT", 8),
+            )
             result = response.json()
-            
-            if isinstance(result, list) and len(result) > 0:
-                html_code = result[0].get('generated_text', '')
-                html_code = html_code.replace("```html", "").replace("```", "").strip()
-                
-                if img_b64:
-                    img_tag = f'<div style="text-align:center; margin:20px 0;"><img src="data:image/png;base64,{img_b64}" style="max-width:80%; border-radius:10px;"></div>'
-                    if "<body>" in html_code:
-                        html_code = html_code.replace("<body>", f"<body>{img_tag}")
-                    else:
-                        html_code = f"{img_tag}{html_code}"
-                
-                return html_code
-            else:
-                return get_fallback_html(data)
-                
+            text = result[0].get("generated_text", "") if isinstance(result, list) and result else ""
+            start, end = text.find("{"), text.rfind("}")
+            choice = json.loads(text[start:end + 1]) if start != -1 and end > start else {}
         except Exception as e:
-            print(f"Coder API Error: {e}")
-            return get_fallback_html(data)
+            print(f"Theme selection failed: {e}")
+            return local_theme, {}
+
+        theme = str(choice.get("theme", "")).strip().lower()
+        if theme not in THEMES:
+            return local_theme, {}
+        return theme, {"accent": choice.get("accent")}
+
+    def generate_html_design(self, data, img_b64=None, enrichment=None):
+        """
+        Renders the HTML GDD from the precompiled theme templates; the model
+        only chooses the theme.
+        """
+        theme, overrides = self.choose_gdd_theme(data)
+        return render_gdd_html(data, enrichment, theme=theme, img_b64=img_b64, overrides=overrides)
+
+    def pdf_stats(self):
+        return get_sandbox().stats()
+
+    # --- Background jobs (see backend/jobs.py); payloads and results are JSON ---
+
+    def _job_payload(self, payload):
+        return dict(payload, client=self.job_client_key)
+
+    def submit_job(self, kind, payload, session=None, replace=False):
+        """Queues a job run by this client (or one with the same credentials); returns its id."""
+        return self.jobs.submit(kind, self._job_payload(payload), session=session, replace=replace)
+
+    def find_job(self, kind, payload):
+        """The job submit_job(kind, payload) would reattach to, or None."""
+        return self.jobs.find(idempotency_key(kind, self._job_payload(payload)))
+
+    def _proposal_job(self, payload, progress):
+        progress(0.1, "🏗️ Architecting the game world...")
+        return self.generate_proposal(
+            payload["story"], payload["team"], payload["duration"], payload["budget"],
+            force_refresh=payload.get("force_refresh", False),
+        )
+
+    def _cover_job(self, payload, progress):
+        progress(0.1, "🎨 Painting the cover art...")
+        image, is_placeholder = self.generate_cover(
+            payload["item"], timeout=_env_float("COVER_PREFETCH_WAIT", 15.0)
+        )
+        if image is None and not is_placeholder:
+            # The speculative render is still running; free this worker and check again later.
+            raise Requeue("prefetch_timeout")
+        if is_placeholder:
+            # Fail rather than finish, so the placeholder is never reused as the final cover.
+            raise RuntimeError(COVER_PLACEHOLDER_ERROR)
+        return image
+
+    def _music_job(self, payload, progress):
+        item = payload["item"]
+        progress(0.1, "🎼 Picking the music profile...")
+        profile = self.music_profile_for(item)
+        prompt = self.compose_music_prompt(item, profile)
+        progress(0.3, "🎹 Composing music...")
+        audio_b64 = self.generate_audio(prompt, profile=profile)
+        if not audio_b64:
+            raise RuntimeError("Audio generation failed")
+        return audio_b64
+
+    def _pdf_job(self, payload, progress):
+        progress(0.1, "📄 Compiling PDF report...")
+        pdf_bytes = self.export_pdf(payload["item"], payload.get("img_b64"))
+        return base64.b64encode(pdf_bytes).decode("utf-8")
 
     def export_pdf(self, data, img_b64=None, use_ai_design=False):
 
@@ -480,14 +1029,36 @@ class GameAIClient:
         except:
             return {"summary": "Info unavailable.", "tags": []}
 
-    def evaluate_specific_genre(self, genre, story, team, duration, budget):
+    def evaluate_specific_genre(self, genre, story, team, duration, budget, force_refresh=False):
         """
         Verify the feasibility of specific types.
         Logic:
         1. If budget/time is sufficient -> Generate full game proposal.
         2. If budget is insufficient but sufficient for a demo -> Generate demo proposal.
         3. If completely mismatched (e.g., FPS with only £100 budget) -> Return reason for non-feasibility.
+        Clear-cut cases are answered instantly by the rule-based prescreen and
+        near-duplicate requests from feasibility_cache, unless force_refresh is set.
+        A rule-based feasible_game comes back as a summary card whose details
+        are expanded on demand (expand_proposal), like the dashboard cards.
         """
+        if not force_refresh and os.environ.get("FEASIBILITY_PRESCREEN", "1") != "0":
+            verdict = prescreen(genre, team, duration, budget)
+            if verdict:
+                result = build_rule_result(verdict, genre, story, team, duration, budget)
+                if result.get("data"):
+                    # Start the blueprint now so the detail page rarely waits on it.
+                    self.prefetch_expansion(result["data"])
+                return result
+
+        cache_numbers = {"team": team, "duration": duration, "budget": budget}
+        cache_scope = str(genre).strip().lower()
+        if force_refresh:
+            self.feasibility_cache.record_bypass()
+        else:
+            cached, _ = self.feasibility_cache.lookup(story, cache_numbers, scope=cache_scope)
+            if cached:
+                return cached
+
         prompt = f"""
         Act as a Senior Executive Producer. 
         User wants to make a "{genre}" game.
@@ -526,7 +1097,105 @@ class GameAIClient:
                 contents=prompt,
                 config={'response_mime_type': 'application/json'}
             )
-            return json.loads(response.text)
+            result = json.loads(response.text)
         except Exception as e:
             print(e)
             return None
+
+        if isinstance(result, dict) and result.get("status"):
+            self.feasibility_cache.store(story, cache_numbers, result, scope=cache_scope)
+            _log_feasibility_verdict(genre, team, duration, budget, result["status"])
+        return result
+
+    def evaluate_genres_batch(self, genres, constraints, force_refresh=False):
+        """
+        Feasibility matrix for several genres under one set of constraints
+        (story, team, duration, budget). Rule-decided and cached genres are
+        answered locally; the rest are scored in structured calls of up to
+        FEASIBILITY_BATCH_SIZE genres (default 14, i.e. one call for the home
+        page list), with shards run in parallel. Returns one row per genre:
+        genre, status, score (0-100), cycle, reason, source.
+        """
+        story = constraints.get("story", "")
+        team, duration, budget = constraints.get("team"), constraints.get("duration"), constraints.get("budget")
+        cache_numbers = {"team": team, "duration": duration, "budget": budget}
+        genres = list(dict.fromkeys(str(genre).strip() for genre in genres if str(genre).strip()))
+
+        rows, pending = {}, []
+        for genre in genres:
+            scope = genre.lower()
+            if not force_refresh and os.environ.get("FEASIBILITY_PRESCREEN", "1") != "0":
+                verdict = prescreen(genre, team, duration, budget)
+                if verdict:
+                    rows[genre] = _matrix_row(genre, verdict["status"], verdict["reason"], "rules")
+                    continue
+            if not force_refresh:
+                # A full single-genre verdict answers the matrix too.
+                cached, _ = self.feasibility_cache.lookup(story, cache_numbers, scope=scope)
+                if not cached:
+                    cached, _ = self.feasibility_cache.lookup(story, cache_numbers, scope=f"matrix:{scope}")
+                if cached:
+                    cycle = cached.get("cycle") or (cached.get("data") or {}).get("cycle")
+                    rows[genre] = _matrix_row(
+                        genre, cached.get("status"), cached.get("reason"), "cache", cached.get("score"), cycle
+                    )
+                    continue
+            pending.append(genre)
+        if force_refresh and pending:
+            self.feasibility_cache.record_bypass()
+
+        size = max(1, _env_int("FEASIBILITY_BATCH_SIZE", 14))
+        shards = [pending[i:i + size] for i in range(0, len(pending), size)]
+        if shards:
+            workers = max(1, min(len(shards), _env_int("FEASIBILITY_BATCH_WORKERS", 3)))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results = list(executor.map(lambda shard: self._score_genre_shard(shard, constraints), shards))
+            for shard, verdicts in zip(shards, results):
+                for genre in shard:
+                    verdict = verdicts.get(genre.lower())
+                    if not verdict or verdict.get("status") not in FEASIBILITY_SCORE_BANDS:
+                        rows[genre] = _matrix_row(genre, None, "No verdict returned for this genre.", "error")
+                        continue
+                    self.feasibility_cache.store(story, cache_numbers, verdict, scope=f"matrix:{genre.lower()}")
+                    _log_feasibility_verdict(genre, team, duration, budget, verdict["status"])
+                    rows[genre] = _matrix_row(
+                        genre, verdict["status"], verdict.get("reason"), "model",
+                        verdict.get("score"), verdict.get("cycle"),
+                    )
+        return [rows[genre] for genre in genres]
+
+    def _score_genre_shard(self, genres, constraints):
+        """One structured call for a list of genres; returns {genre.lower(): verdict}."""
+        prompt = f"""
+        Act as a Senior Executive Producer comparing genres for one project.
+        Constraints: Story: {constraints.get('story', '')} | Team: {constraints.get('team')} | Months: {constraints.get('duration')} | Budget: ${constraints.get('budget')}
+        Genres: {json.dumps(genres)}
+
+        For EVERY genre, judge feasibility STRICTLY:
+        "feasible_game" (full release fits), "feasible_demo" (only a prototype fits) or "impossible".
+        Give a 0-100 feasibility score, a one-sentence reason and an estimated cycle.
+
+        Return JSON:
+        {{
+            "results": [
+                {{"genre": "exact genre name", "status": "feasible_game|feasible_demo|impossible",
+                  "score": 0, "reason": "...", "cycle": "..."}}
+            ]
+        }}
+        """
+        try:
+            response = self.client.models.generate_content(
+                model='gemini-2.5-flash-preview-09-2025',
+                contents=prompt,
+                config={'response_mime_type': 'application/json'}
+            )
+            result = json.loads(response.text)
+        except Exception as e:
+            print(f"Batch feasibility failed for {genres}: {e}")
+            return {}
+        entries = result.get("results", []) if isinstance(result, dict) else result
+        verdicts = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, dict) and entry.get("genre"):
+                verdicts[str(entry["genre"]).strip().lower()] = entry
+        return verdicts
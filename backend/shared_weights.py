@@ -0,0 +1,234 @@
+import argparse
+import json
+import os
+import re
+import struct
+import subprocess
+import sys
+import time
+
+_SAFETENSORS_DTYPES = {
+    "F64": "float64",
+    "F32": "float32",
+    "F16": "float16",
+    "BF16": "bfloat16",
+    "I64": "int64",
+    "I32": "int32",
+    "I16": "int16",
+    "I8": "int8",
+    "U8": "uint8",
+    "BOOL": "bool",
+}
+
+
+def mmap_enabled():
+    return os.environ.get("LOCAL_MUSIC_MMAP", "0") == "1"
+
+
+def shares_weights(profile, device=None):
+    """
+    Whether the profile's weights can stay on mmap-shared pages. int8
+    quantize_dynamic repacks every Linear into private buffers, so only fp32
+    and bf16 profiles share; bf16 exports the already-cast weights.
+    """
+    on_cpu = not device or str(device).startswith("cpu")
+    return mmap_enabled() and on_cpu and not profile.get("quantize")
+
+
+def weights_name(name, profile):
+    dtype = profile.get("dtype")
+    return f"{name}-{dtype}" if dtype else name
+
+
+def weights_path(name):
+    root = os.environ.get(
+        "LOCAL_MUSIC_WEIGHTS_DIR",
+        os.path.join(os.path.expanduser("~"), ".cache", "gamerecommend", "weights"),
+    )
+    safe_name = re.sub(r"[^A-Za-z0-9_.-]+", "--", name)
+    return os.path.join(root, f"{safe_name}.safetensors")
+
+
+def export_safetensors(module, path):
+    """
+    Writes the module's state dict as safetensors. Tensors that share storage
+    (tied weights) are written once and recorded as aliases in the metadata.
+    """
+    from safetensors.torch import save_file
+
+    tensors, aliases, seen = {}, {}, {}
+    for name, tensor in module.state_dict().items():
+        key = (tensor.untyped_storage().data_ptr(), tensor.storage_offset(), tuple(tensor.shape))
+        if key in seen:
+            aliases[name] = seen[key]
+            continue
+        seen[key] = name
+        tensors[name] = tensor.detach().to("cpu").contiguous()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    save_file(tensors, tmp_path, metadata={"aliases": json.dumps(aliases)})
+    os.replace(tmp_path, path)
+
+
+def load_safetensors_mmap(path):
+    """
+    Maps a safetensors file with a private (copy-on-write) mmap and returns
+    {name: tensor} views into it. Read-only pages come from the page cache, so
+    every process mapping the same file shares them.
+    """
+    import torch
+
+    with open(path, "rb") as handle:
+        header_len = struct.unpack("<Q", handle.read(8))[0]
+        header = json.loads(handle.read(header_len))
+    data_start = 8 + header_len
+    storage = torch.UntypedStorage.from_file(path, shared=False, nbytes=os.path.getsize(path))
+    raw = torch.empty(0, dtype=torch.uint8).set_(storage)
+
+    metadata = header.pop("__metadata__", {}) or {}
+    tensors = {}
+    for name, info in header.items():
+        dtype = getattr(torch, _SAFETENSORS_DTYPES[info["dtype"]])
+        begin, end = info["data_offsets"]
+        chunk = raw[data_start + begin:data_start + end]
+        itemsize = torch.empty(0, dtype=dtype).element_size()
+        if (data_start + begin) % itemsize:
+            chunk = chunk.clone()
+        tensors[name] = chunk.view(dtype).reshape(info["shape"])
+
+    for alias, target in json.loads(metadata.get("aliases", "{}")).items():
+        tensors[alias] = tensors[target]
+    return tensors
+
+
+def share_module_weights(module, name):
+    """
+    Re-points the module's parameters and buffers at the mmap-backed copy of
+    its weights, exporting them on first use. The private copies are freed.
+    """
+    path = weights_path(name)
+    if not os.path.exists(path):
+        export_safetensors(module, path)
+    module.load_state_dict(load_safetensors_mmap(path), strict=False, assign=True)
+    return module
+
+
+def load_transformers_shared(model_id, model_cls, dtype=None):
+    """
+    Builds a transformers model on the meta device and assigns mmap-backed
+    weights, so later workers never materialise a private copy. The first
+    worker loads normally, casts to `dtype` and exports the safetensors file.
+    """
+    import torch
+    from transformers import AutoConfig
+
+    name = weights_name(model_id, {"dtype": dtype})
+
+    def load_and_export():
+        model = model_cls.from_pretrained(model_id)
+        if dtype:
+            model = model.to(getattr(torch, dtype))
+        return share_module_weights(model, name)
+
+    path = weights_path(name)
+    if not os.path.exists(path):
+        return load_and_export()
+
+    config = AutoConfig.from_pretrained(model_id)
+    with torch.device("meta"):
+        model = model_cls.from_config(config)
+    model.load_state_dict(load_safetensors_mmap(path), strict=False, assign=True)
+    if any(t.is_meta for t in list(model.parameters()) + list(model.buffers())):
+        # Non-persistent buffers are not in the state dict; build them for real.
+        return load_and_export()
+    return model.eval()
+
+
+def _memory_stats():
+    stats = {}
+    try:
+        with open("/proc/self/smaps_rollup", "r", encoding="utf-8") as handle:
+            for line in handle:
+                parts = line.split()
+                if parts[0] in ("Rss:", "Pss:", "Shared_Clean:", "Private_Dirty:"):
+                    stats[parts[0].rstrip(":").lower()] = int(parts[1]) / 1024.0
+    except OSError:
+        pass
+    return stats
+
+
+def _worker(model_name, mmap, profile_name):
+    os.environ["LOCAL_MUSIC_MMAP"] = "1" if mmap else "0"
+    os.environ["LOCAL_MUSIC_PROFILE"] = profile_name
+    from backend import text_to_music
+    from backend.inference_profile import get_profile
+
+    model_id = text_to_music._resolve_transformers_model_id(model_name)
+    with text_to_music._get_transformers_model(model_id, "cpu") as (cached, error):
+        shared = shares_weights(get_profile(), "cpu")
+        print(json.dumps({"ok": bool(cached), "error": error, "shared": shared, **_memory_stats()}), flush=True)
+        # Stay alive until the parent has sampled every worker.
+        sys.stdin.read()
+
+
+def measure(workers=4, model_name="small", mmap=True, profile="fast"):
+    """Starts N workers that each load the model and returns their memory stats."""
+    command = [
+        sys.executable, "-m", "backend.shared_weights", "--worker",
+        "--model", model_name, "--mmap", "1" if mmap else "0", "--profile", profile,
+    ]
+    procs = [
+        subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+        for _ in range(workers)
+    ]
+    results = []
+    for proc in procs:
+        line = proc.stdout.readline()
+        results.append(json.loads(line) if line.startswith("{") else {"ok": False, "error": line})
+    for proc in procs:
+        proc.stdin.close()
+        proc.wait()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure weight sharing across music workers.")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--model", default="small")
+    parser.add_argument("--mmap", default=None)
+    parser.add_argument("--profiles", default="fast,int8,bf16")
+    parser.add_argument("--profile", default="fast")
+    parser.add_argument("--worker", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        _worker(args.model, args.mmap == "1", args.profile)
+        return
+
+    modes = [args.mmap == "1"] if args.mmap is not None else [False, True]
+    for profile in args.profiles.split(","):
+        if True in modes:
+            # Make sure the export happens before the measured workers start.
+            measure(1, args.model, mmap=True, profile=profile)
+        for mmap in modes:
+            started = time.perf_counter()
+            results = measure(args.workers, args.model, mmap=mmap, profile=profile)
+            ok = [result for result in results if result.get("ok")]
+            if not ok:
+                print(f"profile={profile} mmap={mmap}: failed: {results[0].get('error')}")
+                continue
+            rss = sum(r.get("rss", 0) for r in ok)
+            pss = sum(r.get("pss", 0) for r in ok)
+            print(
+                f"profile={profile:<5} mmap={str(mmap):<5} "
+                f"shares weights={'yes' if all(r.get('shared') for r in ok) else 'no':<4}"
+                f"workers={len(ok)} sum RSS={rss:.0f} MB sum PSS={pss:.0f} MB "
+                f"shared pages={rss - pss:.0f} MB "
+                f"private dirty={sum(r.get('private_dirty', 0) for r in ok):.0f} MB "
+                f"({time.perf_counter() - started:.1f}s)"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+import copy
+import itertools
+import math
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+
+_EMBED_DIM = 512
+_BUCKET_WIDTH = 0.35
+
+
+def embed_text(text, dim=_EMBED_DIM):
+    """
+    Cheap local text embedding: hashed word unigrams/bigrams and character
+    trigrams, L2-normalised into a sparse {index: weight} dict.
+    """
+    normalized = " ".join(re.findall(r"[a-z0-9]+", str(text or "").lower()))
+    words = normalized.split()
+    features = list(words)
+    features += [f"{a}_{b}" for a, b in zip(words, words[1:])]
+    padded = f" {normalized} "
+    features += [padded[idx:idx + 3] for idx in range(len(padded) - 2)]
+
+    vector = {}
+    for feature in features:
+        index = zlib.crc32(feature.encode("utf-8")) % dim
+        vector[index] = vector.get(index, 0.0) + 1.0
+
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    if not norm:
+        return {}
+    return {index: value / norm for index, value in vector.items()}
+
+
+def cosine_similarity(vec_a, vec_b):
+    if len(vec_a) > len(vec_b):
+        vec_a, vec_b = vec_b, vec_a
+    return sum(value * vec_b.get(index, 0.0) for index, value in vec_a.items())
+
+
+def _scale(value):
+    try:
+        return math.log1p(max(0.0, float(value)))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _number(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _within_tolerance(value_a, value_b, tolerance, slack=0.0):
+    """True when the two numbers differ by at most `tolerance` of the larger one, or by `slack`."""
+    value_a, value_b = _number(value_a), _number(value_b)
+    return abs(value_a - value_b) <= max(tolerance * max(value_a, value_b), slack)
+
+
+def _bucket(numbers):
+    return tuple(int(round(_scale(numbers[key]) / _BUCKET_WIDTH)) for key in sorted(numbers))
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+class SimilarityCache:
+    """
+    Near-duplicate cache keyed by (story text, numeric constraints).
+    Every number must be within `tolerance` (SIMILARITY_CACHE_TOLERANCE,
+    default 0.2, i.e. +/-20% of the larger value; per-field overrides in
+    `field_tolerance`) of the cached one, or within its absolute
+    `field_slack` (e.g. {"team": 1} so 3 vs 4 people still match), and among
+    those entries the closest one wins if its combined distance (1 - text
+    cosine + weighted mean log-ratio of the numbers) is within `max_distance`
+    (SIMILARITY_CACHE_MAX_DISTANCE). Entries live in log-scaled numeric
+    buckets and a lookup scans as many neighbouring buckets per field as that
+    field's tolerance can reach, so bucketing never hides an admissible entry.
+    """
+
+    def __init__(self, max_distance=None, max_entries=256, numeric_weight=0.5,
+                 tolerance=None, field_tolerance=None, field_slack=None):
+        if max_distance is None:
+            max_distance = _env_float("SIMILARITY_CACHE_MAX_DISTANCE", 0.15)
+        if tolerance is None:
+            tolerance = _env_float("SIMILARITY_CACHE_TOLERANCE", 0.2)
+        self.max_distance = max_distance
+        self.max_entries = max_entries
+        self.numeric_weight = numeric_weight
+        self.tolerance = min(max(tolerance, 0.0), 0.95)
+        self.field_tolerance = {
+            key: min(max(value, 0.0), 0.95) for key, value in (field_tolerance or {}).items()
+        }
+        self.field_slack = {key: max(float(value), 0.0) for key, value in (field_slack or {}).items()}
+        self._entries = OrderedDict()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self._hits = 0
+        self._misses = 0
+        self._bypasses = 0
+
+    def _reach(self, key):
+        """Buckets either side of a value that an admissible value for `key` can fall into."""
+        # log1p(b) - log1p(a) <= -log(1 - tolerance) when b is within tolerance of a,
+        # and <= log1p(slack) when they differ by at most slack.
+        spread = max(
+            -math.log(1.0 - self.field_tolerance.get(key, self.tolerance)),
+            math.log1p(self.field_slack.get(key, 0.0)),
+        )
+        return max(1, math.ceil(spread / _BUCKET_WIDTH))
+
+    def _admissible(self, numbers, entry):
+        return all(
+            _within_tolerance(
+                value, entry["numbers"].get(key, 0),
+                self.field_tolerance.get(key, self.tolerance), self.field_slack.get(key, 0.0),
+            )
+            for key, value in numbers.items()
+        )
+
+    def _distance(self, vector, numbers, entry):
+        text_distance = 1.0 - cosine_similarity(vector, entry["vector"])
+        keys = sorted(numbers)
+        numeric_distance = sum(
+            abs(_scale(numbers[key]) - _scale(entry["numbers"].get(key, 0))) for key in keys
+        ) / max(1, len(keys))
+        return text_distance + self.numeric_weight * numeric_distance
+
+    def lookup(self, text, numbers, scope=""):
+        """Returns (value, distance) for the nearest match, or (None, None)."""
+        value, _, distance = self.match(text, numbers, scope=scope)
+        return value, distance
+
+    def match(self, text, numbers, scope=""):
+        """Like lookup, but also returns the numbers the matched entry was stored under."""
+        vector = embed_text(text)
+        base = _bucket(numbers)
+        offsets = [range(-reach, reach + 1) for reach in map(self._reach, sorted(numbers))]
+        best_id, best_distance = None, None
+        with self._lock:
+            for offset in itertools.product(*offsets):
+                key = (scope, tuple(b + o for b, o in zip(base, offset)))
+                for entry_id in self._buckets.get(key, ()):
+                    entry = self._entries[entry_id]
+                    if not self._admissible(numbers, entry):
+                        continue
+                    distance = self._distance(vector, numbers, entry)
+                    if best_distance is None or distance < best_distance:
+                        best_id, best_distance = entry_id, distance
+
+            if best_id is None or best_distance > self.max_distance:
+                self._misses += 1
+                return None, None, None
+
+            self._hits += 1
+            self._entries.move_to_end(best_id)
+            entry = self._entries[best_id]
+            value, cached_numbers = entry["value"], dict(entry["numbers"])
+        return copy.deepcopy(value), cached_numbers, best_distance
+
+    def store(self, text, numbers, value, scope=""):
+        key = (scope, _bucket(numbers))
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "vector": embed_text(text),
+                "numbers": dict(numbers),
+                "value": copy.deepcopy(value),
+                "key": key,
+            }
+            self._buckets.setdefault(key, []).append(entry_id)
+            while len(self._entries) > self.max_entries:
+                old_id, old_entry = self._entries.popitem(last=False)
+                self._buckets[old_entry["key"]].remove(old_id)
+
+    def record_bypass(self):
+        with self._lock:
+            self._bypasses += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "bypasses": self._bypasses,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+            }
@@ -1,34 +1,169 @@
+import importlib.util
 import io
 import math
+import os
 import random
+import tempfile
+import time
 import wave
 from array import array
 
-_MODEL_CACHE = {}
-_TRANSFORMERS_CACHE = {}
+from backend.audio_codec import available_encoders, last_encode, pcm16_to_wav
+from backend.inference_profile import (
+    configure_threads,
+    get_profile,
+    inference_context,
+    optimize_module,
+)
+from backend.model_registry import ModelRegistry
+from backend.prompt_cache import PromptEmbeddingCache
+from backend.shared_weights import (
+    load_transformers_shared,
+    mmap_enabled,
+    share_module_weights,
+    shares_weights,
+    weights_name,
+)
+
+def _model_budget_bytes():
+    try:
+        return float(os.environ.get("LOCAL_MUSIC_MODEL_BUDGET_MB", 4096)) * 2**20
+    except (TypeError, ValueError):
+        return 4096 * 2**20
 
 
-def _get_model(model_name, device):
+_MODEL_REGISTRY = ModelRegistry(_model_budget_bytes())
+_PROMPT_CACHE = PromptEmbeddingCache()
+_BACKEND_PROBE = None
+_FAILED_LOADS = {}
+_LAST_DECISION = {}
+
+MODEL_BACKENDS = ("audiocraft", "transformers")
+
+
+def probe_backends(force=False):
+    """
+    Checks once per process which model backends import cleanly and returns
+    {"available": [...], "errors": {...}}. The procedural engine is always available.
+    """
+    global _BACKEND_PROBE
+    if _BACKEND_PROBE is not None and not force:
+        return _BACKEND_PROBE
+
+    available, errors = [], {}
+    started = time.perf_counter()
+    try:
+        import torch
+    except Exception as exc:
+        errors["torch"] = f"torch_not_available: {exc}"
+
+    if "torch" not in errors:
+        try:
+            from audiocraft.models import MusicGen
+            available.append("audiocraft")
+        except Exception as exc:
+            errors["audiocraft"] = f"audiocraft_not_available: {exc}"
+        try:
+            from transformers import AutoModelForTextToAudio
+            available.append("transformers")
+        except Exception as exc:
+            errors["transformers"] = f"transformers_not_available: {exc}"
+
+    _BACKEND_PROBE = {
+        "available": available,
+        "errors": errors,
+        "probe_s": round(time.perf_counter() - started, 3),
+    }
+    return _BACKEND_PROBE
+
+
+def _failure_ttl():
+    try:
+        return float(os.environ.get("LOCAL_MUSIC_FAILURE_TTL", 600))
+    except (TypeError, ValueError):
+        return 600.0
+
+
+def _cached_failure(key):
+    entry = _FAILED_LOADS.get(key)
+    if not entry:
+        return None
+    error, expires_at = entry
+    if time.monotonic() >= expires_at:
+        _FAILED_LOADS.pop(key, None)
+        return None
+    return error
+
+
+def _remember_failure(key, error):
+    _FAILED_LOADS[key] = (error, time.monotonic() + _failure_ttl())
+
+
+def get_music_diagnostics():
+    """Backend probe results, unexpired failed loads and the last backend decision."""
+    now = time.monotonic()
+    failed = {
+        "/".join(str(part) for part in key if part): {
+            "error": error,
+            "retry_in_s": round(expires_at - now, 1),
+        }
+        for key, (error, expires_at) in list(_FAILED_LOADS.items())
+        if expires_at > now
+    }
+    return {
+        "backends": probe_backends(),
+        "models": _MODEL_REGISTRY.stats(),
+        "prompt_cache": _PROMPT_CACHE.stats(),
+        "failed_loads": failed,
+        "last_decision": dict(_LAST_DECISION),
+        "audio_encoders": available_encoders(),
+        "last_encode": last_encode(),
+    }
+
+
+def _load_audiocraft_model(model_name, device, profile):
     try:
         from audiocraft.models import MusicGen
     except Exception as exc:
         return None, f"audiocraft_not_available: {exc}"
 
-    cache_key = (model_name, device or "")
-    if cache_key in _MODEL_CACHE:
-        return _MODEL_CACHE[cache_key], None
+    failure_key = ("audiocraft", model_name, device or "", profile["name"])
+    failure = _cached_failure(failure_key)
+    if failure:
+        return None, failure
 
     try:
+        configure_threads(profile)
         model = MusicGen.get_pretrained(model_name)
         if device:
             model = model.to(device)
+        # get_pretrained picks CUDA on its own when available, so ask the weights where they live.
+        loaded_on = next(model.lm.parameters()).device
+        if mmap_enabled() and loaded_on.type == "cpu":
+            share_module_weights(model.compression_model, f"audiocraft-{model_name}-codec")
+        # Casting or quantizing copies the weights, so the LM is shared only after it.
+        model.lm = optimize_module(model.lm, profile, loaded_on)
+        if shares_weights(profile, loaded_on):
+            share_module_weights(model.lm, weights_name(f"audiocraft-{model_name}-lm", profile))
+        conditioners = getattr(getattr(model.lm, "condition_provider", None), "conditioners", {})
+        text_conditioner = conditioners.get("description") if conditioners else None
+        if text_conditioner is not None and hasattr(text_conditioner, "t5"):
+            _PROMPT_CACHE.install(text_conditioner.t5, scope=("audiocraft", model_name, profile["name"]))
     except Exception as exc:
+        _remember_failure(failure_key, f"model_load_failed: {exc}")
         return None, f"model_load_failed: {exc}"
-
-    _MODEL_CACHE[cache_key] = model
     return model, None
 
 
+def _get_model(model_name, device):
+    """Context manager yielding (model, error) with the model pinned in the registry."""
+    profile = get_profile()
+    key = ("audiocraft", model_name, device or "", profile["name"])
+    return _MODEL_REGISTRY.acquire(
+        key, lambda: _load_audiocraft_model(model_name, device, profile)
+    )
+
+
 def _resolve_transformers_model_id(model_name):
     if "/" in model_name:
         return model_name
@@ -42,10 +177,11 @@ def _resolve_transformers_model_id(model_name):
     return model_map.get(model_name, f"facebook/musicgen-{model_name}")
 
 
-def _get_transformers_model(model_id, device):
-    cache_key = (model_id, device or "")
-    if cache_key in _TRANSFORMERS_CACHE:
-        return _TRANSFORMERS_CACHE[cache_key], None
+def _load_transformers_model(model_id, device, profile):
+    failure_key = ("transformers", model_id, device or "", profile["name"])
+    failure = _cached_failure(failure_key)
+    if failure:
+        return None, failure
 
     try:
         from transformers import AutoProcessor, AutoModelForTextToAudio
@@ -53,17 +189,33 @@ def _get_transformers_model(model_id, device):
         return None, f"transformers_not_available: {exc}"
 
     try:
+        configure_threads(profile)
         processor = AutoProcessor.from_pretrained(model_id)
-        model = AutoModelForTextToAudio.from_pretrained(model_id)
+        if shares_weights(profile, device):
+            # Already in the profile's dtype, so optimize_module's cast below is a no-op.
+            model = load_transformers_shared(model_id, AutoModelForTextToAudio, profile.get("dtype"))
+        else:
+            model = AutoModelForTextToAudio.from_pretrained(model_id)
         if device:
             model = model.to(device)
+        model = optimize_module(model, profile, device)
+        if getattr(model, "text_encoder", None) is not None:
+            _PROMPT_CACHE.install(model.text_encoder, scope=("transformers", model_id, profile["name"]))
     except Exception as exc:
+        _remember_failure(failure_key, f"model_load_failed: {exc}")
         return None, f"model_load_failed: {exc}"
-
-    _TRANSFORMERS_CACHE[cache_key] = (processor, model)
     return (processor, model), None
 
 
+def _get_transformers_model(model_id, device):
+    """Context manager yielding ((processor, model), error) pinned in the registry."""
+    profile = get_profile()
+    key = ("transformers", model_id, device or "", profile["name"])
+    return _MODEL_REGISTRY.acquire(
+        key, lambda: _load_transformers_model(model_id, device, profile)
+    )
+
+
 def _tensor_to_pcm16(tensor):
     try:
         import torch
@@ -73,7 +225,8 @@ def _tensor_to_pcm16(tensor):
     if tensor.dim() != 2:
         return None, None, "invalid_tensor_shape"
 
-    pcm = (tensor * 32767.0).clamp(-32768, 32767).short().cpu()
+    # Scale in float32: bf16 has 8 mantissa bits, too coarse for 16-bit PCM.
+    pcm = (tensor.float() * 32767.0).clamp(-32768, 32767).short().cpu()
     channels, samples = pcm.shape
     if channels == 1:
         return array("h", pcm[0].tolist()).tobytes(), channels, None
@@ -86,10 +239,13 @@ def _tensor_to_pcm16(tensor):
 
 
 def _generate_with_audiocraft(prompt, duration, model_name, device):
-    model, error = _get_model(model_name, device)
-    if not model:
-        return None, error
+    with _get_model(model_name, device) as (model, error):
+        if not model:
+            return None, error
+        return _audiocraft_generate(model, prompt, duration)
 
+
+def _audiocraft_generate(model, prompt, duration):
     try:
         import torch
     except Exception as exc:
@@ -97,7 +253,7 @@ def _generate_with_audiocraft(prompt, duration, model_name, device):
 
     try:
         model.set_generation_params(duration=duration)
-        with torch.no_grad():
+        with inference_context(get_profile()):
             wav = model.generate([prompt])
     except Exception as exc:
         return None, f"generation_failed: {exc}"
@@ -115,13 +271,7 @@ def _generate_with_audiocraft(prompt, duration, model_name, device):
         return None, error or "pcm_conversion_failed"
 
     sample_rate = int(getattr(model, "sample_rate", 32000))
-    buffer = io.BytesIO()
-    with wave.open(buffer, "wb") as wav_file:
-        wav_file.setnchannels(channels)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(pcm_bytes)
-    return buffer.getvalue(), None
+    return pcm16_to_wav(pcm_bytes, channels, sample_rate), None
 
 
 def _iter_transformers_model_ids(model_name):
@@ -142,94 +292,73 @@ def _generate_with_transformers(prompt, duration, model_name, device):
 
     last_error = None
     for model_id in _iter_transformers_model_ids(model_name):
-        cached, error = _get_transformers_model(model_id, device)
-        if not cached:
-            last_error = error
-            continue
-
-        processor, model = cached
-        try:
-            inputs = processor(text=[prompt], padding=True, return_tensors="pt")
-            inputs = {key: value.to(device) for key, value in inputs.items()}
-        except Exception as exc:
-            last_error = f"input_prep_failed: {exc}"
-            continue
-
-        frame_rate = getattr(getattr(model.config, "audio_encoder", None), "frame_rate", None)
-        if not frame_rate:
-            frame_rate = 50
-        max_new_tokens = max(1, int(duration * frame_rate))
-
-        try:
-            with torch.no_grad():
-                audio_values = model.generate(**inputs, max_new_tokens=max_new_tokens)
-        except Exception as exc:
-            last_error = f"generation_failed: {exc}"
-            continue
-
-        if audio_values is None or not hasattr(audio_values, "dim"):
-            last_error = "empty_output"
-            continue
-
-        if audio_values.dim() == 3:
-            audio_values = audio_values[0]
-        elif audio_values.dim() == 2:
-            audio_values = audio_values[0].unsqueeze(0)
-        else:
-            last_error = "unexpected_output_shape"
-            continue
-
-        pcm_bytes, channels, error = _tensor_to_pcm16(audio_values)
-        if not pcm_bytes:
-            last_error = error or "pcm_conversion_failed"
-            continue
-
-        sample_rate = int(
-            getattr(getattr(model.config, "audio_encoder", None), "sampling_rate", 32000)
-        )
-        buffer = io.BytesIO()
-        with wave.open(buffer, "wb") as wav_file:
-            wav_file.setnchannels(channels)
-            wav_file.setsampwidth(2)
-            wav_file.setframerate(sample_rate)
-            wav_file.writeframes(pcm_bytes)
-        return buffer.getvalue(), None
+        with _get_transformers_model(model_id, device) as (cached, error):
+            if not cached:
+                last_error = error
+                continue
+
+            processor, model = cached
+            try:
+                inputs = processor(text=[prompt], padding=True, return_tensors="pt")
+                inputs = {key: value.to(device) for key, value in inputs.items()}
+            except Exception as exc:
+                last_error = f"input_prep_failed: {exc}"
+                continue
+
+            frame_rate = getattr(getattr(model.config, "audio_encoder", None), "frame_rate", None)
+            if not frame_rate:
+                frame_rate = 50
+            max_new_tokens = max(1, int(duration * frame_rate))
+
+            try:
+                with inference_context(get_profile()):
+                    audio_values = model.generate(**inputs, max_new_tokens=max_new_tokens)
+            except Exception as exc:
+                last_error = f"generation_failed: {exc}"
+                continue
+
+            if audio_values is None or not hasattr(audio_values, "dim"):
+                last_error = "empty_output"
+                continue
+
+            if audio_values.dim() == 3:
+                audio_values = audio_values[0]
+            elif audio_values.dim() == 2:
+                audio_values = audio_values[0].unsqueeze(0)
+            else:
+                last_error = "unexpected_output_shape"
+                continue
+
+            pcm_bytes, channels, error = _tensor_to_pcm16(audio_values)
+            if not pcm_bytes:
+                last_error = error or "pcm_conversion_failed"
+                continue
+
+            sample_rate = int(
+                getattr(getattr(model.config, "audio_encoder", None), "sampling_rate", 32000)
+            )
+            return pcm16_to_wav(pcm_bytes, channels, sample_rate), None
 
     return None, last_error or "model_load_failed"
 
 
-def _generate_procedural_audio(prompt, duration, sample_rate=32000):
+def _generate_procedural_audio(prompt, duration, sample_rate=32000, profile=None):
     try:
+        from backend.procedural_music import render_track, seed_from_text
+    except Exception:
+        render_track = None
+
+    if render_track is not None:
         import numpy as np
-    except Exception as exc:
-        np = None
-
-    seed = abs(hash(prompt)) % (2**32)
-    rng = random.Random(seed)
-    base_notes = rng.sample([110.0, 130.81, 146.83, 164.81, 196.0, 220.0], k=3)
-
-    if np is not None:
-        t = np.linspace(0, duration, int(sample_rate * duration), endpoint=False)
-        signal = np.zeros_like(t)
-        for idx, freq in enumerate(base_notes):
-            lfo = 0.5 * (1.0 + np.sin(2 * math.pi * (0.05 + 0.02 * idx) * t))
-            signal += (0.15 / (idx + 1)) * np.sin(2 * math.pi * freq * t) * lfo
-
-        noise = np.random.default_rng(seed).normal(0, 0.02, size=t.shape)
-        noise = np.convolve(noise, np.ones(200) / 200, mode="same")
-        signal += noise
-
-        signal = np.clip(signal, -1.0, 1.0)
-        left = signal
-        right = np.roll(signal, int(0.01 * sample_rate))
-        stereo = np.stack([left, right], axis=0)
+
+        stereo = render_track(profile, duration, sample_rate, seed=seed_from_text(prompt))
         pcm = (stereo * 32767.0).astype(np.int16)
-        interleaved = np.empty(pcm.shape[1] * 2, dtype=np.int16)
-        interleaved[0::2] = pcm[0]
-        interleaved[1::2] = pcm[1]
-        pcm_bytes = interleaved.tobytes()
+        pcm_bytes = pcm.T.tobytes()
         channels = 2
     else:
+        seed = abs(hash(prompt)) % (2**32)
+        rng = random.Random(seed)
+        base_notes = rng.sample([110.0, 130.81, 146.83, 164.81, 196.0, 220.0], k=3)
         samples = int(sample_rate * duration)
         interleaved = array("h")
         lfo_rates = [0.05, 0.07, 0.09]
@@ -248,35 +377,335 @@ def _generate_procedural_audio(prompt, duration, sample_rate=32000):
         pcm_bytes = interleaved.tobytes()
         channels = 2
 
-    buffer = io.BytesIO()
-    with wave.open(buffer, "wb") as wav_file:
-        wav_file.setnchannels(channels)
-        wav_file.setsampwidth(2)
-        wav_file.setframerate(sample_rate)
-        wav_file.writeframes(pcm_bytes)
-    return buffer.getvalue(), None
+    return pcm16_to_wav(pcm_bytes, channels, sample_rate), None
+
+
+class _WindowError(Exception):
+    pass
+
+
+def _iter_audiocraft_windows(prompt, duration, model_name, device, window, context):
+    """
+    Yields (segment, sample_rate) tensors shaped (channels, n). Each window is
+    generated with `generate_continuation` from the last `context` seconds of
+    the previous one, so attention cost stays at one window per step.
+    """
+    with _get_model(model_name, device) as (model, error):
+        if not model:
+            raise _WindowError(error)
+        yield from _audiocraft_windows(model, prompt, duration, window, context)
+
+
+def _audiocraft_windows(model, prompt, duration, window, context):
+    try:
+        import torch
+    except Exception as exc:
+        raise _WindowError(f"torch_not_available: {exc}")
+
+    sample_rate = int(getattr(model, "sample_rate", 32000))
+    total = int(duration * sample_rate)
+    produced = 0
+    tail = None
+    model.set_generation_params(duration=window)
+    while produced < total:
+        try:
+            with inference_context(get_profile()):
+                if tail is None:
+                    wav = model.generate([prompt])[0]
+                    segment = wav
+                else:
+                    wav = model.generate_continuation(
+                        tail.unsqueeze(0), sample_rate, [prompt]
+                    )[0]
+                    segment = wav[:, tail.shape[-1]:]
+        except Exception as exc:
+            raise _WindowError(f"generation_failed: {exc}")
+        if segment.shape[-1] == 0:
+            raise _WindowError("empty_output")
+        segment = segment[:, :total - produced]
+        produced += segment.shape[-1]
+        tail = wav[:, -int(context * sample_rate):].detach()
+        yield segment, sample_rate
 
 
-def generate_local_music(prompt, duration=8, model_name="small", device=None):
+def _iter_transformers_windows(prompt, duration, model_name, device, window, context):
+    """transformers equivalent of _iter_audiocraft_windows using audio-prompted generation."""
+    try:
+        import torch
+    except Exception as exc:
+        raise _WindowError(f"torch_not_available: {exc}")
+    if not device:
+        device = "cuda" if torch.cuda.is_available() else "cpu"
+
+    model_id = _resolve_transformers_model_id(model_name)
+    with _get_transformers_model(model_id, device) as (cached, error):
+        if not cached:
+            raise _WindowError(error)
+        yield from _transformers_windows(cached, prompt, duration, device, window, context)
+
+
+def _transformers_windows(cached, prompt, duration, device, window, context):
+    import torch
+
+    processor, model = cached
+    audio_config = getattr(model.config, "audio_encoder", None)
+    frame_rate = getattr(audio_config, "frame_rate", None) or 50
+    sample_rate = int(getattr(audio_config, "sampling_rate", 32000))
+    total = int(duration * sample_rate)
+    produced = 0
+    tail = None
+    while produced < total:
+        new_seconds = window if tail is None else window - context
+        try:
+            if tail is None:
+                inputs = processor(text=[prompt], padding=True, return_tensors="pt")
+            else:
+                inputs = processor(
+                    audio=tail.mean(dim=0).float().cpu().numpy(),
+                    sampling_rate=sample_rate,
+                    text=[prompt],
+                    padding=True,
+                    return_tensors="pt",
+                )
+            inputs = {
+                key: value.to(device, model.dtype) if value.is_floating_point() else value.to(device)
+                for key, value in inputs.items()
+            }
+            with inference_context(get_profile()):
+                audio_values = model.generate(
+                    **inputs, max_new_tokens=max(1, int(new_seconds * frame_rate))
+                )
+        except Exception as exc:
+            raise _WindowError(f"generation_failed: {exc}")
+        wav = audio_values[0].cpu()
+        segment = wav if tail is None else wav[:, tail.shape[-1]:]
+        if segment.shape[-1] == 0:
+            raise _WindowError("empty_output")
+        segment = segment[:, :total - produced]
+        produced += segment.shape[-1]
+        tail = wav[:, -int(context * sample_rate):]
+        yield segment, sample_rate
+
+
+def stream_local_music(prompt, duration, out, model_name="small", device=None,
+                       window=20, context=5, profile=None):
+    """
+    Writes a long WAV to `out` (a path or seekable file object) window by
+    window, so peak memory stays at one window regardless of `duration`.
+    Returns (frames_written, error).
+    """
+    window = max(float(window), float(context) + 1.0)
+    errors = []
+    iterators = {
+        "audiocraft": _iter_audiocraft_windows,
+        "transformers": _iter_transformers_windows,
+    }
+    for name in probe_backends()["available"]:
+        iterate = iterators[name]
+        wav_file = None
+        frames = 0
+        try:
+            with _PROMPT_CACHE.keyed(prompt):
+                for segment, sample_rate in iterate(
+                    prompt, duration, model_name, device, window, context
+                ):
+                    pcm_bytes, channels, error = _tensor_to_pcm16(segment)
+                    if not pcm_bytes:
+                        raise _WindowError(error or "pcm_conversion_failed")
+                    if wav_file is None:
+                        wav_file = wave.open(out, "wb")
+                        wav_file.setnchannels(channels)
+                        wav_file.setsampwidth(2)
+                        wav_file.setframerate(sample_rate)
+                    wav_file.writeframes(pcm_bytes)
+                    frames += len(pcm_bytes) // (2 * channels)
+        except _WindowError as exc:
+            if frames:
+                wav_file.close()
+                return frames, f"truncated: {exc}"
+            errors.append(str(exc))
+            continue
+        if wav_file is not None:
+            wav_file.close()
+            return frames, None
+
+    procedural_bytes, error = _generate_procedural_audio(prompt, duration, profile=profile)
+    if not procedural_bytes:
+        return 0, "; ".join(errors + [error or "procedural_failed"])
+    with wave.open(io.BytesIO(procedural_bytes), "rb") as source, wave.open(out, "wb") as target:
+        target.setparams(source.getparams())
+        frames = source.getnframes()
+        target.writeframes(source.readframes(frames))
+    return frames, None
+
+
+def _decode_wav(wav_bytes):
+    import numpy as np
+
+    with wave.open(io.BytesIO(wav_bytes), "rb") as wav_file:
+        channels = wav_file.getnchannels()
+        sample_rate = wav_file.getframerate()
+        frames = wav_file.readframes(wav_file.getnframes())
+    pcm = np.frombuffer(frames, dtype=np.int16).reshape(-1, channels).T
+    return pcm.astype(np.float32) / 32768.0, sample_rate
+
+
+def _encode_wav(samples, sample_rate):
+    import numpy as np
+
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16)
+    return pcm16_to_wav(pcm.T.tobytes(), pcm.shape[0], sample_rate)
+
+
+def make_seamless_loop(samples, sample_rate, loop_seconds, crossfade=0.5, tempo_bpm=None):
+    """
+    Cuts a loop of exactly `loop_seconds` (snapped to whole bars when the tempo
+    is known) from `samples` shaped (channels, n). The audio generated past the
+    loop point is blended into the loop head with an equal-power crossfade, so
+    the last sample flows straight into the first.
+    """
+    import numpy as np
+
+    available = samples.shape[1]
+    fade = int(round(crossfade * sample_rate))
+    loop_len = int(round(loop_seconds * sample_rate))
+    if tempo_bpm:
+        bar_len = 240.0 / float(tempo_bpm) * sample_rate
+        bars = int((available - fade) // bar_len)
+        if bars >= 1:
+            loop_len = int(round(bars * bar_len))
+    loop_len = max(1, min(loop_len, available - fade))
+    fade = max(0, min(fade, available - loop_len, loop_len))
+
+    loop = samples[:, :loop_len].copy()
+    if fade:
+        ramp = np.linspace(0.0, 0.5 * np.pi, fade, dtype=np.float32)
+        loop[:, :fade] = (
+            samples[:, :fade] * np.sin(ramp) + samples[:, loop_len:loop_len + fade] * np.cos(ramp)
+        )
+    return loop
+
+
+def tile_loop(loop, total_samples):
+    import numpy as np
+
+    repeats = -(-total_samples // loop.shape[1])
+    return np.tile(loop, (1, repeats))[:, :total_samples]
+
+
+def finalize_loop(wav_bytes, duration, loop_seconds, crossfade=0.5, tempo_bpm=None):
+    """Turns a short generated clip into a seamless loop tiled to `duration` seconds."""
+    try:
+        samples, sample_rate = _decode_wav(wav_bytes)
+    except Exception as exc:
+        print(f"Loop finalization skipped: {exc}")
+        return wav_bytes
+    loop = make_seamless_loop(samples, sample_rate, loop_seconds, crossfade, tempo_bpm)
+    return _encode_wav(tile_loop(loop, int(round(duration * sample_rate))), sample_rate)
+
+
+def _profile_tempo(profile):
+    try:
+        return float(profile.get("tempo_bpm")) if isinstance(profile, dict) else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _max_buffered_seconds():
+    try:
+        return max(1.0, float(os.environ.get("LOCAL_MUSIC_MAX_SECONDS", 120)))
+    except (TypeError, ValueError):
+        return 120.0
+
+
+def generate_local_music(prompt, duration=8, model_name="small", device=None, profile=None,
+                         loop_seconds=None, crossfade=0.5, window=None, max_seconds=None):
+    """
+    Generates `duration` seconds of music. With `loop_seconds`, the model only
+    renders loop_seconds + crossfade of audio, which is turned into a seamless
+    loop and tiled, so long tracks cost about as much as short ones. Whatever
+    the model has to render (the loop source, or the whole track without a
+    loop) is generated as continuation windows once it exceeds `window`
+    seconds, so model memory stays at one window, and the windows are spooled
+    to a temporary file rather than held in memory. The finished WAV is
+    returned whole, so `duration` is capped at `max_seconds`
+    (LOCAL_MUSIC_MAX_SECONDS, default 120); use stream_local_music to write
+    longer tracks straight to a file.
+    """
     try:
         duration = max(1, int(duration))
     except (TypeError, ValueError):
         duration = 8
+    limit = max_seconds if max_seconds is not None else _max_buffered_seconds()
+    if duration > limit:
+        print(f"Local music duration {duration}s capped at {int(limit)}s; use stream_local_music for longer tracks")
+        duration = max(1, int(limit))
+
+    if loop_seconds and importlib.util.find_spec("numpy") is None:
+        loop_seconds = None
+
+    generation_duration = duration
+    if loop_seconds:
+        loop_seconds = min(float(loop_seconds), duration)
+        generation_duration = loop_seconds + crossfade
+
+    def finish(wav_bytes):
+        if not loop_seconds:
+            return wav_bytes
+        return finalize_loop(
+            wav_bytes, duration, loop_seconds, crossfade, _profile_tempo(profile)
+        )
 
-    audio_bytes, error = _generate_with_audiocraft(prompt, duration, model_name, device)
-    if audio_bytes:
-        return audio_bytes, None
-
-    fallback_bytes, fallback_error = _generate_with_transformers(
-        prompt, duration, model_name, device
+    # Only model renders are windowed; the procedural engine below is cheap at any length.
+    if window and generation_duration > window and probe_backends()["available"]:
+        with tempfile.TemporaryFile() as spool:
+            frames, error = stream_local_music(
+                prompt, generation_duration, spool, model_name, device, window=window, profile=profile
+            )
+            if not frames:
+                return None, error
+            if error:
+                print(f"Windowed music generation: {error}")
+            spool.seek(0)
+            wav_bytes = spool.read()
+        return finish(wav_bytes), None
+
+    generators = {
+        "audiocraft": _generate_with_audiocraft,
+        "transformers": _generate_with_transformers,
+    }
+    started = time.perf_counter()
+    probe = probe_backends()
+    errors = []
+    for name in probe["available"]:
+        # The model gets the prompt as written; only the encoder cache key is canonicalised.
+        with _PROMPT_CACHE.keyed(prompt):
+            audio_bytes, error = generators[name](prompt, generation_duration, model_name, device)
+        if audio_bytes:
+            _record_decision(name, probe, errors, started)
+            return finish(audio_bytes), None
+        errors.append(f"{name}: {error}")
+
+    # The procedural engine tiles a bar-aligned block, so it loops without a crossfade.
+    procedural_bytes, procedural_error = _generate_procedural_audio(
+        prompt, duration, profile=profile
     )
-    if fallback_bytes:
-        return fallback_bytes, None
-    procedural_bytes, procedural_error = _generate_procedural_audio(prompt, duration)
     if procedural_bytes:
-        print("Local MusicGen fallback: procedural audio")
+        _record_decision("procedural", probe, errors, started)
         return procedural_bytes, None
 
-    if error and fallback_error and procedural_error:
-        return None, f"{error}; {fallback_error}; {procedural_error}"
-    return None, error or fallback_error or procedural_error or "no_backend_available"
+    errors.append(f"procedural: {procedural_error}")
+    _record_decision(None, probe, errors, started)
+    return None, "; ".join(errors) or "no_backend_available"
+
+
+def _record_decision(backend, probe, errors, started):
+    _LAST_DECISION.clear()
+    _LAST_DECISION.update({
+        "backend": backend,
+        "skipped": [name for name in MODEL_BACKENDS if name not in probe["available"]],
+        "errors": list(errors),
+        "elapsed_s": round(time.perf_counter() - started, 3),
+    })
+    if backend == "procedural":
+        print("Local MusicGen fallback: procedural audio")